@@ -0,0 +1,148 @@
+import numpy as np
+from functools import lru_cache
+
+import algorithm.constants as constants
+from algorithm.control_direction import shrink_space
+from algorithm.control_speed import compute_speed
+from algorithm.planners import Planner, PlanResult, register_planner
+
+
+@lru_cache(maxsize=4)
+def arc_collision_table(bins: int, steer_angles: tuple, wheelbase: float, w: float, h1: float, h2: float,
+                        horizon_m: float, step_m: float, range_res_m: float) -> np.ndarray:
+    """
+    Path length (m) after which the car footprint, driven along each candidate
+    arc, first covers a point of the scan, or inf if it stays clear within
+    `horizon_m`. Shape (len(steer_angles), bins, range_cells + 1): the point of
+    bin b at range r is looked up in cell floor(r / range_res_m), the nearer
+    edge of its cell, and the last cell (beyond reach or no return) is always inf.
+    Points already inside the footprint at the start are ignored.
+    """
+    reach = horizon_m + max(h1, h2, w)
+    range_cells = int(np.ceil(reach / range_res_m)) + 1
+
+    angles = np.arange(bins) * (2 * np.pi / bins)
+    ranges = np.arange(range_cells) * range_res_m
+    forward = ranges[None, :] * np.cos(angles)[:, None]
+    side = ranges[None, :] * np.sin(angles)[:, None]
+
+    def inside(pose_forward, pose_side, heading):
+        rel_forward = forward - pose_forward
+        rel_side = side - pose_side
+        cos_h, sin_h = np.cos(heading), np.sin(heading)
+        local_forward = cos_h * rel_forward + sin_h * rel_side
+        local_side = cos_h * rel_side - sin_h * rel_forward
+        return (local_forward >= -h2) & (local_forward <= h1) & (np.abs(local_side) <= w)
+
+    initially_inside = inside(0.0, 0.0, 0.0)
+    table = np.full((len(steer_angles), bins, range_cells + 1), np.inf, dtype=np.float32)
+
+    for k, steer in enumerate(steer_angles):
+        curvature = np.tan(np.radians(steer)) / wheelbase
+        collision = table[k, :, :range_cells]
+
+        for s in np.arange(step_m, horizon_m + step_m / 2, step_m):
+            # Pose after s metres on the arc; positive curvature turns toward positive angles
+            heading = curvature * s
+            if abs(curvature) > 1e-9:
+                pose_forward, pose_side = np.sin(heading) / curvature, (1 - np.cos(heading)) / curvature
+            else:
+                pose_forward, pose_side = s, 0.0
+
+            hit = inside(pose_forward, pose_side, heading) & ~initially_inside & np.isinf(collision)
+            collision[hit] = s
+
+    table.flags.writeable = False
+    return table
+
+
+@register_planner("arc")
+class ArcPlanner(Planner):
+    """
+    Dynamic-window style local planner.
+
+    A fan of ARC_CANDIDATES constant-steering arcs is swept with the car
+    footprint once (see arc_collision_table); scoring them against a scan is
+    then one gather and one min-reduction over the bins, giving the free path
+    length of every arc. Each (arc, speed in ARC_SPEEDS) pair is admissible
+    if its time to collision is at least ARC_MIN_TTC_S, and the best pair
+    trades free path and speed against steering effort and steering changes.
+    ARC_SPEEDS are set_speed commands, converted to m/s with SPEED_COMMAND_MPS
+    for the time to collision.
+
+    Call it with the raw scan (not shrink_space'd, the footprint is already
+    accounted for); it returns (steer, target_angle) like
+    compute_steer_from_lidar and leaves the chosen speed in `speed`.
+    `plan` caps that speed with compute_speed.
+    """
+
+    def __init__(self):
+        self.steer = 0.0
+        self.speed = 0.0
+        self.free_path = None
+        self._key = None
+
+    def _build(self, bins: int):
+        limit = constants.STEERING_LIMIT
+        self.steer_angles = np.linspace(-limit, limit, constants.ARC_CANDIDATES)
+        self.speeds = np.asarray(constants.ARC_SPEEDS, dtype=float)
+
+        self._table = arc_collision_table(
+            bins, tuple(self.steer_angles.tolist()), constants.WHEELBASE,
+            constants.HITBOX_W, constants.HITBOX_H1, constants.HITBOX_H2,
+            constants.ARC_HORIZON_M, constants.ARC_STEP_M, constants.ARC_RANGE_RES_M)
+        self._no_return_cell = self._table.shape[2] - 1
+        self._bin_index = np.arange(bins)
+
+        # Direction of each arc at the lookahead distance, reported as the target angle
+        curvature = np.tan(np.radians(self.steer_angles)) / constants.WHEELBASE
+        lookahead = min(constants.ARC_LOOKAHEAD_M, constants.ARC_HORIZON_M)
+        straight = np.abs(curvature) < 1e-9
+        safe_curvature = np.where(straight, 1.0, curvature)
+        heading = curvature * lookahead
+        forward = np.where(straight, lookahead, np.sin(heading) / safe_curvature)
+        side = np.where(straight, 0.0, (1 - np.cos(heading)) / safe_curvature)
+        self.target_angles = np.degrees(np.arctan2(side, forward))
+
+        self._key = (bins, constants.CONFIG_GENERATION)
+
+    def prepare(self, bins: int):
+        """Builds the arc tables for `bins` ahead of the first scan (takes a few hundred ms)."""
+        if self._key != (bins, constants.CONFIG_GENERATION):
+            self._build(bins)
+
+    def __call__(self, raw_lidar: np.ndarray):
+        self.prepare(len(raw_lidar))
+
+        # Range cell of every bin; bins without a return look up the always-free last cell
+        cells = np.floor(raw_lidar / constants.ARC_RANGE_RES_M).astype(np.intp)
+        cells[(raw_lidar <= 0) | (cells > self._no_return_cell)] = self._no_return_cell
+
+        free_path = self._table[:, self._bin_index, cells].min(axis=1)
+        free_path = np.minimum(free_path, constants.ARC_HORIZON_M)
+        self.free_path = free_path
+
+        # (arc, speed) pairs: time to collision must stay above ARC_MIN_TTC_S
+        speeds_mps = self.speeds * constants.SPEED_COMMAND_MPS
+        admissible = free_path[:, None] >= speeds_mps[None, :] * constants.ARC_MIN_TTC_S
+        limit = constants.STEERING_LIMIT
+        score = (free_path[:, None] / constants.ARC_HORIZON_M
+                 + constants.ARC_SPEED_WEIGHT * self.speeds[None, :] / self.speeds.max()
+                 - constants.ARC_STEER_WEIGHT * np.abs(self.steer_angles[:, None]) / limit
+                 - constants.ARC_SMOOTH_WEIGHT * np.abs(self.steer_angles[:, None] - self.steer) / limit)
+
+        if admissible.any():
+            k, v = np.unravel_index(np.argmax(np.where(admissible, score, -np.inf)), score.shape)
+            self.speed = float(self.speeds[v])
+        else:
+            # Nothing is safe at any speed: stop, steering toward the longest free arc
+            k = int(np.argmax(free_path))
+            self.speed = 0.0
+
+        self.steer = float(self.steer_angles[k])
+        return self.steer, float(self.target_angles[k])
+
+    def plan(self, raw_lidar: np.ndarray, front_distance_m: float = None) -> PlanResult:
+        steer, target_angle = self(raw_lidar)
+        speed = min(compute_speed(shrink_space(raw_lidar), target_angle, front_distance_m), self.speed)
+        return PlanResult(steer, target_angle, speed)
@@ -33,6 +33,7 @@ def save_config(config_data):
         print("No config file path provided. Cannot save configuration.")
         
 cfg = None
+CONFIG_GENERATION = 0  # incremented by every load_constants() so caches can tell they are stale
 
 def load_constants(new_filepath="config.json"):
     """
@@ -45,10 +46,13 @@ def load_constants(new_filepath="config.json"):
         print(f"Loading constants from configuration file {new_filepath}")
         
         
-    global cfg
+    global cfg, CONFIG_GENERATION
     global NOM_VOITURE
     
-    global LIDAR_BAUDRATE, LIDAR_HEADING_OFFSET_DEG, LIDAR_POINT_TIMEOUT_MS, LIDAR_FOV_FILTER
+    global LIDAR_BAUDRATE, LIDAR_ACQUISITION_MODE, LIDAR_STREAM_SECTOR_DEG, LIDAR_DRIVER, LIDAR_SCAN_TYPE
+    global LIDAR_HEADING_OFFSET_DEG, LIDAR_POINT_TIMEOUT_MS, LIDAR_FOV_FILTER, LIDAR_BINS
+    global LIDAR_BIN_AGGREGATION, LIDAR_MIN_QUALITY, LIDAR_DESKEW
+    global LIDAR_TEMPORAL_FILTER, LIDAR_TEMPORAL_DEPTH, LIDAR_TEMPORAL_ALPHA, LIDAR_TEMPORAL_OUTLIER_M
     global FIELD_OF_VIEW_DEG, CONVOLUTION_SIZE
     
     global AVOID_CORNER_MAX_ANGLE, AVOID_CORNER_MIN_DISTANCE, AVOID_CORNER_SCALE_FACTOR
@@ -57,14 +61,28 @@ def load_constants(new_filepath="config.json"):
     
     global TICKS_TO_METER, APERTURE_ANGLE, ESC_DC_MIN, ESC_DC_MAX, SPEED2DC_A, SPEED2DC_B
     global SPEED_FACTOR_DIST, SPEED_FACTOR_ANG, AGGRESSIVENESS
+    global SPEED_CONTROL, SPEED_CONTROL_RATE_HZ, SPEED_COMMAND_MPS, SPEED_KP, SPEED_KI, SPEED_MAX_CORRECTION
+    global SPEED_GOVERNOR, BRAKE_DECEL_MPS2, GOVERNOR_REACTION_S, GOVERNOR_MIN_TTC_S, GOVERNOR_MARGIN_M
     
-    global HITBOX_H1, HITBOX_H2, HITBOX_W
+    global HITBOX_H1, HITBOX_H2, HITBOX_W, WHEELBASE
     
     global MIN_LENGTH, MAX_LENGTH, LERP_MAP_LENGTH
     global MIN_POINTS_TO_TRIGGER, REVERSE_CHECK_COUNTER, PWM_REVERSE, STEERING_LIMIT_IN_REVERSE
+    global REVERSE_REAR_MARGIN_M, REVERSE_FRONT_CLEARANCE_M
+    
+    global CONTROL_LOOP_MODE, CONTROL_LOOP_PERIOD_S, CONTROL_LOOP_TIMEOUT_S, CONTROL_LOOP_OVERRUN
+    
+    global PLANNER, ARC_CANDIDATES, ARC_SPEEDS, ARC_HORIZON_M, ARC_STEP_M, ARC_RANGE_RES_M, ARC_LOOKAHEAD_M
+    global ARC_MIN_TTC_S, ARC_SPEED_WEIGHT, ARC_STEER_WEIGHT, ARC_SMOOTH_WEIGHT
+    global GAP_DISPARITY_M, GAP_MARGIN_M, GAP_MIN_DISTANCE_M, GAP_MAX_RANGE_M, GAP_AIM
+    
+    global CAMERA_WORKER, CAMERA_MAX_AGE_S
+    
+    global STAGE_TIMING, STAGE_TIMING_WINDOW
 
     # Load configuration from the current config file path.
     cfg = load_config(new_filepath)
+    CONFIG_GENERATION += 1
 
     #------------------------------------------------#
     #            General Car Information             #
@@ -75,9 +93,21 @@ def load_constants(new_filepath="config.json"):
     #          Point Cloud Filtering Settings        #
     #------------------------------------------------#
     LIDAR_BAUDRATE = int(get_config_value(cfg, "LIDAR_BAUDRATE", 256000)) #or 115200
+    LIDAR_ACQUISITION_MODE = str(get_config_value(cfg, "LIDAR_ACQUISITION_MODE", "scan")) # "scan" (whole revolution) or "stream" (per sector)
+    LIDAR_STREAM_SECTOR_DEG = int(get_config_value(cfg, "LIDAR_STREAM_SECTOR_DEG", 30)) # publish granularity in "stream" mode
+    LIDAR_DRIVER = str(get_config_value(cfg, "LIDAR_DRIVER", "rplidar")) # "rplidar" (rplidar-roboticia) or "native" (in-tree NumPy decoder)
+    LIDAR_SCAN_TYPE = str(get_config_value(cfg, "LIDAR_SCAN_TYPE", "normal")) # "normal" or "express", native driver only
     LIDAR_HEADING_OFFSET_DEG = int(get_config_value(cfg, "LIDAR_HEADING_OFFSET_DEG", -89))
     LIDAR_POINT_TIMEOUT_MS = int(get_config_value(cfg, "LIDAR_POINT_TIMEOUT_MS", 1000))
     LIDAR_FOV_FILTER = int(get_config_value(cfg, "LIDAR_FOV_FILTER", 180))  # excludes backward readings
+    LIDAR_BINS = int(get_config_value(cfg, "LIDAR_BINS", 360))  # angular resolution of the published scan: 360, 720 or 1440
+    LIDAR_BIN_AGGREGATION = str(get_config_value(cfg, "LIDAR_BIN_AGGREGATION", "nearest"))  # "nearest", "mean" (quality-weighted), "median" or "last"
+    LIDAR_MIN_QUALITY = int(get_config_value(cfg, "LIDAR_MIN_QUALITY", 0))  # returns below this quality (0-63) are dropped
+    LIDAR_DESKEW = bool(get_config_value(cfg, "LIDAR_DESKEW", True))  # reproject each scan to the vehicle pose at scan end
+    LIDAR_TEMPORAL_FILTER = str(get_config_value(cfg, "LIDAR_TEMPORAL_FILTER", "none"))  # "none", "median" or "ema" over the last scans
+    LIDAR_TEMPORAL_DEPTH = int(get_config_value(cfg, "LIDAR_TEMPORAL_DEPTH", 5))  # number of scans kept by the temporal filter
+    LIDAR_TEMPORAL_ALPHA = float(get_config_value(cfg, "LIDAR_TEMPORAL_ALPHA", 0.5))  # weight of a new return in "ema"
+    LIDAR_TEMPORAL_OUTLIER_M = float(get_config_value(cfg, "LIDAR_TEMPORAL_OUTLIER_M", 0.5))  # "ema" clamps returns this far from the median
     FIELD_OF_VIEW_DEG = int(get_config_value(cfg, "FIELD_OF_VIEW_DEG", 180))
     CONVOLUTION_SIZE = int(get_config_value(cfg, "CONVOLUTION_SIZE", 71))
 
@@ -121,6 +151,13 @@ def load_constants(new_filepath="config.json"):
     
     SPEED2DC_A = ESC_DC_MAX - ESC_DC_MIN
     SPEED2DC_B = ESC_DC_MIN
+
+    SPEED_CONTROL = str(get_config_value(cfg, "SPEED_CONTROL", "open"))  # "open" (setpoint to duty cycle) or "closed" (PI on the wheel speed, tune the gains on the car first)
+    SPEED_CONTROL_RATE_HZ = float(get_config_value(cfg, "SPEED_CONTROL_RATE_HZ", 100.0))  # rate of the speed control thread
+    SPEED_COMMAND_MPS = float(get_config_value(cfg, "SPEED_COMMAND_MPS", 1.0))  # wheel speed (m/s) reached per unit of set_speed command, open loop
+    SPEED_KP = float(get_config_value(cfg, "SPEED_KP", 0.5))  # command units per command unit of speed error
+    SPEED_KI = float(get_config_value(cfg, "SPEED_KI", 2.0))  # command units per command unit x s of accumulated error
+    SPEED_MAX_CORRECTION = float(get_config_value(cfg, "SPEED_MAX_CORRECTION", 0.6))  # largest PI correction over the setpoint (command units)
     
     SPEED_FACTOR_DIST = np.array([
         [0.00, 0.00],
@@ -143,6 +180,16 @@ def load_constants(new_filepath="config.json"):
     ])
     AGGRESSIVENESS = float(get_config_value(cfg, "AGGRESSIVENESS", 0.8))
 
+    #------------------------------------------------#
+    #                Speed Governor                  #
+    #------------------------------------------------#
+
+    SPEED_GOVERNOR = str(get_config_value(cfg, "SPEED_GOVERNOR", "ttc"))  # "ttc" (braking distance along the arc) or "front" (front sector average)
+    BRAKE_DECEL_MPS2 = float(get_config_value(cfg, "BRAKE_DECEL_MPS2", 1.5))  # deceleration the car can count on when braking
+    GOVERNOR_REACTION_S = float(get_config_value(cfg, "GOVERNOR_REACTION_S", 0.1))  # delay before braking starts
+    GOVERNOR_MIN_TTC_S = float(get_config_value(cfg, "GOVERNOR_MIN_TTC_S", 0.6))  # below this time to collision, slow down to restore it
+    GOVERNOR_MARGIN_M = float(get_config_value(cfg, "GOVERNOR_MARGIN_M", 0.03))  # added to HITBOX_W on each side of the swept path
+
 
     #------------------------------------------------#
     #                Hitbox Parameters               #
@@ -151,6 +198,7 @@ def load_constants(new_filepath="config.json"):
     HITBOX_H1 = float(get_config_value(cfg, "HITBOX_H1", 0.11))
     HITBOX_H2 = float(get_config_value(cfg, "HITBOX_H2", 0.31))
     HITBOX_W  = float(get_config_value(cfg, "HITBOX_W", 0.11)) 
+    WHEELBASE = float(get_config_value(cfg, "WHEELBASE", 0.26))  # front to rear axle (m), used for scan deskew
 
     #------------------------------------------------#
     #           Reverse Parameters                   #
@@ -169,5 +217,51 @@ def load_constants(new_filepath="config.json"):
     LERP_MAP_LENGTH[:, 1] = MIN_LENGTH + (MAX_LENGTH - MIN_LENGTH) * LERP_MAP_LENGTH[:, 1]
     PWM_REVERSE = 7.0
     STEERING_LIMIT_IN_REVERSE = STEERING_LIMIT
+    REVERSE_REAR_MARGIN_M = float(get_config_value(cfg, "REVERSE_REAR_MARGIN_M", 0.05))  # stop reversing when a lidar return is this close behind the hitbox
+    REVERSE_FRONT_CLEARANCE_M = float(get_config_value(cfg, "REVERSE_FRONT_CLEARANCE_M", 0.6))  # stop backing off a wall once the front is this clear
+
+    #------------------------------------------------#
+    #              Control Loop Timing               #
+    #------------------------------------------------#
+    
+    CONTROL_LOOP_MODE = str(get_config_value(cfg, "CONTROL_LOOP_MODE", "fixed"))  # "fixed" (sleep every step) or "lidar" (wake on each new scan)
+    CONTROL_LOOP_PERIOD_S = float(get_config_value(cfg, "CONTROL_LOOP_PERIOD_S", 0.05))  # step period in "fixed" mode
+    CONTROL_LOOP_OVERRUN = str(get_config_value(cfg, "CONTROL_LOOP_OVERRUN", "skip"))  # after a late step: "skip" missed deadlines or "catchup"
+    CONTROL_LOOP_TIMEOUT_S = float(get_config_value(cfg, "CONTROL_LOOP_TIMEOUT_S", 0.15))  # longest wait for a scan in "lidar" mode
+
+    #------------------------------------------------#
+    #              Planner Parameters                #
+    #------------------------------------------------#
+    
+    PLANNER = str(get_config_value(cfg, "PLANNER", "convolution"))  # name in algorithm.planners.PLANNERS: "convolution", "arc" or "gap"
+    ARC_CANDIDATES = int(get_config_value(cfg, "ARC_CANDIDATES", 15))  # steering arcs between -/+ STEERING_LIMIT
+    ARC_SPEEDS = list(get_config_value(cfg, "ARC_SPEEDS", [0.5, 0.8, 1.1]))  # candidate set_speed commands
+    ARC_HORIZON_M = float(get_config_value(cfg, "ARC_HORIZON_M", 2.0))  # arc length checked for collisions
+    ARC_STEP_M = float(get_config_value(cfg, "ARC_STEP_M", 0.04))  # footprint sampling step along each arc
+    ARC_RANGE_RES_M = float(get_config_value(cfg, "ARC_RANGE_RES_M", 0.05))  # range resolution of the arc tables
+    ARC_LOOKAHEAD_M = float(get_config_value(cfg, "ARC_LOOKAHEAD_M", 1.0))  # arc point reported as the target angle
+    ARC_MIN_TTC_S = float(get_config_value(cfg, "ARC_MIN_TTC_S", 0.8))  # minimum time to collision of an admissible arc
+    ARC_SPEED_WEIGHT = float(get_config_value(cfg, "ARC_SPEED_WEIGHT", 0.2))
+    ARC_STEER_WEIGHT = float(get_config_value(cfg, "ARC_STEER_WEIGHT", 0.1))
+    ARC_SMOOTH_WEIGHT = float(get_config_value(cfg, "ARC_SMOOTH_WEIGHT", 0.1))
+    GAP_DISPARITY_M = float(get_config_value(cfg, "GAP_DISPARITY_M", 0.3))  # jump between neighbouring bins seen as an obstacle edge
+    GAP_MARGIN_M = float(get_config_value(cfg, "GAP_MARGIN_M", 0.05))  # added to HITBOX_W when extending disparities
+    GAP_MIN_DISTANCE_M = float(get_config_value(cfg, "GAP_MIN_DISTANCE_M", 1.0))  # bins farther than this are free
+    GAP_MAX_RANGE_M = float(get_config_value(cfg, "GAP_MAX_RANGE_M", 6.0))  # distance assumed for bins without a return
+    GAP_AIM = str(get_config_value(cfg, "GAP_AIM", "deepest"))  # "deepest" point or "centre" of the widest gap
+
+    #------------------------------------------------#
+    #              Camera Parameters                 #
+    #------------------------------------------------#
+    
+    CAMERA_WORKER = bool(get_config_value(cfg, "CAMERA_WORKER", True))  # capture and analyse frames in a separate process
+    CAMERA_MAX_AGE_S = float(get_config_value(cfg, "CAMERA_MAX_AGE_S", 0.5))  # detections whose frame is older than this are ignored
+
+    #------------------------------------------------#
+    #              Instrumentation                   #
+    #------------------------------------------------#
+    
+    STAGE_TIMING = bool(get_config_value(cfg, "STAGE_TIMING", True))  # time each stage of run_step (see algorithm.stage_timer)
+    STAGE_TIMING_WINDOW = int(get_config_value(cfg, "STAGE_TIMING_WINDOW", 1000))  # samples kept per stage for the percentiles
 
 load_constants()
\ No newline at end of file
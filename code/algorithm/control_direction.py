@@ -1,13 +1,16 @@
 from algorithm.constants import *
-from scipy.signal import convolve
+from algorithm.lidar_bins import bin_angles_deg, bin_angles_rad, deg_to_bins
+import algorithm.constants as constants
+from algorithm.piecewise_linear import PiecewiseLinearMap
+from functools import lru_cache
 
 def get_nonzero_points_in_hitbox(distances):
     if distances is None:
         raise ValueError("Error: LiDAR input is None.")
 
-    x, y = convert_rad_to_xy(distances, np.arange(0, 360))
+    x, y = convert_rad_to_xy(distances, bin_angles_rad(len(distances)))
 
-    mask_hitbox =  (y > 0) & (np.abs(y) <= HITBOX_H1) & (np.abs(x) <= HITBOX_W) & (y * x != 0.0)
+    mask_hitbox =  (y > 0) & (np.abs(y) <= constants.HITBOX_H1) & (np.abs(x) <= constants.HITBOX_W) & (y * x != 0.0)
 
     return x[mask_hitbox], y[mask_hitbox]
 
@@ -18,62 +21,66 @@ def convert_rad_to_xy(distance, angle_rad):
     return x, y
 
 
-def calculate_hitbox_polar(w, h1, h2):
-    rad_raw_angles = np.linspace(0, 2*np.pi, num=360, endpoint=False)
-    
-    polar_coords = []
-    polar_angles = []
-    
-    for theta in rad_raw_angles:
-        c = np.cos(theta)
-        s = np.sin(theta)
-        
-        candidates = []
-        
-        if abs(c) > 1e-14:
-            x_side = w if c > 0 else -w
-            t_x = x_side / c
-            if t_x >= 0:
-                y_at_x = s * t_x
-                if -h2 <= y_at_x <= h1:
-                    candidates.append(t_x)
-        
-        if abs(s) > 1e-14:
-            y_side = h1 if s > 0 else -h2
-            t_y = y_side / s
-            if t_y >= 0:
-                x_at_y = c * t_y
-                
-                if -w <= x_at_y <= w:
-                    candidates.append(t_y)
-        
-        if len(candidates) == 0:
-            d = 0.0
-        else:
-            t = min(candidates)
-            d = t
-        
-        polar_coords.append(d)
-        polar_angles.append(theta - np.pi/2)
+def calculate_hitbox_polar(w, h1, h2, bins=360):
+    """
+    Distance from the lidar to the edge of the car footprint in every bin: the
+    rectangle spans +/- w sideways, h1 to the front and h2 to the rear.
+    """
+    rad_raw_angles = np.linspace(0, 2*np.pi, num=bins, endpoint=False)
+    c = np.cos(rad_raw_angles)
+    s = np.sin(rad_raw_angles)
+
+    # Intersection of each ray with the side edges (x = +/-w) and the front/rear edges
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_x = np.where(c > 0, w, -w) / c
+        t_y = np.where(s > 0, h1, -h2) / s
+
+        y_at_x = s * t_x
+        x_at_y = c * t_y
+
+    side_hit = (np.abs(c) > 1e-14) & (t_x >= 0) & (-h2 <= y_at_x) & (y_at_x <= h1)
+    front_hit = (np.abs(s) > 1e-14) & (t_y >= 0) & (-w <= x_at_y) & (x_at_y <= w)
+
+    polar_coords = np.minimum(np.where(side_hit, t_x, np.inf), np.where(front_hit, t_y, np.inf))
+    polar_coords[~(side_hit | front_hit)] = 0.0
+    polar_angles = rad_raw_angles - np.pi/2
     
     angle_indices = np.round(
-        np.array(polar_angles) / (2 * np.pi / 360)
-    ).astype(int) % 360
+        polar_angles / (2 * np.pi / bins)
+    ).astype(int) % bins
     
     new_d_linha = np.zeros_like(polar_coords)
     new_d_linha[angle_indices] = polar_coords
     
     return new_d_linha
 
-hitbox = calculate_hitbox_polar(HITBOX_W, HITBOX_H1, HITBOX_H2)
+@lru_cache(maxsize=None)
+def _cached_hitbox(w, h1, h2, bins):
+    hitbox = calculate_hitbox_polar(w, h1, h2, bins)
+    hitbox.flags.writeable = False
+    return hitbox
+
+def get_hitbox(bins: int = None) -> np.ndarray:
+    """
+    Footprint table for the current HITBOX_W/H1/H2 (read at call time, so a
+    config reload is picked up) and `bins` (LIDAR_BINS by default). Tables are
+    cached per geometry and resolution.
+    """
+    if bins is None:
+        bins = constants.LIDAR_BINS
+    return _cached_hitbox(constants.HITBOX_W, constants.HITBOX_H1, constants.HITBOX_H2, bins)
 
 def shrink_space(raw_lidar):
     free_space_shrink_mask = raw_lidar > 0
     shrink_space_lidar = np.copy(raw_lidar)
-    shrink_space_lidar[free_space_shrink_mask] -= hitbox[free_space_shrink_mask]
+    shrink_space_lidar[free_space_shrink_mask] -= get_hitbox(len(raw_lidar))[free_space_shrink_mask]
     
     return shrink_space_lidar
 
+def shrink_space_batch(raw_scans):
+    """shrink_space for an (N, bins) array of scans."""
+    return np.where(raw_scans > 0, raw_scans - get_hitbox(raw_scans.shape[1]), raw_scans)
+
 def compute_steer_from_lidar(raw_lidar):    
     filtreed_distances, filtreed_angles = convolution_filter(raw_lidar)
     target, _ = compute_angle(filtreed_distances, filtreed_angles, raw_lidar)
@@ -81,23 +88,46 @@ def compute_steer_from_lidar(raw_lidar):
 
     return steer, target
 
+def compute_steer_from_lidar_batch(raw_scans):
+    """compute_steer_from_lidar for an (N, bins) array of scans, returns (N,) steer and target angles."""
+    filtreed_distances, filtreed_angles = convolution_filter.batch(raw_scans)
+    target, _ = compute_angle_batch(filtreed_distances, filtreed_angles, raw_scans)
+    steer = compute_steer_batch(target)
+
+    return steer, target
+
+@lru_cache(maxsize=None)
+def corner_window_offsets(max_bins: int) -> np.ndarray:
+    """
+    Bin offsets of the left (row 0) and right (row 1) corner windows, farthest
+    first, followed by a 0 offset used as the "nothing found" sentinel.
+    """
+    offsets = np.arange(max_bins, -1, -1)
+    offsets = np.stack((offsets, -offsets))
+    offsets.flags.writeable = False
+    return offsets
+
 def compute_angle(filtred_distances, filtred_angles, raw_lidar):
+    bins = len(raw_lidar)
+    deg_per_bin = 360.0 / bins
+
     target_angle = filtred_angles[np.argmax(filtred_distances)]
+    target_bin = deg_to_bins(target_angle, bins)
     delta = 0
 
-    l_angle = 0
-    r_angle = 0
+    # Farthest bin offset (up to AVOID_CORNER_MAX_ANGLE) closer than AVOID_CORNER_MIN_DISTANCE
+    # on the left and on the right of the target, 0 if none
+    max_bins = deg_to_bins(AVOID_CORNER_MAX_ANGLE, bins)
+    close = raw_lidar[(target_bin + corner_window_offsets(max_bins)) % bins] < AVOID_CORNER_MIN_DISTANCE
+    close[:, -1] = True  # offset 0 sentinel: no close point found
+    l_first, r_first = np.argmax(close, axis=1).tolist()
+    l_angle = max_bins - l_first
+    r_angle = max_bins - r_first
     
-    for index in range(AVOID_CORNER_MAX_ANGLE, 0, -1):
-        l_dist = raw_lidar[(target_angle + index) % 360]
-        r_dist = raw_lidar[(target_angle - index) % 360]
+    # Bin offsets to degrees
+    l_angle *= deg_per_bin
+    r_angle *= deg_per_bin
 
-        if l_angle == 0 and l_dist < AVOID_CORNER_MIN_DISTANCE:
-            l_angle = index
-
-        if r_angle == 0 and r_dist < AVOID_CORNER_MIN_DISTANCE:
-            r_angle = index
-    
     if l_angle == r_angle:
         delta = 0
     elif l_angle > r_angle:
@@ -113,77 +143,108 @@ def compute_angle(filtred_distances, filtred_angles, raw_lidar):
     
     return target_angle, delta
 
-def compute_steer(alpha):
-    return np.sign(alpha) * lerp(np.abs(alpha), STEER_FACTOR)
-
-def convolution_filter(distances):
-    shift = FIELD_OF_VIEW_DEG // 2
-
-    # Create a very peaked kernel with extremely strong center weighting
-    # This will make obstacles in the center appear much closer
-    
-    # Option 1: Extremely sharp Gaussian
-    kernel_size = CONVOLUTION_SIZE
-    center = kernel_size // 2
-    
-    # x ranges from -center to +center
-    x = np.arange(kernel_size) - center
-    
-    # Using a very small sigma for an extremely sharp peak
-    sigma = kernel_size #/ 12.0  # Much smaller sigma for sharper peak
-    kernel = np.exp(-0.5 * (x / sigma) ** 2)
-    
-    # Option 2: Manual peaked distribution (uncomment to use)
-    # Define a highly peaked distribution with center boosted by a large factor
-    # kernel = np.ones(CONVOLUTION_SIZE)
-    # center_idx = CONVOLUTION_SIZE // 2
-    # center_width = CONVOLUTION_SIZE // 8  # How many elements get the boost
-    # boost_factor = 100000  # Extreme boosting factor
-    
-    # Apply center boost - this creates an extreme peak
-    # for i in range(center_idx - center_width//2, center_idx + center_width//2 + 1):
-    #     if 0 <= i < CONVOLUTION_SIZE:
-    #         kernel[i] = boost_factor
-    
-    # Option 3: Simplified extreme center boost (currently in use)
-    # Create a kernel with extreme center boosting
-    kernel = np.ones(CONVOLUTION_SIZE)
-    center_idx = CONVOLUTION_SIZE // 2 -20
-    
-    # Apply sharp center peak (just 1-3 elements)
-    peak_width = 35  # Adjust based on how narrow you want the peak
-    peak_start = center_idx - peak_width // 2
-    peak_end = peak_start + peak_width
-    
-    # Set extreme weight for the center elements
-    kernel[peak_start:peak_end] = 2000  # Extreme value to make obstacles appear much closer
-    
-    # Normalize the kernel so weights sum to 1
-    kernel /= kernel.sum()
-
-    # Roll angles so the "front" starts around the middle
-    angles = np.arange(0, 360)
-    angles = np.roll(angles, shift)
-
-    # Roll distances likewise
-    distances = np.roll(distances, shift)
-    
-    # Convolve using our custom kernel
-    distances = convolve(distances, kernel, mode="same")
-
-    # Return only the portion corresponding to FIELD_OF_VIEW_DEG
-    return distances[:FIELD_OF_VIEW_DEG], angles[:FIELD_OF_VIEW_DEG]
-
-def lerp(value: float, factor: np.ndarray) -> np.ndarray:
-    indices = np.nonzero(value < factor[:, 0])[0]
-
-    if len(indices) == 0:
-        return factor[-1, 1]
-
-    index = indices[0]
+def compute_angle_batch(filtred_distances, filtred_angles, raw_scans):
+    """
+    compute_angle for N scans at once: `filtred_distances` and `raw_scans` are
+    (N, fov_bins) and (N, bins), `filtred_angles` is shared by all scans.
+    Returns (N,) target angles and deltas.
+    """
+    count, bins = raw_scans.shape
+    deg_per_bin = 360.0 / bins
+
+    target_angle = filtred_angles[np.argmax(filtred_distances, axis=1)]
+    target_bin = np.round(target_angle * (bins / 360.0)).astype(np.intp)
+
+    max_bins = deg_to_bins(AVOID_CORNER_MAX_ANGLE, bins)
+    offsets = corner_window_offsets(max_bins).ravel()
+    windows = np.take_along_axis(raw_scans, (target_bin[:, None] + offsets) % bins, axis=1)
+    close = windows.reshape(count, 2, max_bins + 1) < AVOID_CORNER_MIN_DISTANCE
+    close[:, :, -1] = True
+    first = np.argmax(close, axis=2)
+    l_angle = (max_bins - first[:, 0]) * deg_per_bin
+    r_angle = (max_bins - first[:, 1]) * deg_per_bin
+
+    delta = np.where(l_angle > r_angle,
+                     -AVOID_CORNER_SCALE_FACTOR * (AVOID_CORNER_MAX_ANGLE - r_angle),
+                     +AVOID_CORNER_SCALE_FACTOR * (AVOID_CORNER_MAX_ANGLE - l_angle))
+    delta[l_angle == r_angle] = 0
+
+    target_angle = target_angle + delta
+    target_angle = (target_angle + 180) % 360 - 180
 
-    delta = factor[index] - factor[index - 1]
-    scale = (value - factor[index - 1, 0]) / delta[0]
+    return target_angle, delta
 
-    return factor[index - 1, 1] + scale * delta[1]
+steer_map = PiecewiseLinearMap("STEER_FACTOR")
 
+def compute_steer(alpha):
+    return np.sign(alpha) * steer_map(np.abs(alpha))
+
+compute_steer_batch = compute_steer  # steer_map takes arrays as well
+
+class ConvolutionFilter:
+    """
+    Smooths the front of the scan with a fixed kernel, as a circular convolution.
+
+    The kernel, its FFT, the bin gather table and the output arrays depend only
+    on the number of bins, CONVOLUTION_SIZE and FIELD_OF_VIEW_DEG; they are built
+    on first use and rebuilt whenever the scan size changes or load_constants runs.
+    """
+
+    def __init__(self):
+        self._key = None
+
+    def _build(self, bins: int):
+        scale = bins / 360.0  # kernel and FOV sizes are given in degrees
+        convolution_size = constants.CONVOLUTION_SIZE
+        field_of_view = constants.FIELD_OF_VIEW_DEG
+
+        shift = deg_to_bins(field_of_view // 2, bins)
+        fov_bins = deg_to_bins(field_of_view, bins)
+
+        # Flat kernel with an extreme peak so obstacles near the centre appear much closer
+        # (with the default sizes the peak slice starts before the kernel and is empty)
+        kernel_size = 2 * int(round((convolution_size // 2) * scale)) + 1
+        kernel = np.ones(kernel_size)
+        center_idx = kernel_size // 2 - int(round(20 * scale))
+        peak_width = int(round(35 * scale))
+        peak_start = center_idx - peak_width // 2
+        kernel[peak_start:peak_start + peak_width] = 2000
+        kernel /= kernel.sum()
+
+        # Place the kernel centre at index 0 so the FFT product is a centred circular convolution
+        wrapped = np.zeros(bins)
+        wrapped[(np.arange(kernel_size) - kernel_size // 2) % bins] = kernel
+        self._kernel_fft = np.fft.rfft(wrapped)
+
+        # The front view starts `shift` bins before bin 0: out[i] = smoothed[i - shift]
+        self._gather = (np.arange(fov_bins) - shift) % bins
+        self._angles = bin_angles_deg(bins)[self._gather]
+        self._angles.flags.writeable = False
+        self._distances = np.zeros(fov_bins)
+
+        self._key = (bins, constants.CONFIG_GENERATION)
+
+    def __call__(self, distances: np.ndarray):
+        """
+        Returns (distances, angles_deg) of the smoothed field of view.
+        The distance array is reused by the next call; copy it to keep it.
+        """
+        bins = len(distances)
+        if self._key != (bins, constants.CONFIG_GENERATION):
+            self._build(bins)
+
+        smoothed = np.fft.irfft(np.fft.rfft(distances) * self._kernel_fft, n=bins)
+        np.take(smoothed, self._gather, out=self._distances)
+        return self._distances, self._angles
+
+    def batch(self, scans: np.ndarray):
+        """Filters an (N, bins) array of scans, returns new (N, fov_bins) distances and the shared angles."""
+        bins = scans.shape[1]
+        if self._key != (bins, constants.CONFIG_GENERATION):
+            self._build(bins)
+
+        smoothed = np.fft.irfft(np.fft.rfft(scans, axis=1) * self._kernel_fft, n=bins, axis=1)
+        return smoothed[:, self._gather], self._angles
+
+
+convolution_filter = ConvolutionFilter()
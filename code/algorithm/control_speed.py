@@ -1,39 +1,143 @@
 from algorithm.constants import *
+from algorithm.lidar_bins import sector_indices, bin_angles_rad
+import algorithm.constants as constants
 import numpy as np
 
-def compute_speed(convoluted_lidar, target_angle: float):
-    MIN_SPEED = 0.5  # Minimum speed for curves
-    MAX_SPEED = 1.1  # Maximum speed for straight paths
-    STOP_DISTANCE = 0.30  # Distance in cm to stop completely
-    SLOW_DISTANCE = 0.80  # Distance in cm to start slowing down
-   
-    # Check frontal distance from LiDAR
-    # Assuming front is around indices 350-359 and 0-10
-    front_indices = list(range(350, 360)) + list(range(0, 11))
-    front_data = [convoluted_lidar[i] for i in front_indices if convoluted_lidar[i] > 0]
-    
-    # Calculate the average frontal distance if we have valid readings
-    if len(front_data) > 0:
-        front_distance = sum(front_data) / len(front_data)
-    else:
-        front_distance = float('inf')  # No valid readings means no obstacles detected
-    
+MIN_SPEED = 0.5  # Minimum speed for curves
+MAX_SPEED = 1.1  # Maximum speed for straight paths
+STOP_DISTANCE = 0.30  # Distance in cm to stop completely
+SLOW_DISTANCE = 0.80  # Distance in cm to start slowing down
+ANGLE_DECAY_FACTOR = 0.03
+
+SPEED_GOVERNORS = ("ttc", "front")
+
+def front_distance(lidar) -> float:
+    """Mean of the valid bins within +/- 10 degrees of the front, inf if there are none."""
+    front_data = lidar[sector_indices(0, 10, len(lidar))]
+    valid = front_data > 0
+    valid_count = np.count_nonzero(valid)
+    if valid_count == 0:
+        return float('inf')  # No valid readings means no obstacles detected
+    return float(np.sum(front_data, where=valid) / valid_count)
+
+def compute_speed(convoluted_lidar, target_angle: float, front_distance_m: float = None):
+    """
+    `front_distance_m` is front_distance of the raw scan when the caller has
+    already computed it this step; it is then taken from the bumper (minus
+    HITBOX_H1) instead of being recomputed from `convoluted_lidar`.
+    """
     # First calculate speed based on angle
     angle_magnitude = abs(target_angle)
-    decay_factor = 0.03
     
-    speed = MAX_SPEED * np.exp(-decay_factor * angle_magnitude)
+    speed = MAX_SPEED * np.exp(-ANGLE_DECAY_FACTOR * angle_magnitude)
     speed = max(speed, MIN_SPEED)
     speed = min(speed, MAX_SPEED)
-    
+
+    # With the TTC governor, obstacles are handled by SpeedGovernor along the commanded arc
+    if constants.SPEED_GOVERNOR != "front":
+        return speed
+
     # Then adjust speed based on frontal distance
-    if front_distance <= STOP_DISTANCE:
+    if front_distance_m is None:
+        front_distance_m = front_distance(convoluted_lidar)
+    else:
+        front_distance_m -= constants.HITBOX_H1
+    if front_distance_m <= STOP_DISTANCE:
         # Too close to wall, stop completely
         return 0.0
-    elif front_distance < SLOW_DISTANCE:
+    elif front_distance_m < SLOW_DISTANCE:
         # Gradually slow down as we approach obstacles
         # Linear scaling between full calculated speed and zero
-        distance_factor = (front_distance - STOP_DISTANCE) / (SLOW_DISTANCE - STOP_DISTANCE)
+        distance_factor = (front_distance_m - STOP_DISTANCE) / (SLOW_DISTANCE - STOP_DISTANCE)
         speed *= distance_factor
     
-    return speed
\ No newline at end of file
+    return speed
+
+def compute_speed_batch(convoluted_scans, target_angles):
+    """compute_speed for an (N, bins) array of scans and their (N,) target angles."""
+    speed = MAX_SPEED * np.exp(-ANGLE_DECAY_FACTOR * np.abs(target_angles))
+    speed = np.clip(speed, MIN_SPEED, MAX_SPEED)
+
+    if constants.SPEED_GOVERNOR != "front":
+        return speed
+
+    front_data = convoluted_scans[:, sector_indices(0, 10, convoluted_scans.shape[1])]
+    valid = front_data > 0
+    valid_count = np.count_nonzero(valid, axis=1)
+
+    front_distances = np.full(len(front_data), np.inf)
+    has_valid = valid_count > 0
+    front_distances[has_valid] = (np.sum(front_data, axis=1, where=valid)[has_valid]
+                                 / valid_count[has_valid])
+
+    distance_factor = (front_distances - STOP_DISTANCE) / (SLOW_DISTANCE - STOP_DISTANCE)
+    speed = np.where(front_distances < SLOW_DISTANCE, speed * distance_factor, speed)
+    speed[front_distances <= STOP_DISTANCE] = 0.0
+
+    return speed
+
+
+class SpeedGovernor:
+    """
+    Caps the planned speed so the car can always brake before the first
+    obstacle on the arc it is commanded to drive.
+
+    The swept path is the band of HITBOX_W + GOVERNOR_MARGIN_M on each side
+    of the arc set by the steering angle. Every return inside it gets the
+    arc length the front bumper covers before reaching it; obstacles are
+    static, so that free path closes at the measured wheel speed, which gives
+    the per-bin time to collision. The speed is then limited to what stops
+    the car STOP_DISTANCE short of the nearest one after GOVERNOR_REACTION_S
+    at BRAKE_DECEL_MPS2, and lowered further while the time to collision is
+    under GOVERNOR_MIN_TTC_S. Returns already inside the hitbox are ignored.
+    `planned_speed` and the returned speed are set_speed commands, converted
+    with SPEED_COMMAND_MPS to compare them with these limits (m/s);
+    `wheel_speed` is the measured speed in m/s.
+    """
+
+    def __init__(self):
+        self.free_path = float('inf')  # arc length to the nearest obstacle on the path (m)
+        self.time_to_collision = float('inf')  # at the measured wheel speed (s)
+        self.safe_speed = float('inf')  # highest speed that can still stop in time (m/s)
+        self.bin_free_path = None  # per bin, inf where the bin is off the path
+        self.bin_ttc = None
+
+    def __call__(self, raw_lidar: np.ndarray, steer_deg: float, wheel_speed: float, planned_speed: float) -> float:
+        if constants.SPEED_GOVERNOR not in SPEED_GOVERNORS:
+            raise ValueError(f"Unknown speed governor '{constants.SPEED_GOVERNOR}', expected one of {SPEED_GOVERNORS}")
+        if constants.SPEED_GOVERNOR != "ttc" or planned_speed <= 0:
+            return planned_speed  # the wheel encoder has no direction, reversing is left as planned
+
+        angles = bin_angles_rad(len(raw_lidar))
+        forward = raw_lidar * np.cos(angles)
+        side = raw_lidar * np.sin(angles)
+
+        # Offset of each return from the arc and arc length driven until the car is level with it
+        curvature = np.tan(np.radians(steer_deg)) / constants.WHEELBASE
+        if abs(curvature) < 1e-6:
+            offset = np.abs(side)
+            along = forward
+        else:
+            radius = 1.0 / curvature
+            offset = np.abs(np.hypot(forward, side - radius) - abs(radius))
+            along = abs(radius) * np.arctan2(forward, (radius - side) * np.sign(radius))
+
+        inside_hitbox = ((forward >= -constants.HITBOX_H2) & (forward <= constants.HITBOX_H1)
+                         & (np.abs(side) <= constants.HITBOX_W))
+        on_path = ((raw_lidar > 0) & ~inside_hitbox & (along > 0)
+                   & (offset <= constants.HITBOX_W + constants.GOVERNOR_MARGIN_M))
+
+        self.bin_free_path = np.where(on_path, np.maximum(along - constants.HITBOX_H1, 0.0), np.inf)
+        self.bin_ttc = self.bin_free_path / wheel_speed if wheel_speed > 0 else np.full(len(raw_lidar), np.inf)
+        self.free_path = float(self.bin_free_path.min())
+        self.time_to_collision = float(self.bin_ttc.min())
+
+        # v * reaction + v^2 / (2 * decel) = free path left before STOP_DISTANCE
+        decel, reaction = constants.BRAKE_DECEL_MPS2, constants.GOVERNOR_REACTION_S
+        room = max(self.free_path - STOP_DISTANCE, 0.0)
+        self.safe_speed = decel * (np.sqrt(reaction ** 2 + 2 * room / decel) - reaction) if np.isfinite(room) else float('inf')
+
+        speed = min(planned_speed * constants.SPEED_COMMAND_MPS, self.safe_speed)
+        if self.time_to_collision < constants.GOVERNOR_MIN_TTC_S:
+            speed = min(speed, self.free_path / constants.GOVERNOR_MIN_TTC_S)
+        return float(speed / constants.SPEED_COMMAND_MPS)
@@ -0,0 +1,117 @@
+import numpy as np
+
+import algorithm.constants as constants
+from algorithm.control_direction import compute_steer, shrink_space
+from algorithm.control_speed import compute_speed
+from algorithm.lidar_bins import bin_angles_deg, deg_to_bins
+from algorithm.planners import Planner, PlanResult, register_planner
+
+GAP_AIMS = ("deepest", "centre")
+
+
+def extend_disparities(distances: np.ndarray, deg_per_bin: float, half_width: float, threshold: float) -> np.ndarray:
+    """
+    Disparity extension: wherever two neighbouring bins differ by more than
+    `threshold`, the closer distance is copied over the bins the car half
+    width subtends at that distance, on the side of the farther bin.
+
+    Every extended range is covered by two power-of-two blocks written into a
+    sparse table, which is then pushed down one level at a time, so the cost
+    is O(bins * log(longest extension)) however many edges the scan has.
+    """
+    left, right = distances[:-1], distances[1:]
+    edges = np.flatnonzero(np.abs(right - left) > threshold)
+    if len(edges) == 0:
+        return distances
+
+    bins = len(distances)
+    closer = np.minimum(left[edges], right[edges])
+    spans = np.ceil(np.degrees(np.arctan2(half_width, np.maximum(closer, 0.0))) / deg_per_bin).astype(np.intp)
+
+    # Extend after the edge if the left bin is the closer one, before it otherwise
+    first = np.where(left[edges] < right[edges], edges + 1, edges + 1 - spans)
+    last = np.minimum(first + spans, bins)
+    first = np.maximum(first, 0)
+    lengths = last - first
+    keep = lengths > 0
+    first, last, lengths, closer = first[keep], last[keep], lengths[keep], closer[keep]
+    if len(first) == 0:
+        return distances
+
+    # table[k, p] is the extension over bins [p, p + 2**k)
+    levels = np.frexp(lengths)[1] - 1
+    block = np.left_shift(1, levels)
+    table = np.full((int(levels.max()) + 1, bins), np.inf)
+    np.minimum.at(table, (levels, first), closer)
+    np.minimum.at(table, (levels, last - block), closer)
+
+    for k in range(len(table) - 1, 0, -1):
+        half = 1 << (k - 1)
+        np.minimum(table[k - 1], table[k], out=table[k - 1])
+        np.minimum(table[k - 1, half:], table[k, :-half], out=table[k - 1, half:])
+
+    return np.minimum(distances, table[0])
+
+
+def find_gaps(free: np.ndarray):
+    """Run-length encodes `free`: start (inclusive) and end (exclusive) index of every run of True."""
+    changes = np.diff(np.concatenate(([False], free, [False])).astype(np.int8))
+    return np.flatnonzero(changes == 1), np.flatnonzero(changes == -1)
+
+
+@register_planner("gap")
+class FollowTheGapPlanner(Planner):
+    """
+    Follow-the-gap over the front field of view of the shrink_space'd scan.
+
+    Close obstacles are widened by disparity extension, the widest run of
+    bins farther than GAP_MIN_DISTANCE_M is the gap and the car aims at its
+    deepest point or its centre (GAP_AIM). Bins without a return count as
+    GAP_MAX_RANGE_M. Every step is vectorized; if no bin is free the car
+    heads for the farthest one.
+    """
+
+    def __init__(self):
+        self._key = None
+
+    def prepare(self, bins: int):
+        if self._key == (bins, constants.CONFIG_GENERATION):
+            return
+
+        if constants.GAP_AIM not in GAP_AIMS:
+            raise ValueError(f"Unknown gap aim '{constants.GAP_AIM}', expected one of {GAP_AIMS}")
+
+        # Front view from -FOV/2 to +FOV/2, laid out as in ConvolutionFilter
+        shift = deg_to_bins(constants.FIELD_OF_VIEW_DEG // 2, bins)
+        fov_bins = deg_to_bins(constants.FIELD_OF_VIEW_DEG, bins)
+        self._gather = (np.arange(fov_bins) - shift) % bins
+        self._angles = (bin_angles_deg(bins)[self._gather] + 180.0) % 360.0 - 180.0
+        self._deg_per_bin = 360.0 / bins
+
+        self._key = (bins, constants.CONFIG_GENERATION)
+
+    def plan(self, raw_lidar: np.ndarray, front_distance_m: float = None) -> PlanResult:
+        self.prepare(len(raw_lidar))
+
+        shrinked = shrink_space(raw_lidar)
+        front = shrinked[self._gather]
+        front[raw_lidar[self._gather] <= 0] = constants.GAP_MAX_RANGE_M
+
+        extended = extend_disparities(front, self._deg_per_bin,
+                                      constants.HITBOX_W + constants.GAP_MARGIN_M, constants.GAP_DISPARITY_M)
+
+        starts, ends = find_gaps(extended > constants.GAP_MIN_DISTANCE_M)
+        if len(starts) == 0:
+            target = int(np.argmax(extended))
+        else:
+            widest = int(np.argmax(ends - starts))
+            start, end = int(starts[widest]), int(ends[widest])
+            if constants.GAP_AIM == "centre":
+                target = (start + end - 1) // 2
+            else:
+                # Deepest bin of the gap, the one nearest its centre on ties
+                deepest = np.flatnonzero(extended[start:end] == extended[start:end].max()) + start
+                target = int(deepest[np.argmin(np.abs(2 * deepest - (start + end - 1)))])
+
+        target_angle = float(self._angles[target])
+        return PlanResult(compute_steer(target_angle), target_angle, compute_speed(shrinked, target_angle, front_distance_m))
@@ -1,14 +1,59 @@
+import time
 import numpy as np
 from abc import ABC, abstractmethod
 from typing import List, Tuple
 from enum import Enum
+from dataclasses import dataclass
+from algorithm.constants import LIDAR_BINS
+
+@dataclass
+class LidarFrame:
+    """One published lidar scan and its metadata."""
+    seq: int                # monotonically increasing, 0 means no scan yet
+    t_start: float          # time.time() when the scan started
+    t_end: float            # time.time() when the scan was published
+    valid_bins: int         # number of non-zero distances
+    distances: np.ndarray
+    stamps: np.ndarray = None  # time.time() each bin was measured (0 where empty), if known
+    confidence: np.ndarray = None  # per-bin confidence in [0, 1] from the measurement quality, if known
+
+@dataclass
+class CameraDetection:
+    """Colour analysis of one camera frame."""
+    seq: int                # monotonically increasing, 0 means no frame analysed yet
+    t_capture: float        # time.time() when the frame was captured
+    t_done: float           # time.time() when its analysis was published
+    status: Enum            # DetectionStatus
+    avg_r: float            # mean column of the red / green pixels, -1 if none
+    avg_g: float
+    ratio_r: float          # percentage of the frame that is red / green
+    ratio_g: float
 
 class LiDarInterface(ABC):
     @abstractmethod
     def get_lidar_data(self) -> np.array:
-        """Returns a NumPy array of shape(360,) where index encodes angle and value encodes distance."""
+        """Returns a NumPy array of shape(LIDAR_BINS,) where index encodes angle and value encodes distance."""
         pass
 
+    def get_lidar_frame(self) -> LidarFrame:
+        """
+        Returns the latest scan with its sequence number and timestamps.
+        Sources without frame metadata treat every call as a new scan.
+        """
+        self._frame_seq = getattr(self, '_frame_seq', 0) + 1
+        now = time.time()
+        distances = self.get_lidar_data()
+        return LidarFrame(self._frame_seq, now, now, int(np.count_nonzero(distances)), distances)
+
+    def wait_for_lidar_frame(self, after_seq: int, timeout: float) -> bool:
+        """
+        Blocks until a frame newer than `after_seq` is available or `timeout`
+        seconds elapse, and returns True if one is. Sources that cannot signal
+        new scans just wait for the timeout, every call being a new scan.
+        """
+        time.sleep(timeout)
+        return True
+
 class UltrasonicInterface(ABC):
     @abstractmethod
     def get_ultrasonic_data(self) -> float:
@@ -38,6 +83,18 @@ class CameraInterface(ABC):
         """Returns the camera resolution as (width, height)."""
         pass
 
+    def get_detection(self) -> CameraDetection:
+        """
+        Returns the latest colour analysis. Cameras analysed by a background
+        worker return its newest result; others capture and analyse a frame now.
+        """
+        from algorithm.control_camera import extract_info  # OpenCV is only needed by the cameras
+
+        self._detection_seq = getattr(self, '_detection_seq', 0) + 1
+        t_capture = time.time()
+        avg_r, avg_g, ratio_r, ratio_g, status = extract_info(self.get_camera_frame(), *self.get_resolution())[:5]
+        return CameraDetection(self._detection_seq, t_capture, time.time(), status, avg_r, avg_g, ratio_r, ratio_g)
+
 class SteerInterface(ABC):
     @abstractmethod
     def set_steering_angle(self, angle: float):
@@ -71,11 +128,11 @@ class ConsoleInterface(ABC):
 class MockLiDarInterface(LiDarInterface):
     def get_lidar_data(self) -> np.array:
         """
-        Returns a NumPy array of 360 constant values
+        Returns a NumPy array of LIDAR_BINS constant values
         for quick testing. You could also randomize these
         values if you want to simulate changing distances.
         """
-        return np.ones(360)
+        return np.ones(LIDAR_BINS)
 
 class MockUltrasonicInterface(UltrasonicInterface):
     def get_ultrasonic_data(self) -> float:
@@ -0,0 +1,42 @@
+import numpy as np
+from functools import lru_cache
+
+# Precomputed angle tables for a scan of `bins` equally spaced bins, bin 0 pointing
+# forward. They are cached per resolution and read-only, so callers can index with
+# them every step without rebuilding anything.
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+@lru_cache(maxsize=None)
+def bin_angles_deg(bins: int) -> np.ndarray:
+    """Angle (degrees) of every bin."""
+    return _frozen(np.arange(bins) * (360.0 / bins))
+
+
+@lru_cache(maxsize=None)
+def bin_angles_rad(bins: int) -> np.ndarray:
+    """Angle (radians) of every bin."""
+    return _frozen(np.radians(bin_angles_deg(bins)))
+
+
+def deg_to_bins(angle_deg: float, bins: int) -> int:
+    """Number of bins spanning `angle_deg` (or index of the bin at that angle)."""
+    return int(round(angle_deg * bins / 360.0))
+
+
+@lru_cache(maxsize=None)
+def sector_indices(center_deg: float, half_width_deg: float, bins: int) -> np.ndarray:
+    """Indices of the bins within +/- half_width_deg of center_deg, both ends included."""
+    first = deg_to_bins(center_deg - half_width_deg, bins)
+    last = deg_to_bins(center_deg + half_width_deg, bins)
+    return _frozen(np.arange(first, last + 1) % bins)
+
+
+@lru_cache(maxsize=None)
+def span_indices(start_deg: float, end_deg: float, bins: int) -> np.ndarray:
+    """Indices of the bins from start_deg (included) to end_deg (excluded), like a slice of a 360 bin scan."""
+    return _frozen(np.arange(deg_to_bins(start_deg, bins), deg_to_bins(end_deg, bins)) % bins)
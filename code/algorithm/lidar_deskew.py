@@ -0,0 +1,67 @@
+import numpy as np
+
+from algorithm.lidar_bins import bin_angles_rad
+
+# Below this yaw rate (rad/s) the motion during a scan is treated as a straight line
+_STRAIGHT_YAW_RATE = 1e-6
+
+
+def deskew_scan(distances: np.ndarray, stamps: np.ndarray, t_ref: float,
+                speed: float, steer_deg: float, wheelbase: float) -> np.ndarray:
+    """
+    Reprojects every return of a scan into the vehicle frame at `t_ref`.
+
+    Each bin was measured at its own time (`stamps`, 0 where unknown) while
+    the car kept moving, so the scan is skewed by up to one rotation of
+    motion. The car is assumed to follow a constant-speed, constant-steering
+    arc (kinematic bicycle model) over the scan: every point is moved by the
+    displacement accumulated between its stamp and `t_ref`, then re-binned,
+    keeping the nearest return when several land in the same bin.
+
+    Returns a new array; `distances` is returned untouched when there is
+    nothing to correct.
+    """
+    if stamps is None or speed == 0.0:
+        return distances
+
+    valid = (distances > 0) & (stamps > 0)
+    if not valid.any():
+        return distances
+
+    bins = len(distances)
+    d = distances[valid]
+    angles = bin_angles_rad(bins)[valid]
+    dt = t_ref - stamps[valid]
+
+    # Pose change from each measurement to t_ref; positive yaw turns toward positive angles
+    yaw_rate = speed * np.tan(np.radians(steer_deg)) / wheelbase
+    if abs(yaw_rate) > _STRAIGHT_YAW_RATE:
+        yaw = yaw_rate * dt
+        radius = speed / yaw_rate
+        forward = radius * np.sin(yaw)
+        side = radius * (1.0 - np.cos(yaw))
+    else:
+        yaw = np.zeros_like(dt)
+        forward = speed * dt
+        side = yaw
+
+    # Point relative to the new position, then rotated into the new heading
+    rel_forward = d * np.cos(angles) - forward
+    rel_side = d * np.sin(angles) - side
+    cos_yaw, sin_yaw = np.cos(yaw), np.sin(yaw)
+    new_forward = cos_yaw * rel_forward + sin_yaw * rel_side
+    new_side = cos_yaw * rel_side - sin_yaw * rel_forward
+
+    new_distances = np.hypot(new_forward, new_side)
+    new_bins = np.round(np.arctan2(new_side, new_forward) * (bins / (2 * np.pi))).astype(np.intp) % bins
+
+    # Bins nothing lands in keep the corrected range of their own return
+    out = np.zeros_like(distances)
+    out[valid] = new_distances
+
+    nearest = np.full(bins, np.inf)
+    np.minimum.at(nearest, new_bins, new_distances)
+    landed = np.isfinite(nearest)
+    out[landed] = nearest[landed]
+
+    return out
@@ -0,0 +1,300 @@
+import numpy as np
+
+# Highest quality value reported by the RPLidar (6-bit field)
+MAX_QUALITY = 63.0
+
+BIN_AGGREGATIONS = ("last", "nearest", "mean", "median")
+
+TEMPORAL_FILTERS = ("none", "median", "ema")
+
+
+class TemporalScanFilter:
+    """
+    Fuses the last `depth` revolutions bin by bin.
+
+    Each update writes the bins measured since the previous one into the
+    current row of a preallocated (depth, bins) ring (NaN marks a bin
+    without a fresh return); the ring only moves on to a new row at the end
+    of a revolution, so partial updates (stream mode publishes every sector
+    or serial chunk) accumulate into one row instead of each taking one.
+    The per-bin median of the ring is computed with one in-place sort, and
+    every intermediate result is written into buffers allocated up front.
+    "median" publishes that median; "ema" blends each fresh return into an
+    exponential average after clamping returns further than `outlier_m`
+    from the median onto it. Bins with no return in the whole ring are 0.
+    """
+
+    def __init__(self, bins: int, depth: int = 5, strategy: str = "median", alpha: float = 0.5, outlier_m: float = 0.5):
+        if strategy not in TEMPORAL_FILTERS[1:]:
+            raise ValueError(f"Unknown temporal filter '{strategy}', expected one of {TEMPORAL_FILTERS[1:]}")
+
+        self.bins = bins
+        self.depth = depth
+        self.strategy = strategy
+        self.alpha = alpha
+        self.outlier_m = outlier_m
+
+        self._ring = np.full((depth, bins), np.nan)
+        self._row = 0
+        self._new_row = False
+
+        # Work buffers: update() writes into these and allocates nothing
+        self._sorted = np.empty((bins, depth))  # ring transposed, each bin's samples sorted in its row
+        self._sorted_flat = self._sorted.reshape(-1)
+        self._column_starts = np.arange(bins, dtype=np.intp) * depth
+        self._valid = np.zeros((bins, depth), dtype=np.intp)  # intp so summing it needs no cast buffer
+        self._counts = np.zeros(bins, dtype=np.intp)
+        self._low = np.zeros(bins, dtype=np.intp)
+        self._high = np.zeros(bins, dtype=np.intp)
+        self._empty = np.zeros(bins, dtype=bool)
+        self._measured = np.zeros(bins, dtype=bool)
+        self._outlier = np.zeros(bins, dtype=bool)
+        self._first = np.zeros(bins, dtype=bool)
+        self._blend = np.zeros(bins, dtype=bool)
+        self._delta = np.zeros(bins)
+        self._median = np.zeros(bins)
+        self._sample = np.zeros(bins)
+        self._estimate = np.zeros(bins)
+        self._fused = np.zeros(bins)
+
+    def reset(self):
+        self._ring.fill(np.nan)
+        self._new_row = False
+        self._estimate.fill(0.0)
+
+    def update(self, distances: np.ndarray, fresh: np.ndarray, end_of_revolution: bool = True) -> np.ndarray:
+        """
+        Adds the bins flagged in `fresh` to the current revolution and returns
+        the fused scan; `end_of_revolution` closes the revolution afterwards.
+        The returned array is reused by the next call; copy it to keep it.
+        """
+        # The previous update closed a revolution: start a new row over the oldest one
+        if self._new_row:
+            self._row = (self._row + 1) % self.depth
+            self._ring[self._row].fill(np.nan)
+        self._new_row = end_of_revolution
+
+        measured = self._measured
+        np.greater(distances, 0.0, out=measured)
+        np.logical_and(measured, fresh, out=measured)
+        np.copyto(self._ring[self._row], distances, where=measured)
+
+        # Per-bin median over the ring: NaNs sort last, so the k valid samples lead each row of _sorted
+        median, counts, low, high, empty = self._median, self._counts, self._low, self._high, self._empty
+        np.copyto(self._sorted, self._ring.T)
+        self._sorted.sort(axis=1)
+        np.equal(self._sorted, self._sorted, out=self._valid)
+        np.sum(self._valid, axis=1, out=counts)
+        np.subtract(counts, 1, out=low)
+        np.floor_divide(low, 2, out=low)
+        np.maximum(low, 0, out=low)
+        np.floor_divide(counts, 2, out=high)
+        np.add(low, self._column_starts, out=low)
+        np.add(high, self._column_starts, out=high)
+        np.take(self._sorted_flat, low, out=median, mode="clip")  # "raise" would buffer `out`
+        np.take(self._sorted_flat, high, out=self._delta, mode="clip")
+        median += self._delta
+        median *= 0.5
+        np.equal(counts, 0, out=empty)
+        np.copyto(median, 0.0, where=empty)
+
+        if self.strategy == "median":
+            return median
+
+        # Fresh returns, clamped onto the median when further than outlier_m from it
+        sample, delta, outlier = self._sample, self._delta, self._outlier
+        sample.fill(np.nan)
+        np.copyto(sample, distances, where=measured)
+        np.subtract(sample, median, out=delta)
+        np.abs(delta, out=delta)
+        np.greater(delta, self.outlier_m, out=outlier)  # False where the sample is NaN
+        np.copyto(sample, median, where=outlier)
+
+        estimate, first, blend = self._estimate, self._first, self._blend
+        np.equal(estimate, 0.0, out=first)
+        np.logical_and(first, measured, out=first)
+        np.greater(measured, first, out=blend)  # measured and not first
+        np.subtract(sample, estimate, out=delta)
+        delta *= self.alpha
+        np.add(estimate, delta, out=estimate, where=blend)
+        np.copyto(estimate, sample, where=first)
+
+        # Bins left without a return for a whole ring restart their average; in the middle
+        # of a revolution they are only hidden, as the ring is not complete yet
+        if end_of_revolution:
+            np.copyto(estimate, 0.0, where=empty)
+            return estimate
+        fused = self._fused
+        np.copyto(fused, estimate)
+        np.copyto(fused, 0.0, where=empty)
+        return fused
+
+
+class LidarScanProcessor:
+    """
+    Turns raw (quality, angle, distance) measurements into the published scan.
+
+    Measurements below `min_quality` are dropped and the ones sharing a bin
+    are combined in a single vectorized pass according to `aggregation`:
+    "last" (last one wins), "nearest", "mean" (quality-weighted) or "median".
+    An optional `temporal_filter` fuses the bins over the last scans before
+    the heading offset is applied.
+    The heading offset and the field-of-view filter are folded into one
+    precomputed gather table and keep mask, rebuilt only when they change.
+    Forward-fill of missing bins, FOV and timeout masking are vectorized
+    and write into preallocated arrays.
+    """
+
+    def __init__(self, heading_offset_deg: int, fov_filter: int, point_timeout_ms: int, bins: int = 360,
+                 aggregation: str = "nearest", min_quality: int = 0, temporal_filter: TemporalScanFilter = None):
+        if aggregation not in BIN_AGGREGATIONS:
+            raise ValueError(f"Unknown bin aggregation '{aggregation}', expected one of {BIN_AGGREGATIONS}")
+
+        self.point_timeout_ms = point_timeout_ms
+        self.bins = bins
+        self.aggregation = aggregation
+        self.min_quality = min_quality
+        self.temporal_filter = temporal_filter
+
+        # Raw readings in sensor frame, their confidence (mean quality / MAX_QUALITY)
+        # and the time (s) each bin was last updated
+        self.raw_distances = np.zeros(bins, dtype=float)
+        self.raw_confidence = np.zeros(bins, dtype=float)
+        self.last_update_times = np.zeros(bins, dtype=float)
+
+        # Published scan, the acquisition time of each of its bins and its confidence
+        # (0 where empty; forward-filled bins keep the time of their source but get no confidence)
+        self._output = np.zeros(bins, dtype=float)
+        self.output_times = np.zeros(bins, dtype=float)
+        self.output_confidence = np.zeros(bins, dtype=float)
+        self._fill_index = np.zeros(bins, dtype=np.intp)
+
+        # Bins written by integrate() since the temporal filter last fused them
+        self._fresh = np.zeros(bins, dtype=bool)
+        self._arange = np.arange(bins, dtype=np.intp)
+
+        self._table_key = None
+        self.configure(heading_offset_deg, fov_filter)
+
+    def configure(self, heading_offset_deg: int, fov_filter: int):
+        """Rebuilds the gather table and FOV mask if the offset or FOV changed."""
+        key = (heading_offset_deg, fov_filter, self.bins)
+        if key == self._table_key:
+            return
+
+        self.heading_offset_deg = heading_offset_deg
+        self.fov_filter = fov_filter
+
+        deg_per_bin = 360.0 / self.bins
+        offset_bins = int(round(heading_offset_deg / deg_per_bin))
+
+        # output[i] = raw[gather[i]] is np.roll(raw, offset)
+        self._gather = (self._arange - offset_bins) % self.bins
+
+        # Keep bins within +/- fov/2 of the front (index 0)
+        half_fov = fov_filter / 2.0
+        diffs = self._arange * deg_per_bin
+        self._fov_reject = ~((diffs <= half_fov) | (diffs >= 360 - half_fov))
+
+        self._table_key = key
+
+    def integrate(self, angles_deg: np.ndarray, distances_m: np.ndarray, times, quality: np.ndarray = None):
+        """
+        Writes a batch of measurements into their bins.
+        `times` is either one timestamp (s) for the whole batch or one per measurement.
+        Without `quality` every measurement is taken at full quality.
+        """
+        distances_m = np.asarray(distances_m, dtype=float)
+        if quality is None:
+            quality = np.full(distances_m.shape, MAX_QUALITY)
+        else:
+            quality = np.asarray(quality, dtype=float)
+        times = np.broadcast_to(np.asarray(times, dtype=float), distances_m.shape)
+
+        keep = (quality >= self.min_quality) & (distances_m > 0)
+        distances_m, quality, times = distances_m[keep], quality[keep], times[keep]
+        indices = np.round(np.asarray(angles_deg)[keep] * (self.bins / 360.0)).astype(np.intp) % self.bins
+
+        if len(indices) == 0:
+            return
+
+        self._fresh[indices] = True
+
+        if self.aggregation == "last":
+            self.raw_distances[indices] = distances_m
+            self.raw_confidence[indices] = quality / MAX_QUALITY
+            self.last_update_times[indices] = times
+            return
+
+        counts = np.bincount(indices, minlength=self.bins)
+        touched = counts > 0
+
+        if self.aggregation == "nearest":
+            nearest = np.full(self.bins, np.inf)
+            np.minimum.at(nearest, indices, distances_m)
+            values = nearest[touched]
+        elif self.aggregation == "mean":
+            weights = np.maximum(quality, 1.0)  # zero-quality returns still count when min_quality allows them
+            values = (np.bincount(indices, weights * distances_m, self.bins)[touched]
+                      / np.bincount(indices, weights, self.bins)[touched])
+        else:
+            values = self._bin_medians(indices, distances_m, counts[touched])
+
+        self.raw_distances[touched] = values
+        self.raw_confidence[touched] = np.bincount(indices, quality, self.bins)[touched] / counts[touched] / MAX_QUALITY
+        self.last_update_times[indices] = times
+
+    @staticmethod
+    def _bin_medians(indices: np.ndarray, distances_m: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """Median distance of every non-empty bin, in increasing bin order."""
+        order = np.lexsort((distances_m, indices))
+        sorted_distances = distances_m[order]
+
+        starts = np.cumsum(counts) - counts
+        low = sorted_distances[starts + (counts - 1) // 2]
+        high = sorted_distances[starts + counts // 2]
+        return 0.5 * (low + high)
+
+    def expire(self, now: float):
+        """Drops readings older than the point timeout so they are treated as missing."""
+        expired = (now - self.last_update_times > self.point_timeout_ms / 1000.0) & (self.last_update_times > 0)
+        self.raw_distances[expired] = 0.0
+        self.raw_confidence[expired] = 0.0
+        self.last_update_times[expired] = -1.0
+        self._fresh[expired] = False
+
+    def process(self, now: float, end_of_revolution: bool = True) -> np.ndarray:
+        """
+        Returns the filtered scan in vehicle heading frame and updates
+        `output_times` and `output_confidence` for each bin.
+        `end_of_revolution` tells the temporal filter whether the measurements
+        integrated so far complete a revolution (always the case in "scan" mode).
+        The returned arrays are reused by the next call; copy them to keep them.
+        """
+        self.expire(now)
+
+        distances = self.raw_distances
+        if self.temporal_filter is not None:
+            distances = self.temporal_filter.update(distances, self._fresh, end_of_revolution)
+            self._fresh.fill(False)
+
+        out = self._output
+        times = self.output_times
+        confidence = self.output_confidence
+        np.take(distances, self._gather, out=out)
+        np.take(self.last_update_times, self._gather, out=times)
+        np.take(self.raw_confidence, self._gather, out=confidence)
+
+        # Forward-fill zeros with the last known reading (bin 0 is never filled)
+        fill = self._fill_index
+        np.multiply(self._arange, out != 0.0, out=fill)
+        np.maximum.accumulate(fill, out=fill)
+        np.take(out, fill, out=out)
+        np.take(times, fill, out=times)
+
+        out[self._fov_reject] = 0.0
+        np.maximum(times, 0.0, out=times)  # bins kept alive by the temporal filter after their timeout
+        times[out == 0.0] = 0.0
+        confidence[out == 0.0] = 0.0
+
+        return out
@@ -0,0 +1,58 @@
+import numpy as np
+from bisect import bisect_right
+
+import algorithm.constants as constants
+
+
+class PiecewiseLinearMap:
+    """
+    Piecewise-linear map over a constants table of (x, y) rows, such as
+    STEER_FACTOR or SPEED_FACTOR_DIST. Arrays are evaluated with np.interp,
+    scalars with a bisect over plain floats.
+
+    Values past the last breakpoint map to the last y. Values before the first
+    breakpoint follow the line from the last breakpoint to the first one, as
+    the former lerp() did. The breakpoints are read from `algorithm.constants`
+    by name and rebuilt whenever load_constants runs.
+    """
+
+    def __init__(self, table_name: str):
+        self.table_name = table_name
+        self._generation = None
+
+    def _build(self):
+        table = np.asarray(getattr(constants, self.table_name), dtype=float)
+        self._x = np.ascontiguousarray(table[:, 0])
+        self._y = np.ascontiguousarray(table[:, 1])
+        self._left_slope = (self._y[0] - self._y[-1]) / (self._x[0] - self._x[-1])
+
+        # Plain floats for the scalar path, where NumPy call overhead dominates
+        self._x_list = self._x.tolist()
+        self._y_list = self._y.tolist()
+        self._generation = constants.CONFIG_GENERATION
+
+    def __call__(self, value):
+        if self._generation != constants.CONFIG_GENERATION:
+            self._build()
+
+        if isinstance(value, (float, int, np.floating, np.integer)):
+            return self._scalar(float(value))
+
+        result = np.interp(value, self._x, self._y)
+
+        below = np.less(value, self._x[0])
+        if np.any(below):
+            extrapolated = self._y[-1] + (np.subtract(value, self._x[-1])) * self._left_slope
+            result = np.where(below, extrapolated, result)
+        return result
+
+    def _scalar(self, value: float) -> float:
+        x, y = self._x_list, self._y_list
+        index = bisect_right(x, value)
+
+        if index == len(x):
+            return y[-1]
+        if index == 0:
+            return y[-1] + (value - x[-1]) * self._left_slope
+
+        return y[index - 1] + (value - x[index - 1]) / (x[index] - x[index - 1]) * (y[index] - y[index - 1])
@@ -0,0 +1,76 @@
+import numpy as np
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from algorithm.control_direction import compute_angle, compute_steer, convolution_filter, shrink_space
+from algorithm.control_speed import compute_speed
+from algorithm.stage_timer import NULL_TIMER
+
+
+@dataclass
+class PlanResult:
+    """Commands computed by a planner for one scan."""
+    steer: float          # steering angle (degrees), positive toward positive scan angles
+    target_angle: float   # direction the planner aims at (degrees)
+    speed: float          # target speed (m/s)
+
+
+class Planner(ABC):
+    """Turns one lidar scan into steering and speed commands."""
+
+    # StageTimer the planner may time its own stages with (VoitureAlgorithm sets its own)
+    timer = NULL_TIMER
+
+    def prepare(self, bins: int):
+        """Precomputes whatever depends on the scan resolution; called once before driving."""
+        pass
+
+    @abstractmethod
+    def plan(self, raw_lidar: np.ndarray, front_distance_m: float = None) -> PlanResult:
+        """
+        Plans from the raw (not shrink_space'd) scan. `front_distance_m` is its
+        front_distance, when the caller already has it (see compute_speed).
+        """
+        pass
+
+
+# Planner classes by the name used for the PLANNER config key
+PLANNERS = {}
+
+
+def register_planner(name: str):
+    """Class decorator adding a Planner to PLANNERS under `name`."""
+    def register(cls):
+        PLANNERS[name] = cls
+        return cls
+    return register
+
+
+def create_planner(name: str) -> Planner:
+    if name not in PLANNERS:
+        raise ValueError(f"Unknown planner '{name}', expected one of {tuple(PLANNERS)}")
+    return PLANNERS[name]()
+
+
+@register_planner("convolution")
+class ConvolutionPlanner(Planner):
+    """Steers toward the farthest point of the convolved distance profile."""
+
+    def plan(self, raw_lidar: np.ndarray, front_distance_m: float = None) -> PlanResult:
+        # compute_steer_from_lidar and compute_speed, split so each stage can be timed
+        timer = self.timer
+        with timer.stage("shrink_space"):
+            shrinked = shrink_space(raw_lidar)
+        with timer.stage("convolution"):
+            filtered_distances, filtered_angles = convolution_filter(shrinked)
+        with timer.stage("compute_angle"):
+            target_angle, _ = compute_angle(filtered_distances, filtered_angles, shrinked)
+            steer = compute_steer(target_angle)
+        with timer.stage("compute_speed"):
+            speed = compute_speed(shrinked, target_angle, front_distance_m)
+        return PlanResult(steer, target_angle, speed)
+
+
+# Planners living in their own modules register themselves on import
+import algorithm.arc_planner  # noqa: E402,F401
+import algorithm.gap_planner  # noqa: E402,F401
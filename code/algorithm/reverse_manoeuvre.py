@@ -0,0 +1,90 @@
+import numpy as np
+
+import algorithm.constants as constants
+from algorithm.control_speed import STOP_DISTANCE
+from algorithm.lidar_bins import sector_indices
+
+REVERSING = "reversing"
+PULLING_AWAY = "pulling_away"
+DONE = "done"
+
+
+def rear_distance(lidar) -> float:
+    """Nearest valid return within +/- 20 degrees of the rear, inf if there are none."""
+    rear_data = lidar[sector_indices(180, 20, len(lidar))]
+    rear_data = rear_data[rear_data > 0]
+    return float(rear_data.min()) if len(rear_data) else float('inf')
+
+
+class ReverseManoeuvre:
+    """
+    Reverse, then pull away, advanced by one `tick` per control step
+    instead of blocking the loop.
+
+    Reversing (steer `reverse_steer`, speed `reverse_speed`) ends after
+    `reverse_timeout_s`, when the rear ultrasonic reads `back_dist_cm` or
+    less, when the lidar sees something within REVERSE_REAR_MARGIN_M of the
+    rear of the hitbox (only with a LIDAR_FOV_FILTER that keeps rear returns)
+    or, if `front_clearance_m` is set, once the front sector is that far
+    clear. Pulling away (`pull_steer`, `pull_speed`) lasts `pull_duration_s`
+    unless the front gets closer than STOP_DISTANCE.
+    """
+
+    def __init__(self, name: str, reverse_steer: float, reverse_speed: float, reverse_timeout_s: float,
+                 pull_steer: float, pull_speed: float, pull_duration_s: float,
+                 back_dist_cm: float, front_clearance_m: float = None):
+        self.name = name
+        self.reverse_steer = reverse_steer
+        self.reverse_speed = reverse_speed
+        self.reverse_timeout_s = reverse_timeout_s
+        self.pull_steer = pull_steer
+        self.pull_speed = pull_speed
+        self.pull_duration_s = pull_duration_s
+        self.back_dist_cm = back_dist_cm
+        self.front_clearance_m = front_clearance_m
+
+        self.state = None
+        self.exit_reason = None
+        self._phase_start = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.state in (REVERSING, PULLING_AWAY)
+
+    def start(self, now: float):
+        self.state = REVERSING
+        self.exit_reason = None
+        self._phase_start = now
+
+    def tick(self, now: float, ultrasonic_cm: float, lidar: np.ndarray, front_m: float):
+        """
+        Advances the manoeuvre with this step's readings (`front_m` is the
+        front_distance of `lidar`) and returns the (steer, speed) to apply, or None once done.
+        """
+        elapsed = now - self._phase_start
+
+        if self.state == REVERSING:
+            reason = None
+            if ultrasonic_cm != -1.0 and ultrasonic_cm <= self.back_dist_cm:
+                reason = "ultrasonic"
+            elif rear_distance(lidar) <= constants.HITBOX_H2 + constants.REVERSE_REAR_MARGIN_M:
+                reason = "lidar rear"
+            elif self.front_clearance_m is not None and front_m >= self.front_clearance_m:
+                reason = "front clear"
+            elif elapsed >= self.reverse_timeout_s:
+                reason = "timeout"
+
+            if reason is None:
+                return self.reverse_steer, self.reverse_speed
+
+            self.exit_reason = reason
+            self.state = PULLING_AWAY
+            self._phase_start = now
+            elapsed = 0.0
+
+        if self.state == PULLING_AWAY:
+            if elapsed < self.pull_duration_s and front_m - constants.HITBOX_H1 > STOP_DISTANCE:
+                return self.pull_steer, self.pull_speed
+            self.state = DONE
+
+        return None
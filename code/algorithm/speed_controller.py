@@ -0,0 +1,52 @@
+import algorithm.constants as constants
+
+SPEED_CONTROL_MODES = ("open", "closed")
+
+# Setpoints closer to 0 than this leave the ESC at neutral (see RealMotorInterface.set_speed)
+NEUTRAL_BAND = 0.1
+
+
+class SpeedController:
+    """
+    PI speed controller with feed-forward, in set_speed units (-3 to 3).
+
+    The wheel speed is converted to command units with SPEED_COMMAND_MPS
+    (the open-loop speed per unit of command) before it is compared with
+    the setpoint. The command is the setpoint itself (what the open-loop
+    motor receives) plus SPEED_KP * error + SPEED_KI * integral(error), the
+    correction being limited to +/- SPEED_MAX_CORRECTION so a faulty wheel
+    encoder can never command more than that over the open-loop value.
+    The integral only grows while the correction is not saturated, or when
+    the error pulls it back (anti-windup).
+
+    The wheel encoder gives no direction, so reverse and neutral setpoints
+    are passed through open loop and reset the integral.
+    """
+
+    def __init__(self):
+        self.integral = 0.0
+        self.correction = 0.0
+
+    def reset(self):
+        self.integral = 0.0
+        self.correction = 0.0
+
+    def update(self, setpoint: float, measured_speed: float, dt: float) -> float:
+        """Returns the command for this period given the setpoint (set_speed units) and the wheel speed (m/s) measured in it."""
+        if setpoint < NEUTRAL_BAND:
+            self.reset()
+            return setpoint
+
+        kp, ki, limit = constants.SPEED_KP, constants.SPEED_KI, constants.SPEED_MAX_CORRECTION
+        error = setpoint - measured_speed / constants.SPEED_COMMAND_MPS
+
+        integral = self.integral + error * dt
+        correction = kp * error + ki * integral
+        saturated = abs(correction) > limit
+        if not saturated or correction * error < 0:
+            self.integral = integral
+        else:
+            correction = kp * error + ki * self.integral
+
+        self.correction = max(-limit, min(correction, limit))
+        return max(0.0, setpoint + self.correction)
@@ -0,0 +1,101 @@
+import json
+import numpy as np
+from time import perf_counter_ns
+
+
+class Stage:
+    """Context manager timing one stage; durations (ns) go into a preallocated ring of the last `window` samples."""
+    __slots__ = ("name", "samples", "count", "_start")
+
+    def __init__(self, name: str, window: int):
+        self.name = name
+        self.samples = np.zeros(window, dtype=np.int64)
+        self.count = 0
+        self._start = 0
+
+    def __enter__(self):
+        self._start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        samples = self.samples
+        samples[self.count % len(samples)] = perf_counter_ns() - self._start
+        self.count += 1
+
+    def window(self) -> np.ndarray:
+        """Samples currently held (in no particular order)."""
+        return self.samples[:min(self.count, len(self.samples))]
+
+
+class _NullStage:
+    """What a disabled StageTimer hands out: entering and leaving it does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class StageTimer:
+    """
+    Per-stage timing of the control step.
+
+        with timer.stage("shrink_space"):
+            shrinked = shrink_space(raw_lidar)
+
+    Each stage keeps its last `window` durations in a NumPy ring allocated
+    the first time the stage runs, so timing a step allocates nothing;
+    percentiles are only computed by summary/report/dump. A disabled timer
+    returns a shared no-op context manager, leaving the cost of a `with`
+    statement on an empty object.
+    """
+
+    def __init__(self, enabled: bool = True, window: int = 1000):
+        self.enabled = enabled
+        self.window = window
+        self.stages = {}  # name -> Stage, in first-run order
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return _NULL_STAGE
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Stage(name, self.window)
+        return stage
+
+    def reset(self):
+        for stage in self.stages.values():
+            stage.count = 0
+
+    def summary(self) -> dict:
+        """Per stage: call count and mean/p50/p95/p99/max over the window, in us."""
+        summary = {}
+        for name, stage in self.stages.items():
+            samples = stage.window() / 1000.0
+            if len(samples) == 0:
+                continue
+            p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+            summary[name] = {"count": stage.count, "mean_us": float(samples.mean()), "p50_us": float(p50),
+                             "p95_us": float(p95), "p99_us": float(p99), "max_us": float(samples.max())}
+        return summary
+
+    def report(self) -> str:
+        lines = [f"Stage timings (last {self.window} calls of each stage)"]
+        for name, s in self.summary().items():
+            lines.append(f"  {name:<14} mean {s['mean_us']:8.1f} us  p50 {s['p50_us']:8.1f}  p95 {s['p95_us']:8.1f}  "
+                         f"p99 {s['p99_us']:8.1f}  max {s['max_us']:8.1f} us")
+        return "\n".join(lines)
+
+    def dump(self, path: str, **counters):
+        """Writes the summary as JSON, along with any `counters` the caller wants kept with it."""
+        with open(path, "w") as f:
+            json.dump({"window": self.window, "stages": self.summary(), **counters}, f)
+
+
+# Used by code that may run without a timer (e.g. planners outside VoitureAlgorithm)
+NULL_TIMER = StageTimer(enabled=False)
@@ -2,11 +2,17 @@ import time
 import cv2
 import os
 import datetime
+from collections import deque
 from algorithm.interfaces import *
 from algorithm.constants import HITBOX_H1, HITBOX_H2, HITBOX_W
-from algorithm.control_camera import extract_info, DetectionStatus
-from algorithm.control_direction import compute_steer_from_lidar, shrink_space
-from algorithm.control_speed import compute_speed
+import algorithm.constants as constants
+from algorithm.control_camera import DetectionStatus
+from algorithm.lidar_bins import span_indices
+from algorithm.lidar_deskew import deskew_scan
+from algorithm.planners import create_planner
+from algorithm.control_speed import SpeedGovernor, front_distance
+from algorithm.reverse_manoeuvre import ReverseManoeuvre
+from algorithm.stage_timer import StageTimer
 
 back_dist = 15
 
@@ -48,8 +54,37 @@ class VoitureAlgorithm:
         self.motor = motor
         self.console = console
 
-        avg_r, avg_g, ratio_r, ratio_g, detection_status, processing_results = extract_info(self.camera.get_camera_frame(), *self.camera.get_resolution())
-        print(detection_status)
+        # Lidar frame bookkeeping: sequence number of the last scan processed and
+        # how many published scans were never seen by the control loop.
+        self.last_lidar_seq = 0
+        self.dropped_lidar_frames = 0
+
+        # Last steering angle sent to the servo, used to deskew lidar scans
+        self.last_steer = 0.0
+
+        # Duration of each stage of run_step (and of the planner's own stages)
+        self.timer = StageTimer(constants.STAGE_TIMING, constants.STAGE_TIMING_WINDOW)
+
+        # Steering/speed strategy, chosen by the PLANNER config key
+        self.planner = create_planner(constants.PLANNER)
+        self.planner.prepare(constants.LIDAR_BINS)
+        self.planner.timer = self.timer
+
+        # Deskewed scan and plan of the last scan, reused while the lidar has not
+        # published a new one: keyed on (seq, CONFIG_GENERATION)
+        self._plan_key = None
+        self._planned = None
+        self.plan_cache_hits = 0
+        self.plan_cache_misses = 0
+
+        # Caps the planned speed by the braking distance along the commanded arc
+        self.speed_governor = SpeedGovernor()
+
+        # Reverse manoeuvre in progress, advanced one tick per run_step
+        self.manoeuvre = None
+
+        # Time from the end of each scan to the actuation computed from it (s)
+        self.sensor_to_actuator_latencies = deque(maxlen=100)
         
             
     def detect_wheel_stopped_collision(self):
@@ -83,108 +118,81 @@ class VoitureAlgorithm:
                 delattr(self, '_wheel_stopped_start_time')
                 self._collision_detected = False
     
+    def start_manoeuvre(self, manoeuvre: ReverseManoeuvre):
+        """Starts a reverse manoeuvre, advanced by run_step, unless one is already running."""
+        if self.manoeuvre is not None:
+            return
+        manoeuvre.start(time.time())
+        self.manoeuvre = manoeuvre
+        self.console.print_to_console(f"&e&l[MANOEUVRE] &f{manoeuvre.name} started")
+
+    def advance_manoeuvre(self, ultrasonic_data: float, lidar_data: np.ndarray, front_m: float):
+        """Steps the running reverse manoeuvre and returns its (steer, speed), or None if there is none."""
+        if self.manoeuvre is None:
+            return None
+
+        command = self.manoeuvre.tick(time.time(), ultrasonic_data, lidar_data, front_m)
+        if command is None:
+            self.console.print_to_console(f"&e&l[MANOEUVRE] &f{self.manoeuvre.name} done (reverse ended by {self.manoeuvre.exit_reason})")
+            self.manoeuvre = None
+        return command
+
+    def fresh_detection(self) -> CameraDetection:
+        """Latest camera detection, or None if there is none yet or its frame is older than CAMERA_MAX_AGE_S."""
+        detection = self.camera.get_detection()
+
+        # A stale detection (camera worker stalled or not started yet) says nothing about where we are now
+        if detection.seq == 0 or time.time() - detection.t_capture > constants.CAMERA_MAX_AGE_S:
+            return None
+        return detection
+
     def simple_marche_arrire(self):        
-        avg_r, avg_g, ratio_r, ratio_g, detection_status, processing_results = extract_info(self.camera.get_camera_frame(), *self.camera.get_resolution())
+        detection = self.fresh_detection()
+        if detection is None:
+            self.voltando()
+            return
 
-        match (detection_status):
+        match (detection.status):
             case DetectionStatus.ONLY_GREEN:
-                if  ratio_g > 0.10:
-                    self.steer.set_steering_angle(30)
-                    self.motor.set_speed(-1.5)
-                    #time.sleep(1.5)
-                    
-                    for _ in range(15):
-                        ultrasonic_read = self.ultrasonic.get_ultrasonic_data()  
-                        if (ultrasonic_read <= back_dist and ultrasonic_read != -1.0): 
-                            break
-                        time.sleep(0.1)
-
-                    self.motor.set_speed(0)
-                    self.steer.set_steering_angle(-30)
-                    self.motor.set_speed(0.7)
-                    time.sleep(0.1)
-                    print("GIRANDO")
+                if  detection.ratio_g > 0.10:
+                    self.start_manoeuvre(ReverseManoeuvre("GIRANDO", reverse_steer=30, reverse_speed=-1.5, reverse_timeout_s=1.5,
+                                                          pull_steer=-30, pull_speed=0.7, pull_duration_s=0.1,
+                                                          back_dist_cm=back_dist))
                 else:
                     self.voltando()
             case DetectionStatus.ONLY_RED:
-                if  ratio_r > 0.10:
-                    self.steer.set_steering_angle(-30)
-                    self.motor.set_speed(-1.5)
-                    #time.sleep(1.5)
-
-                    for _ in range(15):
-                        ultrasonic_read = self.ultrasonic.get_ultrasonic_data()  
-                        if (ultrasonic_read <= back_dist and ultrasonic_read != -1.0): 
-                            break
-                        time.sleep(0.1)
-
-                    self.motor.set_speed(0)
-                    self.steer.set_steering_angle(30)
-                    self.motor.set_speed(0.7)
-                    time.sleep(0.1)
-                    print("GIRANDO")
+                if  detection.ratio_r > 0.10:
+                    self.start_manoeuvre(ReverseManoeuvre("GIRANDO", reverse_steer=-30, reverse_speed=-1.5, reverse_timeout_s=1.5,
+                                                          pull_steer=30, pull_speed=0.7, pull_duration_s=0.1,
+                                                          back_dist_cm=back_dist))
                 else:
                     self.voltando()
             case _:
                 self.voltando()
 
-    def voltando(self):
-        self.steer.set_steering_angle(0)
-        self.motor.set_speed(-1.2)
-        #time.sleep(1.5)
-
-        for _ in range(15):
-            ultrasonic_read = self.ultrasonic.get_ultrasonic_data()  
-            if (ultrasonic_read <= back_dist and ultrasonic_read != -1.0): 
-                print(f"Sai pelo break!!! {ultrasonic_read}")
-                break
-            time.sleep(0.1)
-
-        self.motor.set_speed(0)
-        self.motor.set_speed(0.7)
-        print("VOLTANDO")
+    def voltando(self, front_clearance_m: float = None):
+        """Backs straight up; with `front_clearance_m`, stops as soon as the front is that clear."""
+        self.start_manoeuvre(ReverseManoeuvre("VOLTANDO", reverse_steer=0, reverse_speed=-1.2, reverse_timeout_s=1.5,
+                                              pull_steer=0, pull_speed=0.7, pull_duration_s=0.0,
+                                              back_dist_cm=back_dist, front_clearance_m=front_clearance_m))
     
-    def reversing_direction(self):
-        l_side = self.lidar.get_lidar_data()[60:120]   # Região à esquerda do carrinho
-        r_side = self.lidar.get_lidar_data()[240:300]  # Região à direita do carrinho
+    def reversing_direction(self, lidar_data: np.ndarray):
+        l_side = lidar_data[span_indices(60, 120, len(lidar_data))]   # Região à esquerda do carrinho
+        r_side = lidar_data[span_indices(240, 300, len(lidar_data))]  # Região à direita do carrinho
                     
         avg_left = np.mean(l_side[l_side > 0])
         avg_right = np.mean(r_side[r_side > 0]) 
 
         if avg_left > avg_right:
             print("Espace libre à gauche, rotation vers la gauche...")
-            self.steer.set_steering_angle(+30)
-            self.motor.set_speed(-2.0)
-            print("Rodou esquerda...")
-            
-            for _ in range(20):
-                ultrasonic_read = self.ultrasonic.get_ultrasonic_data()  
-                if (ultrasonic_read <= back_dist and ultrasonic_read != -1.0): 
-                    break
-                time.sleep(0.1)
-
-            self.motor.set_speed(0)
-            self.steer.set_steering_angle(-30)
-            self.motor.set_speed(0.7)
-            time.sleep(1.0)
-            return
+            self.start_manoeuvre(ReverseManoeuvre("Demi-tour gauche", reverse_steer=+30, reverse_speed=-2.0, reverse_timeout_s=2.0,
+                                                  pull_steer=-30, pull_speed=0.7, pull_duration_s=1.0,
+                                                  back_dist_cm=back_dist))
         else:
             print("Espace libre à droite, rotation vers la droite...")
-            self.steer.set_steering_angle(-30)
-            self.motor.set_speed(-2.0)
-            print("Rodou direita...")
-
-            for _ in range(20):
-                ultrasonic_read = self.ultrasonic.get_ultrasonic_data()  
-                if (ultrasonic_read <= back_dist and ultrasonic_read != -1.0):
-                    break
-                time.sleep(0.1)
-
-            self.motor.set_speed(0)
-            self.steer.set_steering_angle(+30)
-            self.motor.set_speed(0.7)
-            time.sleep(1.0)
-            return
+            self.start_manoeuvre(ReverseManoeuvre("Demi-tour droite", reverse_steer=-30, reverse_speed=-2.0, reverse_timeout_s=2.0,
+                                                  pull_steer=+30, pull_speed=0.7, pull_duration_s=1.0,
+                                                  back_dist_cm=back_dist))
         
     def print_detection(self,detection, ratio_r, ratio_g):
         match (detection):
@@ -199,13 +207,13 @@ class VoitureAlgorithm:
         return
 
     def demi_tour(self): 
-        frame = self.camera.get_camera_frame()
-        
-        avg_r, avg_g, ratio_r, ratio_g, detection_status, processing_results = extract_info(frame, *self.camera.get_resolution()) 
+        detection = self.fresh_detection()
+        if detection is None:
+            return False
         
-        self.print_detection(detection_status, ratio_r, ratio_g)
+        self.print_detection(detection.status, detection.ratio_r, detection.ratio_g)
         
-        match (detection_status):
+        match (detection.status):
             case DetectionStatus.RED_LEFT_GREEN_RIGHT:
                 return False
             case DetectionStatus.GREEN_LEFT_RED_RIGHT:
@@ -214,20 +222,8 @@ class VoitureAlgorithm:
         return False
 
     
-    def check_too_close_to_mur(self):
-        lidar_data = self.lidar.get_lidar_data()
-        
-        # Assuming lidar_data is a 360-degree array where indices 350-359 and 0-10 
-        # represent the front of the vehicle (approximately 20 degrees field of view)
-        front_indices = list(range(350, 360)) + list(range(0, 11))
-        front_data = [lidar_data[i] for i in front_indices if lidar_data[i] > 0]  # Filter out zero/invalid readings
-        
-        # Calculate average distance in front if we have valid readings
-        if len(front_data) > 0:
-            dist_front_moyene = sum(front_data) / len(front_data)
-        else:
-            dist_front_moyene = float('inf')  # No valid readings means no obstacles detected
-        
+    def check_too_close_to_mur(self, dist_front_moyene: float):
+        """`dist_front_moyene` is the front sector average of this step's scan (see front_distance)."""
         # Print the front distance
         self.console.print_to_console(f"&e&lDistance frontale: &f{dist_front_moyene:.2f} cm")
         
@@ -237,34 +233,95 @@ class VoitureAlgorithm:
         # Check if we're too close to a wall and trigger reverse maneuver
         if dist_front_moyene < min_front_lidar:
             self.console.print_to_console(f"&c&l[WARNING] &eTrop proche du mur: &f{dist_front_moyene:.2f} cm")
-            self.voltando()
+            self.voltando(front_clearance_m=constants.REVERSE_FRONT_CLEARANCE_M)
         
     
+    def track_lidar_frame(self, frame: LidarFrame):
+        """Counts scans published since the previous step that were never processed."""
+        if self.last_lidar_seq > 0 and frame.seq > self.last_lidar_seq + 1:
+            self.dropped_lidar_frames += frame.seq - self.last_lidar_seq - 1
+        self.last_lidar_seq = frame.seq
+
+    def deskew_lidar_frame(self, frame: LidarFrame, current_speed: float) -> np.ndarray:
+        """Compensates the scan for the motion of the car while it was acquired."""
+        if not constants.LIDAR_DESKEW:
+            return frame.distances
+
+        # The wheel encoder gives no direction; take it from the last motor command
+        speed = np.copysign(current_speed, self.motor.get_speed())
+        return deskew_scan(frame.distances, frame.stamps, frame.t_end,
+                           speed, self.last_steer, constants.WHEELBASE)
+
+    def plan_lidar_frame(self, frame: LidarFrame, current_speed: float):
+        """Deskews and plans `frame`, or returns the (raw_lidar, front_distance, plan) already computed for it."""
+        key = (frame.seq, constants.CONFIG_GENERATION)
+        if frame.seq > 0 and key == self._plan_key:
+            self.plan_cache_hits += 1
+            return self._planned
+
+        self.plan_cache_misses += 1
+        with self.timer.stage("deskew"):
+            raw_lidar = self.deskew_lidar_frame(frame, current_speed)
+        # The one front sector average of this scan: the planner's speed, the wall check
+        # and the reverse manoeuvre all use it
+        front_m = front_distance(raw_lidar)
+        with self.timer.stage("plan"):
+            plan = self.planner.plan(raw_lidar, front_m)
+
+        self._plan_key = key
+        self._planned = raw_lidar, front_m, plan
+        return self._planned
+
+    def stats(self) -> dict:
+        return {"dropped_lidar_frames": self.dropped_lidar_frames,
+                "plan_cache_hits": self.plan_cache_hits, "plan_cache_misses": self.plan_cache_misses}
+
     def run_step(self):
         """Runs a single step of the algorithm and measures execution time."""
+        timer = self.timer
         start_time = time.time()
-        raw_lidar = self.lidar.get_lidar_data()
-        ultrasonic_data = self.ultrasonic.get_ultrasonic_data()
-        current_speed = self.speed.get_speed()
-        battery_level = self.battery.get_battery_voltage()
+        with timer.stage("lidar"):
+            lidar_frame = self.lidar.get_lidar_frame()
+            self.track_lidar_frame(lidar_frame)
+        with timer.stage("sensors"):
+            ultrasonic_data = self.ultrasonic.get_ultrasonic_data()
+            current_speed = self.speed.get_speed()
+            battery_level = self.battery.get_battery_voltage()
+        # Planning only depends on the scan; everything below it still runs every step
+        raw_lidar, front_m, plan = self.plan_lidar_frame(lidar_frame, current_speed)
+        steer, target_angle = plan.steer, plan.target_angle
         
-        self.detect_wheel_stopped_collision()
+        with timer.stage("collision"):
+            self.detect_wheel_stopped_collision()
         
-        if self.demi_tour():
-           print("Reversed direction! reversing..")
-           self.reversing_direction()
+        with timer.stage("camera"):
+            if self.manoeuvre is None and self.demi_tour():
+               print("Reversed direction! reversing..")
+               self.reversing_direction(raw_lidar)
 
-        shrinked = shrink_space(raw_lidar)
-        steer, target_angle = compute_steer_from_lidar(shrinked)
-        target_speed = compute_speed(shrinked, target_angle)
+        with timer.stage("governor"):
+            target_speed = self.speed_governor(raw_lidar, steer, current_speed, plan.speed)
         
-        self.check_too_close_to_mur()
+        with timer.stage("wall_check"):
+            self.check_too_close_to_mur(front_m)
+
+        # A reverse manoeuvre overrides the plan until it is done; planning and checks keep running meanwhile
+        with timer.stage("manoeuvre"):
+            manoeuvre_command = self.advance_manoeuvre(ultrasonic_data, raw_lidar, front_m)
+        if manoeuvre_command is not None:
+            steer, target_speed = manoeuvre_command
         
-        self.steer.set_steering_angle(steer)
-        self.motor.set_speed(target_speed)
+        with timer.stage("actuators"):
+            self.steer.set_steering_angle(steer)
+            self.last_steer = steer
+            self.motor.set_speed(target_speed)
         
         end_time = time.time()
         loop_time = end_time - start_time
         loop_time *= 1000000
 
-        self.console.print_to_console(f"&b&lAngle: &f{target_angle:.1f}\t&a&lVelocity: &f{self.motor.get_speed()} &6&lSPD: &f{current_speed:.2f} m/s Dist: {self.ultrasonic.get_ultrasonic_data()} &e&lBAT: &f{battery_level}V &d&lLoop: &f{loop_time:.0f} us")    
\ No newline at end of file
+        if lidar_frame.seq > 0:
+            self.sensor_to_actuator_latencies.append(end_time - lidar_frame.t_end)
+        latency_ms = np.mean(self.sensor_to_actuator_latencies) * 1000 if self.sensor_to_actuator_latencies else 0.0
+
+        self.console.print_to_console(f"&b&lAngle: &f{target_angle:.1f}\t&a&lVelocity: &f{self.motor.get_speed()} &6&lSPD: &f{current_speed:.2f} m/s Dist: {self.ultrasonic.get_ultrasonic_data()} &e&lBAT: &f{battery_level}V &d&lLoop: &f{loop_time:.0f} us &c&lLat: &f{latency_ms:.1f} ms")    
\ No newline at end of file
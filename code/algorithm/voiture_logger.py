@@ -117,6 +117,9 @@ class CentralLogger:
         
         return self._main_logger
     
+    def get_log_dir(self) -> str:
+        return self._log_dir
+
     def get_logger_by_name(self, logger_name: str):
         return logging.getLogger(logger_name)
 
@@ -8,6 +8,7 @@ from matplotlib.widgets import Button
 
 import algorithm.control_direction as control_direction
 import algorithm.control_speed as control_speed
+from algorithm.lidar_bins import bin_angles_rad
 
 matplotlib.use('TkAgg')
 
@@ -97,16 +98,17 @@ class VoitureAlgorithmPlotter:
         self.ax_main.set_ylim(-0.5, 5)
         self.ax_main.set_aspect("equal")
 
-        self.raw_plot = self.lidar_plotter(self.ax_main, raw_lidar, np.linspace(0, 2*np.pi, 360, endpoint=False))
+        self.raw_plot = self.lidar_plotter(self.ax_main, raw_lidar, bin_angles_rad(len(raw_lidar)))
 
         # Shows the shrinked lidar points
-        # #self.lidar_plotter(self.ax_main, shrinked, np.linspace(0, 2*np.pi, 360, endpoint=False))
+        # #self.lidar_plotter(self.ax_main, shrinked, bin_angles_rad(len(shrinked)))
 
         self.convoluted_plot = self.lidar_plotter(self.ax_main, filtered_dist, np.radians(filtred_angles))
         # Use arrow_length and arrow_angle for the arrow
         self.target_arrow_plot = self.target_vector_plotter(self.ax_main, 0, 0, arrow_angle, 'red', length=arrow_length)        
         self.hitbox_plot = self.hitbox_plotter(self.ax_main, shrinked)
-        self.hitbox_rect = self.lidar_plotter(self.ax_main, control_direction.hitbox, np.linspace(0, 2*np.pi, 360, endpoint=False))      
+        hitbox = control_direction.get_hitbox(len(raw_lidar))
+        self.hitbox_rect = self.lidar_plotter(self.ax_main, hitbox, bin_angles_rad(len(hitbox)))      
         self.target_arrow_plot = self.target_vector_plotter(self.ax_main, 0, 0, blue_arrow_angle, color='blue', length=arrow_length)
 
         self.updateZoom(filtered_dist, filtred_angles)
@@ -0,0 +1,637 @@
+import sys
+import time
+import tracemalloc
+import multiprocessing as mp
+import numpy as np
+
+from algorithm.constants import LIDAR_HEADING_OFFSET_DEG, LIDAR_FOV_FILTER, LIDAR_POINT_TIMEOUT_MS
+from algorithm.lidar_processing import LidarScanProcessor, TemporalScanFilter, BIN_AGGREGATIONS
+from algorithm.lidar_bins import bin_angles_deg, bin_angles_rad, deg_to_bins, sector_indices
+from algorithm.lidar_deskew import deskew_scan
+from algorithm.control_direction import ConvolutionFilter
+import algorithm.control_direction as control_direction
+import algorithm.control_speed as control_speed
+from algorithm.control_speed import SpeedGovernor, front_distance
+from algorithm.reverse_manoeuvre import ReverseManoeuvre
+from algorithm.piecewise_linear import PiecewiseLinearMap
+from algorithm.arc_planner import ArcPlanner, arc_collision_table
+from algorithm.gap_planner import FollowTheGapPlanner, GAP_AIMS
+from algorithm.planners import PLANNERS, ConvolutionPlanner
+from algorithm.stage_timer import StageTimer
+import algorithm.constants as constants
+import rplidar_native
+from lidar_shared_buffer import SharedScanBuffer
+from camera_shared_result import SharedCameraResult
+from control_scheduler import ControlScheduler
+from scenarios import (synthetic_scans, legacy_process_scan, encode_standard_nodes, encode_express_packets,
+                       reference_decode_standard, skewed_wall_scan, legacy_convolution_filter, recorded_scans,
+                       legacy_compute_angle, legacy_lerp, legacy_calculate_hitbox_polar, corridor_scan,
+                       wall_scan, reversing_manoeuvre, replay_manoeuvre, simulate_speed_tracking,
+                       FakeDetectionStatus, publish_detections)
+
+
+def time_per_call(function, repeat: int) -> float:
+    """Returns the mean wall time of `function()` in microseconds."""
+    function()  # warm-up
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def benchmark_lidar_processing(repeat: int = 2000):
+    scans = list(synthetic_scans(64))
+
+    pre_filtered = np.zeros(360)
+    last_update = np.zeros(360)
+    legacy_iter = iter(scans * (repeat // len(scans) + 2))
+
+    def legacy():
+        angles, distances = next(legacy_iter)
+        return legacy_process_scan(angles, distances, pre_filtered, last_update,
+                                   LIDAR_HEADING_OFFSET_DEG, LIDAR_FOV_FILTER, LIDAR_POINT_TIMEOUT_MS)
+
+    # The legacy loop let the last measurement of a bin win
+    processor = LidarScanProcessor(LIDAR_HEADING_OFFSET_DEG, LIDAR_FOV_FILTER, LIDAR_POINT_TIMEOUT_MS,
+                                   aggregation="last")
+    vector_iter = iter(scans * (repeat // len(scans) + 2))
+
+    def vectorized():
+        angles, distances = next(vector_iter)
+        now = time.time()
+        processor.integrate(angles, distances, now)
+        return processor.process(now)
+
+    # Both pipelines must agree while no point times out
+    check_legacy = np.zeros(360), np.zeros(360)
+    check_processor = LidarScanProcessor(LIDAR_HEADING_OFFSET_DEG, LIDAR_FOV_FILTER, LIDAR_POINT_TIMEOUT_MS,
+                                         aggregation="last")
+    max_diff = 0.0
+    for angles, distances in scans:
+        angles = np.clip(angles, 0, 359.4)  # legacy clips instead of wrapping 359.5+ to bin 0
+        angles, distances = angles[distances > 0], distances[distances > 0]  # iter_scans drops empty returns
+        expected = legacy_process_scan(angles, distances, *check_legacy,
+                                       LIDAR_HEADING_OFFSET_DEG, LIDAR_FOV_FILTER, LIDAR_POINT_TIMEOUT_MS)
+        check_processor.integrate(angles, distances, time.time())
+        result = check_processor.process(time.time())
+        max_diff = max(max_diff, np.max(np.abs(expected - result)))
+
+    legacy_us = time_per_call(legacy, repeat)
+    vectorized_us = time_per_call(vectorized, repeat)
+
+    print("Lidar post-processing (per scan)")
+    print(f"  legacy loop : {legacy_us:8.1f} us")
+    print(f"  vectorized  : {vectorized_us:8.1f} us  ({legacy_us / vectorized_us:.1f}x)")
+    print(f"  max |diff|  : {max_diff:.3g} m")
+
+    rng = np.random.default_rng(1)
+    qualities = [rng.integers(0, 64, len(angles)) for angles, _ in scans]
+    for aggregation in BIN_AGGREGATIONS:
+        processor = LidarScanProcessor(LIDAR_HEADING_OFFSET_DEG, LIDAR_FOV_FILTER, LIDAR_POINT_TIMEOUT_MS,
+                                       aggregation=aggregation, min_quality=10)
+        batch_iter = iter(list(zip(scans, qualities)) * (repeat // len(scans) + 2))
+
+        def aggregated():
+            (angles, distances), quality = next(batch_iter)
+            now = time.time()
+            processor.integrate(angles, distances, now, quality)
+            return processor.process(now)
+
+        print(f"  {aggregation:<11} : {time_per_call(aggregated, repeat):8.1f} us  (min_quality=10)")
+
+
+def benchmark_decoder(revolutions: int = 200):
+    rng = np.random.default_rng(0)
+
+    # Standard scan: ~360 nodes per revolution
+    points = 360 * revolutions
+    angles = np.tile(np.linspace(0, 359, 360), revolutions) + rng.uniform(0, 0.9, points)
+    angles = np.round(angles * 64) / 64
+    distances = np.round(rng.uniform(100, 6000, points) * 4) / 4
+    quality = rng.integers(0, 64, points)
+    new_scan = np.tile(np.arange(360) == 0, revolutions)
+    standard_stream = encode_standard_nodes(quality, angles, distances, new_scan)
+
+    # Express scan: 32 measurements per packet, start angles advancing ~11.25 deg
+    packets = 12 * revolutions
+    start_angles = np.round(((np.arange(packets) * 11.25) % 360) * 64) / 64
+    express_distances = rng.integers(0, 2 ** 14, (packets, 32))
+    dtheta = rng.integers(-31, 32, (packets, 32)) / 8.0
+    express_stream = encode_express_packets(start_angles, express_distances, dtheta)
+
+    reference_us = time_per_call(lambda: reference_decode_standard(standard_stream), 3)
+    standard_us = time_per_call(lambda: rplidar_native.decode_standard(standard_stream), 50)
+    express_us = time_per_call(lambda: rplidar_native.express_measurements(
+        *rplidar_native.decode_express_packets(express_stream)[:3]), 50)
+
+    print("RPLidar decoding (measurements per second)")
+    print(f"  standard, per node (pure Python) : {points / reference_us * 1e6:12,.0f}")
+    print(f"  standard, np.frombuffer          : {points / standard_us * 1e6:12,.0f}")
+    print(f"  express,  np.frombuffer          : {packets * 32 / express_us * 1e6:12,.0f}")
+
+
+def benchmark_deskew(repeat: int = 2000):
+    speed = 3.0
+    distances, stamps, t_end, expected = skewed_wall_scan(2.0, speed)
+    front = expected > 0
+    centre = front & (np.abs(np.cos(bin_angles_rad(360))) > 0.5)
+
+    corrected = deskew_scan(distances, stamps, t_end, speed, 0.0, 0.26)
+    raw_error = np.max(np.abs(distances[centre] - expected[centre]))
+    deskew_error = np.max(np.abs(corrected[centre] - expected[centre]))
+
+    # Same revolution through LidarScanProcessor, timestamped as RPLidarReader._publish_scans does
+    def processed(times):
+        processor = LidarScanProcessor(0, 360, 1000, 360)
+        processor.integrate(bin_angles_deg(360), distances, times)
+        scan = processor.process(t_end)
+        return deskew_scan(scan, processor.output_times, t_end, speed, 0.0, 0.26)
+
+    spread = processed(np.linspace(1.0, t_end, 360 + 1)[1:])
+    pipeline_error = np.max(np.abs(spread[centre] - expected[centre]))
+
+    deskew_us = time_per_call(lambda: deskew_scan(distances, stamps, t_end, speed, 15.0, 0.26), repeat)
+
+    print(f"Scan deskew ({speed} m/s towards a wall at 2 m, 100 ms rotation)")
+    print(f"  max range error, raw      : {raw_error * 100:6.2f} cm")
+    print(f"  max range error, deskewed : {deskew_error * 100:6.2f} cm")
+    print(f"  through LidarScanProcessor: {pipeline_error * 100:6.2f} cm (stamps spread over the revolution)")
+    print(f"  deskew_scan               : {deskew_us:6.1f} us")
+
+
+def benchmark_temporal_filter(scans: int = 400):
+    rng = np.random.default_rng(2)
+    truth = 1.0 + np.abs(np.sin(bin_angles_rad(360) * 3))
+
+    # Noisy scans with 20% dropouts and 3% spurious returns
+    measured = truth + rng.normal(0, 0.02, (scans, 360))
+    measured[rng.random((scans, 360)) < 0.03] += 2.0
+    fresh = rng.random((scans, 360)) >= 0.2
+
+    print("Temporal scan fusion (mean |error| over covered bins, per-scan cost)")
+    single = np.where(fresh, measured, 0.0)
+    print(f"  single scan        : {np.mean(np.abs(single - truth)[fresh]) * 100:6.2f} cm   coverage {fresh.mean():.0%}")
+
+    for strategy in ("median", "ema"):
+        for depth in (5, 10, 20):
+            temporal_filter = TemporalScanFilter(360, depth, strategy)
+            errors, covered = [], []
+            for i in range(scans):
+                fused = temporal_filter.update(measured[i], fresh[i])
+                covered.append(np.mean(fused > 0))
+                errors.append(np.mean(np.abs(fused - truth)[fused > 0]))
+
+            frames = iter(list(range(scans)) * 8)
+
+            def update():
+                i = next(frames)
+                return temporal_filter.update(measured[i], fresh[i])
+
+            cost_us = time_per_call(update, 2000)
+            print(f"  {strategy:<6} depth {depth:>2}    : {np.mean(errors[depth:]) * 100:6.2f} cm"
+                  f"   coverage {np.mean(covered[depth:]):.0%}   {cost_us:6.1f} us")
+
+        # Temporaries: peak traced memory above the baseline during one update
+        temporal_filter = TemporalScanFilter(360, 5, strategy)
+        for i in range(20):
+            temporal_filter.update(measured[i], fresh[i])
+        peaks = []
+        tracemalloc.start()
+        for i in range(20, 60):
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            temporal_filter.update(measured[i], fresh[i])
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        tracemalloc.stop()
+        print(f"  {strategy:<6} peak alloc/update: {max(peaks) / 1024:.1f} KiB (the ring alone is {temporal_filter._ring.nbytes / 1024:.1f} KiB)")
+
+
+def publish_frames(buffer: SharedScanBuffer, period_s: float, frames: int):
+    """Stands in for the lidar process: publishes a scan every `period_s` seconds."""
+    scan = np.ones(buffer.size)
+    for _ in range(frames):
+        time.sleep(period_s)
+        now = time.time()
+        buffer.publish(scan, now - period_s, now)
+
+
+def benchmark_wakeup(frames: int = 50, period_s: float = 0.1):
+    print(f"Control loop wakeup, scan published every {period_s * 1000:.0f} ms (scan end -> step start)")
+
+    for mode in ("fixed", "lidar"):
+        buffer = SharedScanBuffer(360)
+        publisher = mp.Process(target=publish_frames, args=(buffer, period_s, frames), daemon=True)
+        publisher.start()
+
+        latencies = []
+        last_seq = 0
+        while publisher.is_alive() or buffer.latest_seq > last_seq:
+            if mode == "lidar":
+                if not buffer.wait_for_frame(last_seq, 3 * period_s):
+                    continue
+            else:
+                time.sleep(0.05)
+
+            frame = buffer.read()
+            if frame.seq > last_seq:
+                latencies.append(time.time() - frame.t_end)
+                last_seq = frame.seq
+        publisher.join()
+
+        latencies = np.array(latencies[1:]) * 1000
+        print(f"  {mode:<6}: mean {latencies.mean():6.2f} ms   p95 {np.percentile(latencies, 95):6.2f} ms"
+              f"   max {latencies.max():6.2f} ms")
+
+
+def benchmark_convolution(repeat: int = 5000):
+    rng = np.random.default_rng(3)
+    cached = ConvolutionFilter()
+
+    print("Direction convolution filter (per call)")
+    for bins in (360, 720, 1440):
+        scans = rng.uniform(0.2, 6.0, (16, bins))
+        front_only = scans.copy()
+        half = deg_to_bins(constants.LIDAR_FOV_FILTER / 2, bins)
+        front_only[:, half + 1:bins - half] = 0.0  # what the lidar process publishes
+
+        # Identical wherever the zero padding of the old version met zeroed bins anyway
+        fov_diff = max(np.max(np.abs(cached(scan)[0] - legacy_convolution_filter(scan)[0])) for scan in front_only)
+        wrap_diff = max(np.max(np.abs(cached(scan)[0] - legacy_convolution_filter(scan)[0])) for scan in scans)
+
+        legacy_us = time_per_call(lambda: legacy_convolution_filter(scans[0]), repeat)
+        cached_us = time_per_call(lambda: cached(scans[0]), repeat)
+        print(f"  {bins:>4} bins: legacy {legacy_us:6.1f} us   cached FFT {cached_us:6.1f} us"
+              f"  ({legacy_us / cached_us:.1f}x)   max |diff| {fov_diff:.1g} m (FOV-filtered),"
+              f" {wrap_diff:.2f} m at the wraparound (full scan)")
+
+
+def benchmark_compute_angle(repeat: int = 2000):
+    logged = recorded_scans()
+    default_max_angle = control_direction.AVOID_CORNER_MAX_ANGLE
+    min_distance = control_direction.AVOID_CORNER_MIN_DISTANCE
+    scale_factor = control_direction.AVOID_CORNER_SCALE_FACTOR
+
+    print(f"Corner avoidance in compute_angle ({len(logged)} logged scans)")
+    try:
+        for bins in (360, 1440):
+            scans = np.repeat(logged, bins // 360, axis=1)  # same scenes at a finer resolution
+            for max_angle in (default_max_angle, 45, 90):
+                control_direction.AVOID_CORNER_MAX_ANGLE = max_angle
+
+                filtered = tuple(np.copy(a) for a in control_direction.convolution_filter(scans[0]))
+                legacy_us = time_per_call(lambda: legacy_compute_angle(
+                    *filtered, scans[0], max_angle, min_distance, scale_factor), repeat)
+                vector_us = time_per_call(lambda: control_direction.compute_angle(*filtered, scans[0]), repeat)
+                print(f"  {bins:>4} bins, max angle {max_angle:>2}: loop {legacy_us:7.1f} us   "
+                      f"vectorized {vector_us:5.1f} us")
+    finally:
+        control_direction.AVOID_CORNER_MAX_ANGLE = default_max_angle
+
+
+def benchmark_batch_pipeline(repeat: int = 5):
+    scans = recorded_scans()
+
+    def per_scan():
+        results = []
+        for scan in scans:
+            shrinked = control_direction.shrink_space(scan)
+            steer, target = control_direction.compute_steer_from_lidar(shrinked)
+            results.append((steer, target, control_speed.compute_speed(shrinked, target)))
+        return np.array(results).T
+
+    def batched():
+        shrinked = control_direction.shrink_space_batch(scans)
+        steer, target = control_direction.compute_steer_from_lidar_batch(shrinked)
+        return steer, target, control_speed.compute_speed_batch(shrinked, target)
+
+    loop_ms = time_per_call(per_scan, repeat) / 1000
+    batch_ms = time_per_call(batched, repeat) / 1000
+
+    print(f"Direction + speed pipeline over a recorded run ({len(scans)} scans)")
+    print(f"  per-scan loop : {loop_ms:8.2f} ms")
+    print(f"  batch API     : {batch_ms:8.2f} ms  ({loop_ms / batch_ms:.0f}x)")
+
+
+def benchmark_piecewise_linear(repeat: int = 20000):
+    print("Piecewise-linear maps (per scalar call)")
+    rng = np.random.default_rng(4)
+
+    for name in ("STEER_FACTOR", "SPEED_FACTOR_DIST", "SPEED_FACTOR_ANG", "LERP_MAP_LENGTH"):
+        table = getattr(constants, name)
+        mapping = PiecewiseLinearMap(name)
+
+        value = float(rng.uniform(table[0, 0], table[-1, 0]))
+        legacy_us = time_per_call(lambda: legacy_lerp(value, table), repeat)
+        map_us = time_per_call(lambda: mapping(value), repeat)
+        print(f"  {name:<18}: lerp {legacy_us:5.2f} us   map {map_us:5.2f} us")
+
+
+def benchmark_hitbox(repeat: int = 200):
+    print("Hitbox footprint table")
+    geometry = (constants.HITBOX_W, constants.HITBOX_H1, constants.HITBOX_H2)
+    for bins in (360, 720, 1440, 1000):
+        legacy_us = time_per_call(lambda: legacy_calculate_hitbox_polar(*geometry, bins), repeat // 10)
+        vector_us = time_per_call(lambda: control_direction.calculate_hitbox_polar(*geometry, bins), repeat)
+        cached_us = time_per_call(lambda: control_direction.get_hitbox(bins), repeat * 10)
+        print(f"  {bins:>4} bins: loop {legacy_us:8.1f} us   vectorized {vector_us:6.1f} us"
+              f"   get_hitbox (cached) {cached_us:5.2f} us")
+
+
+def benchmark_arc_planner(repeat: int = 2000):
+    print("Arc (dynamic window) planner")
+
+    arc_collision_table.cache_clear()
+    start = time.perf_counter()
+    planner = ArcPlanner()
+    planner(corridor_scan(0.5))
+    print(f"  arc tables built in {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"({constants.ARC_CANDIDATES} arcs, shape {planner._table.shape})")
+
+    scans = recorded_scans()
+    planner = ArcPlanner()
+    scan_iter = iter(list(scans) * (repeat // len(scans) + 2))
+    arc_us = time_per_call(lambda: planner(next(scan_iter)), repeat)
+    scan_iter = iter(list(scans) * (repeat // len(scans) + 2))
+    convolution_us = time_per_call(
+        lambda: control_direction.compute_steer_from_lidar(control_direction.shrink_space(next(scan_iter))), repeat)
+    print(f"  per scan: arc planner {arc_us:6.1f} us   convolution planner {convolution_us:6.1f} us")
+
+
+def benchmark_gap_planner(repeat: int = 2000):
+    print("Follow-the-gap planner")
+
+    # Thin pole 0.9 m ahead in a wide corridor: lateral clearance left by each aim
+    for aim in GAP_AIMS:
+        constants.GAP_AIM = aim
+        scan = corridor_scan(1.5)
+        scan[sector_indices(0, 1, 360)] = 0.9
+        plan = FollowTheGapPlanner().plan(scan)
+        clearance = 0.9 * np.sin(np.radians(abs(plan.target_angle) - 1))
+        print(f"  pole 0.9 m ahead, aim {aim:<8}: target {plan.target_angle:+4.0f} deg, {clearance:.2f} m lateral clearance")
+    constants.load_constants()
+
+    # Cost per scan across resolutions, on recorded scans resampled to each bin count
+    # and on a cluttered scene with an edge every other bin
+    scans = recorded_scans()
+    for bins in (360, 720, 1440, 2880):
+        resampled = np.repeat(scans, bins // scans.shape[1], axis=1)
+        planner = FollowTheGapPlanner()
+        planner.prepare(bins)
+        scan_iter = iter(list(resampled) * (repeat // len(resampled) + 2))
+        recorded_us = time_per_call(lambda: planner.plan(next(scan_iter)), repeat)
+        cluttered = np.tile([0.6, 4.0], bins // 2)
+        cluttered_us = time_per_call(lambda: planner.plan(cluttered), repeat)
+        print(f"  {bins:5d} bins: recorded scans {recorded_us:6.1f} us   cluttered scan {cluttered_us:6.1f} us")
+
+
+def benchmark_speed_governor(repeat: int = 5000):
+    print("TTC speed governor")
+    governor = SpeedGovernor()
+
+    # Wall ahead: the governed speed shrinks with the braking room, down to a stop at STOP_DISTANCE
+    for wall in (0.35, 0.45, 0.6, 0.8, 1.2, 2.0, 3.0):
+        speed = governor(wall_scan(wall), 0.0, 1.0, control_speed.MAX_SPEED)
+        print(f"  wall {wall:.2f} m ahead at 1 m/s: free path {governor.free_path:.2f} m   "
+              f"ttc {governor.time_to_collision:5.2f} s   speed command {speed:.2f}")
+
+    # Corridor: the wall limits the speed when steering into it
+    speed = governor(corridor_scan(0.4), constants.STEERING_LIMIT, 1.0, 1.0)
+    print(f"  corridor 0.4 m half width, full lock: free path {governor.free_path:.2f} m, speed command {speed:.2f}")
+
+    scans = recorded_scans()
+
+    # "front" mode fed the step's shared front_distance against the one it used to compute itself
+    governor_mode = constants.SPEED_GOVERNOR
+    constants.SPEED_GOVERNOR = "front"
+    try:
+        deviation = 0.0
+        for scan in scans:
+            shrinked = control_direction.shrink_space(scan)
+            own = control_speed.compute_speed(shrinked, 5.0)
+            shared = control_speed.compute_speed(shrinked, 5.0, front_distance(scan))
+            deviation = max(deviation, abs(own - shared))
+    finally:
+        constants.SPEED_GOVERNOR = governor_mode
+    print(f"  \"front\" speed from the shared front distance: max deviation {deviation * 100:.2f} cm/s")
+
+    scan_iter = iter(list(scans) * (repeat // len(scans) + 2))
+    governor_us = time_per_call(lambda: governor(next(scan_iter), 10.0, 1.0, 1.0), repeat)
+    scan_iter = iter(list(scans) * (repeat // len(scans) + 2))
+    front_us = time_per_call(lambda: front_distance(next(scan_iter)), repeat)
+    print(f"  per scan: governor {governor_us:5.1f} us   shared front sector reduction {front_us:5.1f} us")
+
+
+def benchmark_speed_control():
+    print("Closed-loop speed control (simulated motor reaching 80% of the open-loop speed)")
+    segments = [0.5, 1.1, 0.8, 0.0, 0.6]
+    setpoints = np.repeat(segments, 2000)
+    settled = (np.arange(len(setpoints)) % 2000) >= 1000  # last second of every segment
+
+    for label, rate, closed_loop, jitter in (("open loop, 20 Hz main loop + jitter", 20, False, 0.03),
+                                             ("closed loop, 20 Hz main loop + jitter", 20, True, 0.03),
+                                             ("closed loop, 100 Hz control thread", constants.SPEED_CONTROL_RATE_HZ, True, 0.0)):
+        speeds, _ = simulate_speed_tracking(setpoints, rate, closed_loop, jitter_s=jitter)
+        error = speeds - setpoints
+        rms = np.sqrt(np.mean(error ** 2))
+        steady = np.abs(error[settled]).mean()
+        print(f"  {label:<40} rms error {rms:.3f} m/s   settled error {steady:.3f} m/s")
+
+    # Anti-windup: encoder stuck at 0, then reading again
+    setpoints = np.full(6000, 0.8)
+    speeds, commands = simulate_speed_tracking(setpoints, constants.SPEED_CONTROL_RATE_HZ, True,
+                                               plant_gain=1.0, stuck_sensor=(0, 3000))
+    recovery_ms = np.argmax(np.abs(speeds[3000:] - 0.8) < 0.05)
+    print(f"  encoder stuck at 0 for 3 s: command <= {commands.max():.2f}, "
+          f"back within 5 cm/s of the setpoint {recovery_ms} ms after it reads again")
+
+    # Units: a motor reaching 2 m/s per unit of command
+    command_mps = constants.SPEED_COMMAND_MPS
+    constants.SPEED_COMMAND_MPS = 2.0
+    try:
+        setpoints = np.repeat(segments, 2000)
+        speeds, _ = simulate_speed_tracking(setpoints, constants.SPEED_CONTROL_RATE_HZ, True)
+        steady = np.abs(speeds - 2.0 * setpoints)[settled].mean()
+        print(f"  SPEED_COMMAND_MPS = 2.0: settled error {steady:.3f} m/s on 2 x setpoint")
+    finally:
+        constants.SPEED_COMMAND_MPS = command_mps
+
+
+def benchmark_scheduler(steps: int = 200, period_s: float = 0.01):
+    print(f"Control loop scheduling: {steps} steps of 2-6 ms (every 50th takes 25 ms), {period_s * 1000:.0f} ms period")
+    rng = np.random.default_rng(0)
+    durations = rng.uniform(0.002, 0.006, steps)
+    durations[::50] = 0.025
+    step_iter = iter(durations)
+
+    def step():
+        time.sleep(next(step_iter))
+
+    # Sleeping a fixed period after each step, as main.py used to
+    start = time.monotonic()
+    for _ in range(steps):
+        step()
+        time.sleep(period_s)
+    elapsed = time.monotonic() - start
+    print(f"  sleep after step : {elapsed:.3f} s for {steps * period_s:.3f} s of periods "
+          f"(drift {(elapsed / steps - period_s) * 1000:+.2f} ms per step)")
+
+    for policy in ("skip", "catchup"):
+        step_iter = iter(durations)
+        scheduler = ControlScheduler(period_s, policy)
+        start = time.monotonic()
+        scheduler.run(step, max_steps=steps)
+        elapsed = time.monotonic() - start
+        stats = scheduler.stats
+        print(f"  deadlines, {policy:<8}: {elapsed:.3f} s, {stats.overruns} overruns, {stats.skipped} skipped, "
+              f"jitter p99 {stats.jitter.percentile(99) * 1000:.2f} ms")
+    print("  " + stats.report().replace("\n", "\n  "))
+
+
+def benchmark_reverse_manoeuvre(period_s: float = 0.05):
+    print(f"Reverse manoeuvre state machine, ticked every {period_s * 1000:.0f} ms")
+
+    # Backing away from a wall at 0.5 m/s: each exit condition ends the reverse on its own
+    exits = (
+        (reversing_manoeuvre(), lambda t: (max(60 - 50 * t, 10), wall_scan(0.35 + 0.5 * t))),
+        (reversing_manoeuvre(front_clearance_m=0.6), lambda t: (100, wall_scan(0.35 + 0.5 * t))),
+        (reversing_manoeuvre(), lambda t: (-1.0, wall_scan(0.35 + 0.5 * t))),
+    )
+    for manoeuvre, readings in exits:
+        commands = replay_manoeuvre(manoeuvre, readings, period_s)
+        reversing = sum(speed < 0 for _, speed in commands)
+        print(f"  ended by {manoeuvre.exit_reason:<11}: {reversing} reversing ticks ({reversing * period_s:.2f} s), "
+              f"{len(commands) - reversing} pulling away")
+
+    manoeuvre = ReverseManoeuvre("test", 0, -1.2, 1e9, 0, 0.7, 0.1, 15, 0.6)
+    manoeuvre.start(0.0)
+    scan = wall_scan(0.4)
+    front_m = front_distance(scan)
+    tick_us = time_per_call(lambda: manoeuvre.tick(0.0, 100, scan, front_m), 10000)
+    print(f"  per tick: {tick_us:.1f} us (the blocking version held the loop for up to 3 s)")
+
+
+def benchmark_camera_result(frames: int = 60, analysis_s: float = 1 / 30):
+    print(f"Camera result mailbox, worker analysing a frame every {analysis_s * 1000:.0f} ms")
+
+    result = SharedCameraResult(FakeDetectionStatus)
+
+    worker = mp.Process(target=publish_detections, args=(result, analysis_s, frames), daemon=True)
+    worker.start()
+
+    reads, torn, ages, last_seq = 0, 0, [], 0
+    while worker.is_alive():
+        detection = result.read()
+        reads += 1
+        if detection.seq == 0:
+            continue
+        torn += not detection.avg_r == -detection.avg_g == 2 * detection.ratio_r == 4 * detection.ratio_g
+        if detection.seq > last_seq:
+            ages.append(time.time() - detection.t_capture)
+            last_seq = detection.seq
+    worker.join()
+
+    read_us = time_per_call(result.read, 20000)
+    ages = np.array(ages) * 1000
+    print(f"  {reads} reads while {frames} results were published, {torn} torn")
+    print(f"  read: {read_us:.1f} us (an in-loop capture and analysis blocks for {analysis_s * 1000:.0f} ms)")
+    print(f"  result age when first seen: mean {ages.mean():.1f} ms   max {ages.max():.1f} ms")
+
+
+def benchmark_stage_timer(repeat: int = 200000):
+    scans = recorded_scans()
+    print(f"Stage timing of the convolution planner over {len(scans)} recorded scans")
+
+    planner = ConvolutionPlanner()
+    planner.prepare(scans.shape[1])
+    planner.timer = StageTimer(window=len(scans))
+    for scan in scans:
+        planner.plan(scan)
+    print("  " + planner.timer.report().replace("\n", "\n  "))
+
+    def bare():
+        pass
+
+    def timed(stage):
+        def step():
+            with stage:
+                pass
+        return step
+
+    base_ns = time_per_call(bare, repeat) * 1000
+    for label, timer in (("disabled", StageTimer(enabled=False)), ("enabled", StageTimer(window=1000))):
+        cost_ns = time_per_call(timed(timer.stage("x")), repeat) * 1000 - base_ns
+        lookup_ns = time_per_call(lambda: timer.stage("x"), repeat) * 1000 - base_ns
+        print(f"  {label:<8} overhead per stage: {cost_ns:5.0f} ns (+{lookup_ns:3.0f} ns stage lookup)")
+
+
+def benchmark_planners(passes: int = 3):
+    scans = recorded_scans()
+    print(f"Registered planners replaying {len(scans)} recorded scans x {passes}")
+    print(f"  {'planner':<12} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}   {'peak alloc/step':>16} {'retained blocks':>16}")
+
+    for name, planner_class in PLANNERS.items():
+        planner = planner_class()
+        planner.prepare(scans.shape[1])
+        planner.plan(scans[0])  # warm-up
+
+        latencies = []
+        for _ in range(passes):
+            for scan in scans:
+                start = time.perf_counter()
+                planner.plan(scan)
+                latencies.append(time.perf_counter() - start)
+        p50, p95, p99, worst = np.percentile(np.array(latencies) * 1e6, [50, 95, 99, 100])
+
+        # Temporary memory: peak above the baseline while one step runs, and the
+        # number of traced blocks alive at the end of the step
+        peaks, blocks = [], []
+        tracemalloc.start()
+        for scan in scans:
+            baseline = tracemalloc.get_traced_memory()[0]
+            before = len(tracemalloc.take_snapshot().traces)
+            tracemalloc.reset_peak()
+            planner.plan(scan)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            blocks.append(len(tracemalloc.take_snapshot().traces) - before)
+        tracemalloc.stop()
+
+        print(f"  {name:<12} {p50:6.1f}us {p95:6.1f}us {p99:6.1f}us {worst:6.1f}us"
+              f"   {np.mean(peaks) / 1024:12.1f} KiB {np.mean(blocks):16.1f}")
+
+
+BENCHMARKS = {
+    "lidar": benchmark_lidar_processing,
+    "decoder": benchmark_decoder,
+    "deskew": benchmark_deskew,
+    "temporal": benchmark_temporal_filter,
+    "wakeup": benchmark_wakeup,
+    "convolution": benchmark_convolution,
+    "compute_angle": benchmark_compute_angle,
+    "batch": benchmark_batch_pipeline,
+    "lerp": benchmark_piecewise_linear,
+    "hitbox": benchmark_hitbox,
+    "arc": benchmark_arc_planner,
+    "gap": benchmark_gap_planner,
+    "governor": benchmark_speed_governor,
+    "speedcontrol": benchmark_speed_control,
+    "scheduler": benchmark_scheduler,
+    "manoeuvre": benchmark_reverse_manoeuvre,
+    "camera": benchmark_camera_result,
+    "stages": benchmark_stage_timer,
+    "planners": benchmark_planners,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
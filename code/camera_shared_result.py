@@ -0,0 +1,40 @@
+
+from algorithm.interfaces import CameraDetection
+from shared_seqlock import SeqlockSlots
+
+_FIELDS = 7  # t_capture, t_done, status index, avg_r, avg_g, ratio_r, ratio_g
+
+
+class SharedCameraResult:
+    """
+    Latest colour analysis of the camera, living in shared memory.
+
+    Double-buffered seqlock (see SeqlockSlots): the worker process
+    writes the slot readers are not looking at and then publishes its
+    sequence number, so the control loop reads the newest result without
+    taking a lock or waiting on the camera. `statuses` lists the
+    DetectionStatus members; their index is what gets stored.
+    """
+
+    def __init__(self, statuses):
+        self.statuses = tuple(statuses)
+        self._slots = SeqlockSlots("Camera result", values=('d', _FIELDS))
+
+    def publish(self, t_capture: float, t_done: float, status, avg_r: float, avg_g: float,
+                ratio_r: float, ratio_g: float):
+        values, = self._slots.fields
+
+        seq, slot = self._slots.begin_write()
+        values[slot] = (t_capture, t_done, self.statuses.index(status), avg_r, avg_g, ratio_r, ratio_g)
+        self._slots.end_write(seq, slot)
+
+    def read(self) -> CameraDetection:
+        """Copies the newest result out of shared memory (seq 0 and the last status, NONE, if none yet)."""
+        values, = self._slots.fields
+
+        seq, copied = self._slots.read(lambda slot: values[slot].tolist())
+        if seq == 0:
+            return CameraDetection(0, 0.0, 0.0, self.statuses[-1], -1, -1, 0, 0)
+
+        t_capture, t_done, status, avg_r, avg_g, ratio_r, ratio_g = copied
+        return CameraDetection(seq, t_capture, t_done, self.statuses[int(status)], avg_r, avg_g, ratio_r, ratio_g)
@@ -0,0 +1,142 @@
+import json
+import time
+import numpy as np
+
+OVERRUN_POLICIES = ("skip", "catchup")
+
+
+class RunningHistogram:
+    """Fixed-bin histogram of a stream of values, updated in O(1) per value."""
+
+    def __init__(self, low: float, high: float, bins: int = 200):
+        self.low = low
+        self.high = high
+        self.width = (high - low) / bins
+        self.counts = np.zeros(bins + 2, dtype=np.int64)  # first and last count under- and overflows
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add(self, value: float):
+        index = int((value - self.low) // self.width) + 1
+        self.counts[min(max(index, 0), len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Upper edge of the bin holding the q-th percentile (clamped to the observed range)."""
+        if self.count == 0:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), q / 100.0 * self.count))
+        edge = self.low + index * self.width
+        return min(max(edge, self.min), self.max)
+
+    def to_dict(self) -> dict:
+        return {
+            "low": self.low, "high": self.high, "width": self.width,
+            "counts": self.counts.tolist(),  # [below low, bins..., above high]
+            "count": self.count, "mean": self.mean, "min": self.min, "max": self.max,
+        }
+
+
+class LoopStats:
+    """Running histograms of the period, the jitter and the step duration of a loop (all in s)."""
+
+    def __init__(self, period_s: float):
+        self.period_s = period_s
+        self.period = RunningHistogram(0.0, 4 * period_s)
+        self.jitter = RunningHistogram(-period_s, period_s)  # step start minus its deadline (or period error)
+        self.duration = RunningHistogram(0.0, 2 * period_s)
+        self.overruns = 0  # steps that ended after the next deadline
+        self.skipped = 0  # deadlines dropped by the "skip" policy
+
+    def report(self) -> str:
+        lines = [f"Control loop: {self.duration.count} steps, target period {self.period_s * 1000:.1f} ms, "
+                 f"{self.overruns} overruns, {self.skipped} skipped deadlines"]
+        for name, histogram in (("period", self.period), ("jitter", self.jitter), ("step", self.duration)):
+            p50, p95, p99 = (histogram.percentile(q) * 1000 for q in (50, 95, 99))
+            lines.append(f"  {name:<7} mean {histogram.mean * 1000:7.2f} ms  p50 {p50:7.2f}  p95 {p95:7.2f}  "
+                         f"p99 {p99:7.2f}  max {histogram.max * 1000:7.2f} ms")
+        return "\n".join(lines)
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            json.dump({
+                "period_s": self.period_s, "overruns": self.overruns, "skipped": self.skipped,
+                "period": self.period.to_dict(), "jitter": self.jitter.to_dict(), "duration": self.duration.to_dict(),
+            }, f)
+
+
+class ControlScheduler:
+    """
+    Runs a step at a fixed rate against absolute time.monotonic() deadlines.
+
+    Deadlines are start + n * period, so the time a step takes does not
+    accumulate into drift. When a step ends past the next deadline the
+    "skip" policy drops the missed deadlines and resumes on the next one
+    still ahead (keeping the phase), while "catchup" runs the missed steps
+    back to back. `wait` replaces the deadline sleep for loops triggered by
+    an event (e.g. a new lidar scan); the jitter is then the difference
+    between the measured and the target period.
+    """
+
+    def __init__(self, period_s: float, overrun: str = "skip"):
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy '{overrun}', expected one of {OVERRUN_POLICIES}")
+
+        self.period_s = period_s
+        self.overrun = overrun
+        self.stats = LoopStats(period_s)
+        self._running = False
+
+    def stop(self):
+        """Makes `run` return after the current step."""
+        self._running = False
+
+    def run(self, step, wait=None, max_steps: int = None):
+        """Calls `step()` every period (or after every `wait()`) until stop() or `max_steps` steps."""
+        self._running = True
+        period = self.period_s
+        deadline = time.monotonic()
+        last_start = None
+        steps = 0
+
+        while self._running and (max_steps is None or steps < max_steps):
+            if wait is None:
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                wait()
+
+            start = time.monotonic()
+            step()
+            end = time.monotonic()
+            steps += 1
+
+            stats = self.stats
+            stats.duration.add(end - start)
+            if last_start is not None:
+                stats.period.add(start - last_start)
+            if wait is None:
+                stats.jitter.add(start - deadline)
+            elif last_start is not None:
+                stats.jitter.add(start - last_start - period)
+            last_start = start
+
+            if wait is not None:
+                deadline = start  # triggered loops have no fixed phase
+            deadline += period
+            if end > deadline:
+                stats.overruns += 1
+                if wait is None and self.overrun == "skip":
+                    missed = int((end - deadline) // period) + 1
+                    stats.skipped += missed
+                    deadline += missed * period
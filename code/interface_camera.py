@@ -1,8 +1,11 @@
-from algorithm.interfaces import CameraInterface
+from algorithm.interfaces import CameraInterface, CameraDetection
 from algorithm.control_camera import *
+from algorithm.constants import CAMERA_WORKER
+from camera_shared_result import SharedCameraResult
 import numpy as np
 import cv2
 import time
+import multiprocessing as mp
 import algorithm.voiture_logger as voiture_logger
 from picamera2 import Picamera2
 
@@ -13,10 +16,21 @@ from matplotlib.widgets import Button
 matplotlib.use('TkAgg')
 
 class RealCameraInterface(CameraInterface):
+    """
+    Pi camera. With `worker` (CAMERA_WORKER), a dedicated process owns the
+    camera, captures and analyses frames continuously and publishes each
+    result into a SharedCameraResult: get_detection then only reads the
+    newest one and never waits on the camera. Without it the camera is
+    opened in this process and get_detection analyses a frame on the spot.
+    """
     
     #THE IMPLEMENTATION OF THE ABSTRACT METHOD
     def get_camera_frame(self) -> np.ndarray:
         """Implementation of the abstract method to get a camera frame"""
+        if self.picam2 is None:
+            self.logger.logConsole("Camera frames are only available in the camera worker process")
+            return None
+
         try:
             frame = self.picam2.capture_array()
             if frame is None:
@@ -34,9 +48,39 @@ class RealCameraInterface(CameraInterface):
         """Returns the camera resolution as (width, height)."""
         return self.width, self.height
     
+    def get_detection(self) -> CameraDetection:
+        """Latest colour analysis: the worker's newest result, or a frame analysed now without a worker."""
+        if self._result is None:
+            return super().get_detection()
+
+        if not self._worker_failure_reported and not self._worker_process.is_alive() and not self._stop_event.is_set():
+            # Without this the results would just stay at seq 0 (no detection) for the rest of the run
+            self.logger.logConsole(f"Camera worker process died (exit code {self._worker_process.exitcode}), "
+                                   "no camera detections from now on")
+            self._worker_failure_reported = True
+        return self._result.read()
+
     #SORROUNDING CODE NEEDE FOR THE INTERFACE
-    def __init__(self, width=160, height=120):
+    def __init__(self, width=160, height=120, worker: bool = CAMERA_WORKER):
         self.logger = voiture_logger.CentralLogger(sensor_name="RealCamera")
+        self.width = width
+        self.height = height
+        self.picam2 = None
+        self._result = None
+        self._worker_process = None
+        self._worker_failure_reported = False
+        self._stop_event = mp.Event()
+
+        if worker:
+            self._result = SharedCameraResult(DetectionStatus)
+            self._worker_process = mp.Process(target=self._run_camera_process, daemon=True)
+            self._worker_process.start()
+            self.logger.logConsole("Camera worker process started")
+        else:
+            self._open_camera()
+
+    def _open_camera(self):
+        width, height = self.width, self.height
         self.picam2 = Picamera2()
         config = self.picam2.create_preview_configuration(
             main={"size": (width, height)},
@@ -51,10 +95,31 @@ class RealCameraInterface(CameraInterface):
             self.logger.logConsole(f"Camera initialization error: {e}")
             raise
 
-        self.width = width
-        self.height = height
+    def _run_camera_process(self):
+        """Worker process: captures, analyses and publishes frames until cleanup()."""
+        self._open_camera()
+        try:
+            while not self._stop_event.is_set():
+                t_capture = time.time()
+                frame = self.get_camera_frame()
+                if frame is None:
+                    time.sleep(0.05)
+                    continue
+
+                avg_r, avg_g, ratio_r, ratio_g, status = extract_info(frame, self.width, self.height)[:5]
+                self._result.publish(t_capture, time.time(), status, avg_r, avg_g, ratio_r, ratio_g)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.picam2.close()
         
     def cleanup(self):
+        if self._worker_process is not None:
+            self._stop_event.set()
+            self._worker_process.join(timeout=2.0)
+            self.logger.logConsole("Camera worker process stopped")
+            return
+
         try:
             self.picam2.close()
             self.logger.logConsole("Camera resources cleaned up")
@@ -267,7 +332,7 @@ if __name__ == "__main__":
     try:
         print("Starting camera debug interface...")
         print("Press ESC key to exit")
-        camera = RealCameraInterface()
+        camera = RealCameraInterface(worker=False)
         camera.debug_camera()
     except Exception as e:
         print(f"Error starting camera debug: {e}")
@@ -1,5 +1,7 @@
-from algorithm.interfaces import LiDarInterface
+from algorithm.interfaces import LiDarInterface, LidarFrame
 from algorithm_visualizer import *
+from lidar_shared_buffer import SharedScanBuffer
+from algorithm.lidar_processing import LidarScanProcessor, TemporalScanFilter
 
 import time
 import numpy as np
@@ -7,13 +9,14 @@ import multiprocessing as mp
 from rplidar import RPLidar, RPLidarException
 import algorithm.voiture_logger as cl
 from algorithm.constants import LIDAR_BAUDRATE, LIDAR_HEADING_OFFSET_DEG, LIDAR_FOV_FILTER, LIDAR_POINT_TIMEOUT_MS
+from algorithm.constants import LIDAR_ACQUISITION_MODE, LIDAR_STREAM_SECTOR_DEG, LIDAR_DRIVER, LIDAR_SCAN_TYPE, LIDAR_BINS, FIELD_OF_VIEW_DEG
+from algorithm.constants import LIDAR_BIN_AGGREGATION, LIDAR_MIN_QUALITY
+from algorithm.constants import LIDAR_TEMPORAL_FILTER, LIDAR_TEMPORAL_DEPTH, LIDAR_TEMPORAL_ALPHA, LIDAR_TEMPORAL_OUTLIER_M
+from algorithm.lidar_bins import deg_to_bins
+from rplidar_native import NativeRPLidar, NativeRPLidarException
 
 
 class RPLidarReader(LiDarInterface):
-    last_lidar_read = mp.Array('d', 360)
-    last_lidar_update = mp.Value('d', 0.0)
-    stop_event = mp.Event()
-
     def __init__(
         self,
         port: str = "/dev/ttyUSB0",
@@ -21,6 +24,17 @@ class RPLidarReader(LiDarInterface):
         heading_offset_deg: int = LIDAR_HEADING_OFFSET_DEG,
         fov_filter: int = LIDAR_FOV_FILTER,
         point_timeout_ms: int = LIDAR_POINT_TIMEOUT_MS,
+        acquisition_mode: str = LIDAR_ACQUISITION_MODE,
+        stream_sector_deg: int = LIDAR_STREAM_SECTOR_DEG,
+        driver: str = LIDAR_DRIVER,
+        scan_type: str = LIDAR_SCAN_TYPE,
+        bins: int = LIDAR_BINS,
+        bin_aggregation: str = LIDAR_BIN_AGGREGATION,
+        min_quality: int = LIDAR_MIN_QUALITY,
+        temporal_filter: str = LIDAR_TEMPORAL_FILTER,
+        temporal_depth: int = LIDAR_TEMPORAL_DEPTH,
+        temporal_alpha: float = LIDAR_TEMPORAL_ALPHA,
+        temporal_outlier_m: float = LIDAR_TEMPORAL_OUTLIER_M,
         sensor_name: str = "Lidar"
     ):
         
@@ -30,10 +44,20 @@ class RPLidarReader(LiDarInterface):
         self.heading_offset_deg = heading_offset_deg
         self.fov_filter = fov_filter
         self.point_timeout_ms = point_timeout_ms
+        self.acquisition_mode = acquisition_mode
+        self.stream_sector_deg = stream_sector_deg
+        self.driver = driver
+        self.scan_type = scan_type
+        self.bins = bins
+        self.bin_aggregation = bin_aggregation
+        self.min_quality = min_quality
+        self.temporal_filter = temporal_filter
+        self.temporal_depth = temporal_depth
+        self.temporal_alpha = temporal_alpha
+        self.temporal_outlier_m = temporal_outlier_m
 
         # Prepare multiprocessing shared state
-        self.last_lidar_read = mp.Array('d', 360)  # shared array of doubles
-        self.last_lidar_update = mp.Value('d', 0.0)  # shared double (timestamp)
+        self.last_lidar_read = SharedScanBuffer(bins)  # double-buffered frame slot exposed as a NumPy view
         self.stop_event = mp.Event()
         self.restart_attempts = mp.Value('i', 0)  # Count restart attempts
 
@@ -71,7 +95,10 @@ class RPLidarReader(LiDarInterface):
         while(not self.stop_event.is_set()):
             try:
                 # Initialize the LIDAR
-                lidar = RPLidar(port, baudrate=baudrate)
+                if self.driver == "native":
+                    lidar = NativeRPLidar(port, baudrate=baudrate, scan_type=self.scan_type)
+                else:
+                    lidar = RPLidar(port, baudrate=baudrate)
                 
                 # Before connecting, make sure the serial port is clean
                 # This accesses the underlying serial connection to flush any leftover data
@@ -88,65 +115,34 @@ class RPLidarReader(LiDarInterface):
                     
                 lidar.start_motor()
                 lidar.start()
-                sensor_logger_instance.logConsole("[Lidar] LIDAR started.")
+                sensor_logger_instance.logConsole(f"[Lidar] LIDAR started ({self.acquisition_mode} mode).")
 
-                pre_filtered_distances = np.zeros(360, dtype=float)
-                last_update_times = np.zeros(360, dtype=float)
+                temporal_filter = None
+                if self.temporal_filter != "none":
+                    temporal_filter = TemporalScanFilter(self.bins, self.temporal_depth, self.temporal_filter,
+                                                         self.temporal_alpha, self.temporal_outlier_m)
+
+                processor = LidarScanProcessor(self.heading_offset_deg, self.fov_filter, self.point_timeout_ms,
+                                               self.bins, self.bin_aggregation, self.min_quality, temporal_filter)
                 
                 # Initialize buffer error counter
                 buffer_errors = 0
                 max_buffer_errors = 3  # Maximum consecutive buffer errors before restart
 
-                for scan in lidar.iter_scans():
+                if self.driver == "native":
+                    publications = self._publish_batches(lidar, processor)
+                elif self.acquisition_mode == "stream":
+                    publications = self._publish_sectors(lidar, processor)
+                else:
+                    publications = self._publish_scans(lidar, processor)
+
+                for _ in publications:
                     if self.stop_event.is_set():
                         sensor_logger_instance.logConsole("[Lidar] Stop Request")
                         break
 
-                    # Reset buffer error counter on successful scan
+                    # Reset buffer error counter on successful publication
                     buffer_errors = 0
-                    
-                    # Process scan data (your existing code)
-                    scan_array = np.array(scan)
-                    angles = scan_array[:, 1]
-                    distances_m = scan_array[:, 2] / 1000.0  # convert mm to meters
-
-                    # Rest of your processing code...
-                    indices = np.round(angles).astype(int)
-                    indices = np.clip(indices, 0, 359)
-                    
-                    pre_filtered_distances[indices] = distances_m
-                    last_update_times[indices] = time.time() * 1000
-                    
-                    shifted_distances = np.roll(pre_filtered_distances, self.heading_offset_deg)
-                    
-                    # Fill zeros by propagating last known reading
-                    for i in range(1, 360):
-                        if shifted_distances[i] == 0.0:
-                            shifted_distances[i] = shifted_distances[i - 1]
-                    
-                    # Apply Field of View filter
-                    half_fov = self.fov_filter / 2.0
-                    angle_array = np.arange(360)
-                    diffs = (angle_array - 0) % 360
-                    keep_mask = ((diffs <= half_fov) | (diffs >= 360 - half_fov))
-                    shifted_distances[~keep_mask] = 0.0
-                    
-                    # Apply timeout
-                    current_time = time.time() * 1000  # ms
-                    time_diffs = current_time - last_update_times
-                    expired_mask = (time_diffs > self.point_timeout_ms) & (last_update_times > 0)
-                    shifted_distances[expired_mask] = 0.0
-                    last_update_times[expired_mask] = -1.0
-                    
-                    # Log data if desired
-                    self.sensor_logger.info(shifted_distances.tolist())
-                    
-                    # Copy to shared memory
-                    with self.last_lidar_read.get_lock():
-                        for i in range(360):
-                            self.last_lidar_read[i] = shifted_distances[i]
-                        with self.last_lidar_update.get_lock():
-                            self.last_lidar_update.value = time.time()
 
             except KeyboardInterrupt:
                 sensor_logger_instance.logConsole("[Lidar] KeyboardInterrupt detected. Stopping...")
@@ -171,7 +167,7 @@ class RPLidarReader(LiDarInterface):
                     # If we've had too many consecutive buffer errors or clearing failed, break to restart
                     break
                     
-            except RPLidarException as e:
+            except (RPLidarException, NativeRPLidarException) as e:
                 error_str = str(e)
                 if "descriptor" in error_str.lower() or "buffer" in error_str.lower():
                     buffer_errors += 1
@@ -215,10 +211,141 @@ class RPLidarReader(LiDarInterface):
                 if not self.stop_event.is_set():
                     time.sleep(1.0)  # Longer pause between full restarts
     
+    def _publish_scans(self, lidar: RPLidar, processor: LidarScanProcessor):
+        """
+        Publishes once per completed revolution (`iter_scans`). Measurements are
+        timestamped by interpolating over the revolution. Yields after every publication.
+        """
+        scan_start_time = time.time()
+
+        for scan in lidar.iter_scans():
+            scan_array = np.array(scan)
+            quality = scan_array[:, 0]
+            angles = scan_array[:, 1]
+            distances_m = scan_array[:, 2] / 1000.0  # convert mm to meters
+
+            # iter_scans hands over the whole revolution at once: spread the measurement
+            # times over it in measurement order so the scan can be deskewed
+            now = time.time()
+            times = np.linspace(scan_start_time, now, len(angles) + 1)[1:]
+
+            # Bin, rotate to heading, fill gaps, apply FOV and timeout (all vectorized)
+            processor.integrate(angles, distances_m, times, quality)
+            shifted_distances = processor.process(now)
+            
+            # Log data if desired
+            self.sensor_logger.info(shifted_distances.tolist())
+            
+            # Copy to shared memory (single vectorized copy, no lock held by readers)
+            self.last_lidar_read.publish(shifted_distances, scan_start_time, now,
+                                         processor.output_times, processor.output_confidence)
+            scan_start_time = now
+            yield
+
+    def _publish_sectors(self, lidar: RPLidar, processor: LidarScanProcessor):
+        """
+        Publishes every `stream_sector_deg` of rotation (`iter_measures`), so the
+        front sector is at most one sector old instead of up to a whole revolution.
+        Every measurement keeps its own timestamp. Yields after every publication.
+        """
+        qualities, angles, distances, times = [], [], [], []
+        current_sector = None
+        chunk_start_time = time.time()
+
+        for new_scan, quality, angle, distance in lidar.iter_measures():
+            now = time.time()
+            sector = int(angle // self.stream_sector_deg)
+
+            if angles and (new_scan or sector != current_sector):
+                processor.integrate(np.array(angles), np.array(distances) / 1000.0, np.array(times), np.array(qualities))
+                shifted_distances = processor.process(now, end_of_revolution=new_scan)
+
+                # Log once per revolution to keep the log format of the "scan" mode
+                if new_scan:
+                    self.sensor_logger.info(shifted_distances.tolist())
+
+                self.last_lidar_read.publish(shifted_distances, chunk_start_time, now,
+                                             processor.output_times, processor.output_confidence)
+                qualities.clear()
+                angles.clear()
+                distances.clear()
+                times.clear()
+                chunk_start_time = now
+                yield
+
+            current_sector = sector
+            if distance > 0:
+                qualities.append(quality)
+                angles.append(angle)
+                distances.append(distance)
+                times.append(now)
+
+    def _publish_batches(self, lidar: NativeRPLidar, processor: LidarScanProcessor):
+        """
+        Publishes from the native decoder, which hands over whole arrays of whatever
+        the serial port holds. Measurements are timestamped by interpolating between
+        chunk arrivals. In "scan" mode a frame is published at every revolution
+        boundary from the end of the first complete revolution on; in "stream" mode
+        also every `stream_sector_deg` of rotation, as `_publish_sectors` does.
+        Yields after every publication.
+        """
+        stream = self.acquisition_mode == "stream"
+        previous_chunk_time = time.time()
+        scan_start_time = previous_chunk_time
+        revolution_started = False  # a start flag was seen, so the next one closes a complete revolution
+        current_sector = -1
+        pending = False  # measurements integrated since the last publication
+
+        for new_scan, quality, angles, distances_mm in lidar.iter_batches():
+            now = time.time()
+            times = np.linspace(previous_chunk_time, now, len(angles) + 1)[1:]
+            distances_m = distances_mm / 1000.0
+
+            # Split the chunk at revolution boundaries, and at sector changes in "stream" mode
+            splits = new_scan
+            if stream:
+                sectors = (angles // self.stream_sector_deg).astype(np.intp)
+                splits = new_scan | (sectors != np.concatenate(([current_sector], sectors[:-1])))
+                current_sector = sectors[-1]
+
+            start = 0
+            for boundary in np.flatnonzero(splits):
+                part = slice(start, boundary)
+                processor.integrate(angles[part], distances_m[part], times[part], quality[part])
+                pending = pending or boundary > start
+                scan_end_time = times[boundary - 1] if boundary > 0 else previous_chunk_time
+                start = boundary
+
+                if stream:
+                    if not pending:
+                        continue
+                elif not revolution_started:
+                    # What precedes the first start flag is the tail of a revolution already under way
+                    revolution_started = True
+                    scan_start_time = scan_end_time
+                    continue
+
+                end_of_revolution = bool(new_scan[boundary])
+                shifted_distances = processor.process(now, end_of_revolution)
+
+                # Log once per revolution to keep the log format of the "scan" mode
+                if end_of_revolution:
+                    self.sensor_logger.info(shifted_distances.tolist())
+
+                self.last_lidar_read.publish(shifted_distances, scan_start_time, scan_end_time,
+                                             processor.output_times, processor.output_confidence)
+                scan_start_time = scan_end_time
+                pending = False
+                yield
+
+            part = slice(start, None)
+            processor.integrate(angles[part], distances_m[part], times[part], quality[part])
+            pending = pending or len(angles) > start
+            previous_chunk_time = now
+
     def _plot_process_function(
         self,
-        last_lidar_read: mp.Array,
-        last_lidar_update: mp.Value,
+        last_lidar_read: SharedScanBuffer,
         stop_event: mp.Event
     ):
         """
@@ -227,25 +354,19 @@ class RPLidarReader(LiDarInterface):
         """
         lidar_vis = VoitureAlgorithmPlotter()  # Replace with your plotting class
 
-        last_handled_time = 0.0
+        last_handled_seq = 0
+        lidar_data = np.zeros(last_lidar_read.size, dtype=float)
 
         try:
             while not stop_event.is_set():
                 # Check if there's fresh data
-                with last_lidar_update.get_lock():
-                    # If last_lidar_update is newer than last_handled_time => new data
-                    if last_lidar_update.value > last_handled_time:
-                        last_handled_time = last_lidar_update.value
-                    else:
-                        # No new data, slight pause
-                        time.sleep(0.05)
-                        continue
+                if last_lidar_read.latest_seq == last_handled_seq:
+                    # No new data, slight pause
+                    time.sleep(0.05)
+                    continue
 
                 # Copy the data out of shared memory
-                lidar_data = np.zeros(360, dtype=float)
-                with last_lidar_read.get_lock():
-                    for i in range(360):
-                        lidar_data[i] = last_lidar_read[i]
+                last_handled_seq = last_lidar_read.read(out=lidar_data).seq
 
                 # Update the visualization
                 lidar_vis.updateView(lidar_data)
@@ -278,14 +399,24 @@ class RPLidarReader(LiDarInterface):
 
     def get_lidar_data(self) -> np.ndarray:
         """
-        Retrieves the latest LiDAR data from shared memory as a NumPy array of shape (360,).
-        Angle i corresponds to distance in meters at angle i degrees.
+        Retrieves the latest LiDAR data from shared memory as a NumPy array of shape (bins,).
+        Bin i holds the distance in meters at angle i * 360 / bins degrees.
+        """
+        return self.last_lidar_read.read().distances
+
+    def get_lidar_frame(self) -> LidarFrame:
+        """
+        Retrieves the latest LiDAR frame (distances plus sequence number, scan
+        start/end timestamps and valid-bin count) without taking any lock.
+        """
+        return self.last_lidar_read.read()
+
+    def wait_for_lidar_frame(self, after_seq: int, timeout: float) -> bool:
+        """
+        Blocks until the lidar process publishes a frame newer than `after_seq`
+        (woken by the publication itself, no polling) or `timeout` seconds elapse.
         """
-        data_copy = np.zeros(360, dtype=float)
-        with self.last_lidar_read.get_lock():
-            for i in range(360):
-                data_copy[i] = self.last_lidar_read[i]
-        return data_copy
+        return self.last_lidar_read.wait_for_frame(after_seq, timeout)
 
     def start_live_plot(self):
         """
@@ -297,7 +428,7 @@ class RPLidarReader(LiDarInterface):
 
         self._plot_process = mp.Process(
             target=self._plot_process_function,
-            args=(self.last_lidar_read, self.last_lidar_update, self.stop_event),
+            args=(self.last_lidar_read, self.stop_event),
             daemon=True
         )
         self._plot_process.start()
@@ -313,7 +444,7 @@ if __name__ == "__main__":
         
         nonzero_count = np.count_nonzero(lidar_reader.get_lidar_data())
         
-        while(nonzero_count < 180/2):
+        while(nonzero_count < deg_to_bins(FIELD_OF_VIEW_DEG, LIDAR_BINS)/2):
             print("[Main] Waiting for lidar readings before start live plot.")
             nonzero_count = np.count_nonzero(lidar_reader.get_lidar_data())
             time.sleep(0.1)
@@ -1,7 +1,10 @@
-from algorithm.interfaces import MotorInterface
+from algorithm.interfaces import MotorInterface, SpeedInterface
 from algorithm.constants import ESC_DC_MIN, ESC_DC_MAX
+import algorithm.constants as constants
+from algorithm.speed_controller import SpeedController, SPEED_CONTROL_MODES, NEUTRAL_BAND
 from raspberry_pwm import PWM
 import algorithm.voiture_logger as voiture_logger
+import threading
 import time
 
 NEUTRAL_DC = (ESC_DC_MIN + ESC_DC_MAX)/2
@@ -10,16 +13,41 @@ MAX_DC = ESC_DC_MAX # Full forward
 
 
 class RealMotorInterface(MotorInterface):
-    def __init__(self, channel: int = 0, frequency: float = 50.0):
+    """
+    Drives the ESC, open loop by default. With a `speed_sensor` and
+    SPEED_CONTROL = "closed" (opt-in, once the gains are tuned on the car), a
+    thread runs a SpeedController at SPEED_CONTROL_RATE_HZ and owns the PWM,
+    reverse-mode sequence included: set_speed only publishes the setpoint,
+    so speed tracking does not depend on the timing of the main loop.
+    Otherwise set_speed writes the duty cycle itself, open loop.
+    """
+
+    def __init__(self, channel: int = 0, frequency: float = 50.0, speed_sensor: SpeedInterface = None):
         self.logger = voiture_logger.CentralLogger(sensor_name="RealMotor").get_logger()
         self._pwm = PWM(channel=channel, frequency=frequency)
         self._pwm.start(NEUTRAL_DC) # Start at neutral position (7.5% for Maverick msc-30BR-WP)
         self._in_reverse_mode = False
         self.logger.info("Motor PWM initialized and set to neutral (7.5%)")
         self.speed = 0
+
+        if constants.SPEED_CONTROL not in SPEED_CONTROL_MODES:
+            raise ValueError(f"Unknown speed control '{constants.SPEED_CONTROL}', expected one of {SPEED_CONTROL_MODES}")
+
+        self._speed_sensor = speed_sensor
+        self._controller = SpeedController()
+        self._control_thread = None
+        self._stop_control = threading.Event()
+        if speed_sensor is not None and constants.SPEED_CONTROL == "closed":
+            self._control_thread = threading.Thread(target=self._control_loop, name="SpeedControl", daemon=True)
+            self._control_thread.start()
+            self.logger.info(f"Closed-loop speed control running at {constants.SPEED_CONTROL_RATE_HZ:.0f} Hz")
     
     def stop(self):
-        """Stops the ESC and PWM"""
+        """Stops the speed control thread, the ESC and PWM"""
+        if self._control_thread is not None:
+            self._stop_control.set()
+            self._control_thread.join()
+            self._control_thread = None
         self._pwm.set_duty_cycle(NEUTRAL_DC)  # Return to neutral for Maverick ESC
         self._in_reverse_mode = False
         self._pwm.stop()
@@ -62,21 +90,54 @@ class RealMotorInterface(MotorInterface):
 
         MAX_SPEED = 3 # 3.0
         self.speed = max(-MAX_SPEED, min(s, MAX_SPEED))
-        
-        if self.speed < 0 and not self._in_reverse_mode:
+
+        if self._control_thread is not None:
+            self.logger.debug(f"Speed setpoint set to {self.speed} m/s")
+            return
+
+        duty_cycle = self._write_command(self.speed)
+        self.logger.debug(f"Speed set to {self.speed} m/s => duty cycle: {duty_cycle}%")
+
+    def _write_command(self, command: float) -> float:
+        """Sequences reverse mode if the direction changed and writes the duty cycle of `command`."""
+        if command < 0 and not self._in_reverse_mode:
             self._enter_reverse_mode()
-        elif self.speed >= 0 and self._in_reverse_mode:
+        elif command >= 0 and self._in_reverse_mode:
             self._exit_reverse_mode()
         
-        if abs(self.speed) < 0.1:
+        if abs(command) < NEUTRAL_BAND:
             duty_cycle = NEUTRAL_DC
-        elif self.speed >= 0:
-            duty_cycle = NEUTRAL_DC + (self.speed / 3.0) * (MAX_DC - NEUTRAL_DC)
+        elif command >= 0:
+            duty_cycle = NEUTRAL_DC + (min(command, 3.0) / 3.0) * (MAX_DC - NEUTRAL_DC)
         else:
-            duty_cycle = MIN_DC + ((self.speed + 3.0) / 3.0) * (NEUTRAL_DC - MIN_DC)
+            duty_cycle = MIN_DC + ((command + 3.0) / 3.0) * (NEUTRAL_DC - MIN_DC)
         
         self._pwm.set_duty_cycle(duty_cycle)
-        self.logger.debug(f"Speed set to {self.speed} m/s => duty cycle: {duty_cycle}%")
+        return duty_cycle
+
+    def _control_loop(self):
+        """Runs the speed controller on a fixed schedule until stop()."""
+        period = 1.0 / constants.SPEED_CONTROL_RATE_HZ
+        next_tick = time.perf_counter()
+        last_tick = next_tick
+
+        while not self._stop_control.is_set():
+            now = time.perf_counter()
+            setpoint = self.speed
+            command = self._controller.update(setpoint, self._speed_sensor.get_speed(), now - last_tick)
+            last_tick = now
+
+            try:
+                self._write_command(command)
+            except Exception as e:
+                self.logger.error(f"Speed control failed to write the duty cycle: {e}")
+
+            # Fixed rate: the next tick is scheduled from the previous one, not from now,
+            # unless the loop fell a whole period behind (e.g. a reverse sequence)
+            next_tick += period
+            if next_tick < time.perf_counter():
+                next_tick = time.perf_counter() + period
+            self._stop_control.wait(next_tick - time.perf_counter())
 
     def get_speed(self) -> float:
         return self.speed
@@ -0,0 +1,102 @@
+import numpy as np
+import multiprocessing as mp
+
+from algorithm.interfaces import LidarFrame
+from shared_seqlock import SeqlockSlots
+
+
+class SharedScanBuffer:
+    """
+    Double-buffered lidar frame slot living in shared memory.
+
+    The single writer fills the slot the readers are not looking at and then
+    publishes its sequence number (seqlock, see SeqlockSlots). Readers copy
+    the newest slot with one vectorized copy and retry only if the writer
+    lapped them meanwhile, so neither side takes a lock and a half-written
+    scan is never returned.
+    Consumers that want to run as soon as a scan lands can block in
+    `wait_for_frame`, which the writer wakes after every publication.
+    """
+
+    def __init__(self, size: int = 360):
+        self.size = size
+        self._slots = SeqlockSlots(
+            "Lidar frame",
+            distances=('d', size),
+            bin_times=('d', size),   # per-bin acquisition time
+            confidence=('d', size),  # per-bin confidence
+            stamps=('d', 2),         # [t_start, t_end]
+            valid_bins=('q', 1),
+        )
+        self._new_frame = mp.Condition()  # notified after every publication
+
+    @property
+    def latest_seq(self) -> int:
+        """Sequence number of the newest published frame (0 if none yet)."""
+        return self._slots.latest_seq
+
+    def publish(self, distances: np.ndarray, t_start: float, t_end: float,
+                bin_times: np.ndarray = None, confidence: np.ndarray = None):
+        """
+        Copies a whole scan into the inactive slot and makes it the newest frame.
+        `bin_times` holds the acquisition time of each bin; `t_end` is used if omitted.
+        `confidence` holds the per-bin confidence; 1 for every valid bin if omitted.
+        """
+        data, bin_stamps, bin_confidence, stamps, valid_bins = self._slots.fields
+
+        seq, slot = self._slots.begin_write()
+        np.copyto(data[slot], distances)
+        if bin_times is None:
+            bin_stamps[slot] = t_end
+        else:
+            np.copyto(bin_stamps[slot], bin_times)
+        if confidence is None:
+            np.not_equal(distances, 0.0, out=bin_confidence[slot])
+        else:
+            np.copyto(bin_confidence[slot], confidence)
+        stamps[slot, 0] = t_start
+        stamps[slot, 1] = t_end
+        valid_bins[slot, 0] = np.count_nonzero(distances)
+        self._slots.end_write(seq, slot)
+
+        with self._new_frame:
+            self._new_frame.notify_all()
+
+    def wait_for_frame(self, after_seq: int, timeout: float) -> bool:
+        """
+        Blocks until a frame newer than `after_seq` is published or `timeout`
+        seconds elapse. Returns True if a newer frame is available.
+        """
+        with self._new_frame:
+            return self._new_frame.wait_for(lambda: self.latest_seq > after_seq, timeout)
+
+    def read(self, out: np.ndarray = None, out_bin_times: np.ndarray = None,
+             out_confidence: np.ndarray = None) -> LidarFrame:
+        """
+        Copies the newest frame out of shared memory.
+        If `out` / `out_bin_times` / `out_confidence` are given the scan, its
+        per-bin times and confidence are written into them, avoiding allocations.
+        """
+        data, bin_stamps, bin_confidence, stamps, valid_bins = self._slots.fields
+
+        if out is None:
+            out = np.empty(self.size, dtype=np.float64)
+        if out_bin_times is None:
+            out_bin_times = np.empty(self.size, dtype=np.float64)
+        if out_confidence is None:
+            out_confidence = np.empty(self.size, dtype=np.float64)
+
+        def copy(slot):
+            np.copyto(out, data[slot])
+            np.copyto(out_bin_times, bin_stamps[slot])
+            np.copyto(out_confidence, bin_confidence[slot])
+            return float(stamps[slot, 0]), float(stamps[slot, 1]), int(valid_bins[slot, 0])
+
+        seq, copied = self._slots.read(copy)
+        if seq == 0:
+            out.fill(0.0)
+            out_bin_times.fill(0.0)
+            out_confidence.fill(0.0)
+            return LidarFrame(0, 0.0, 0.0, 0, out, out_bin_times, out_confidence)
+
+        return LidarFrame(seq, *copied, out, out_bin_times, out_confidence)
@@ -1,3 +1,4 @@
+import os
 import time
 import numpy as np
 import algorithm.interfaces as interfaces
@@ -10,30 +11,38 @@ from interface_camera import RealCameraInterface
 from interface_console import ColorConsoleInterface
 
 from algorithm.voiture_logger import CentralLogger
-from algorithm.constants import LIDAR_BAUDRATE, FIELD_OF_VIEW_DEG
+from algorithm.constants import LIDAR_BAUDRATE, FIELD_OF_VIEW_DEG, LIDAR_BINS
+from algorithm.constants import CONTROL_LOOP_MODE, CONTROL_LOOP_PERIOD_S, CONTROL_LOOP_TIMEOUT_S, CONTROL_LOOP_OVERRUN
+from algorithm.lidar_bins import deg_to_bins
 from algorithm.voiture_algorithm import VoitureAlgorithm
+from control_scheduler import ControlScheduler
  
 
 logger_instance = CentralLogger(sensor_name="main")
 logger = logger_instance.get_logger()
 
 def main():
+    scheduler = ControlScheduler(CONTROL_LOOP_PERIOD_S, CONTROL_LOOP_OVERRUN)
+    algorithm = None
+    # Handles stopped in `finally`; None until their constructor has succeeded
+    I_Motor = I_Steer = I_Lidar = I_Camera = None
+
     try:
         I_Console = ColorConsoleInterface()
         I_Lidar = RPLidarReader(port="/dev/ttyUSB0", baudrate=LIDAR_BAUDRATE)        
         I_Steer = RealSteerInterface(channel=1, frequency=50.0)
-        I_Motor = RealMotorInterface(channel=0, frequency=50.0)
 
         start_serial_monitor(port='/dev/ttyACM0', baudrate=115200)
                 
         I_SpeedReading = SharedMemSpeedInterface()
+        I_Motor = RealMotorInterface(channel=0, frequency=50.0, speed_sensor=I_SpeedReading)
         I_back_wall_distance_reading = SharedMemUltrasonicInterface()
         I_BatteryReading = SharedMemBatteryInterface()
         I_Camera = RealCameraInterface()
         
         nonzero_count = np.count_nonzero(I_Lidar.get_lidar_data())
         
-        while(nonzero_count < FIELD_OF_VIEW_DEG/2):
+        while(nonzero_count < deg_to_bins(FIELD_OF_VIEW_DEG, LIDAR_BINS)/2):
             print("[Main] Waiting for lidar readings before start.")
             nonzero_count = np.count_nonzero(I_Lidar.get_lidar_data())
             time.sleep(0.1)
@@ -53,20 +62,37 @@ def main():
         input("Press ENTER to start the code...\n")
         print("Running...")
             
-        while(True):
-            loop(algorithm)
+        loop(algorithm, scheduler)
             
     except KeyboardInterrupt:
         print("[Main] Interrupted by user.")
     finally:
-        I_Motor.stop()
-        I_Steer.stop()
-        I_Lidar.stop()
+        if scheduler.stats.duration.count > 0:
+            logger.info(scheduler.stats.report())
+            scheduler.stats.dump(os.path.join(logger_instance.get_log_dir(), "control_loop_stats.json"))
+        if algorithm is not None:
+            logger.info(f"Step stats: {algorithm.stats()}")
+            if algorithm.timer.stages:
+                logger.info(algorithm.timer.report())
+            algorithm.timer.dump(os.path.join(logger_instance.get_log_dir(), "stage_timings.json"), **algorithm.stats())
+        if I_Motor is not None:
+            I_Motor.stop()
+        if I_Steer is not None:
+            I_Steer.stop()
+        if I_Lidar is not None:
+            I_Lidar.stop()
+        if I_Camera is not None:
+            I_Camera.cleanup()
 
 
-def loop(algorithm: VoitureAlgorithm):
-    algorithm.run_step()
-    time.sleep(0.05)
+def loop(algorithm: VoitureAlgorithm, scheduler: ControlScheduler):
+    if CONTROL_LOOP_MODE == "lidar":
+        # Wake as soon as a new scan is published; fall back to a step on timeout
+        scheduler.run(algorithm.run_step,
+                      wait=lambda: algorithm.lidar.wait_for_lidar_frame(algorithm.last_lidar_seq, CONTROL_LOOP_TIMEOUT_S))
+    else:
+        # Fixed rate against absolute deadlines
+        scheduler.run(algorithm.run_step)
 
 
 if __name__ == "__main__":
@@ -29,7 +29,7 @@ def read_lidar_log(filename: str) -> pd.DataFrame:
                 timestamp_val = float(timestamp_str) / 1000.0
                 pointcloud = np.array(json.loads(array_str), dtype=float)
 
-                if len(pointcloud) != 360:
+                if len(pointcloud) != constants.LIDAR_BINS:
                     print(f"Warning: Invalid pointcloud length: {len(pointcloud)}")
 
                 records.append({"timestamp": timestamp_val, "pointcloud": pointcloud})
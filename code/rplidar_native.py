@@ -0,0 +1,243 @@
+import time
+import serial
+import numpy as np
+
+SYNC_BYTE = 0xA5
+SYNC_BYTE2 = 0x5A
+
+CMD_STOP = 0x25
+CMD_RESET = 0x40
+CMD_SCAN = 0x20
+CMD_EXPRESS_SCAN = 0x82
+CMD_SET_PWM = 0xF0
+
+DESCRIPTOR_LEN = 7
+STANDARD_NODE_LEN = 5
+EXPRESS_PACKET_LEN = 84
+EXPRESS_MEASURES_PER_PACKET = 32
+
+DEFAULT_MOTOR_PWM = 660
+
+# Express packets carry no quality field; valid returns get the top of the standard 6-bit scale.
+EXPRESS_QUALITY = 63
+
+
+class NativeRPLidarException(Exception):
+    pass
+
+
+def decode_standard(buffer: bytes):
+    """
+    Decodes standard scan nodes (5 bytes each) from the start of `buffer`.
+
+    Returns (new_scan, quality, angle_deg, distance_mm, consumed) where the first
+    four are arrays and `consumed` is the number of bytes used. Decoding stops at
+    the first node failing its check bits; one byte of it is consumed so the
+    caller resynchronizes on the next call.
+    """
+    count = len(buffer) // STANDARD_NODE_LEN
+    nodes = np.frombuffer(buffer, dtype=np.uint8, count=count * STANDARD_NODE_LEN).reshape(count, STANDARD_NODE_LEN)
+
+    start_flag = nodes[:, 0] & 0b1
+    valid = (start_flag != ((nodes[:, 0] >> 1) & 0b1)) & ((nodes[:, 1] & 0b1) == 1)
+
+    consumed = count * STANDARD_NODE_LEN
+    if not valid.all():
+        first_invalid = int(np.argmin(valid))
+        nodes = nodes[:first_invalid]
+        start_flag = start_flag[:first_invalid]
+        consumed = first_invalid * STANDARD_NODE_LEN + 1
+
+    quality = nodes[:, 0] >> 2
+    angle = ((nodes[:, 1] >> 1).astype(np.uint16) | (nodes[:, 2].astype(np.uint16) << 7)) / 64.0
+    distance = (nodes[:, 3].astype(np.uint16) | (nodes[:, 4].astype(np.uint16) << 8)) / 4.0
+
+    return start_flag.astype(bool), quality, angle, distance, consumed
+
+
+def decode_express_packets(buffer: bytes):
+    """
+    Decodes the raw fields of consecutive express scan packets (84 bytes each).
+
+    Returns (start_angle_deg, distance_mm, dtheta_deg, consumed): start angles have
+    shape (K,), distances and angle compensations (K, 32). Decoding stops at the
+    first packet with a bad sync nibble or checksum; one byte of it is consumed so
+    the caller resynchronizes on the next call.
+    """
+    count = len(buffer) // EXPRESS_PACKET_LEN
+    packets = np.frombuffer(buffer, dtype=np.uint8, count=count * EXPRESS_PACKET_LEN).reshape(count, EXPRESS_PACKET_LEN)
+
+    checksum = np.bitwise_xor.reduce(packets[:, 2:], axis=1)
+    valid = (
+        ((packets[:, 0] >> 4) == 0xA)
+        & ((packets[:, 1] >> 4) == 0x5)
+        & (checksum == ((packets[:, 0] & 0x0F) | ((packets[:, 1] & 0x0F) << 4)))
+    )
+
+    consumed = count * EXPRESS_PACKET_LEN
+    if not valid.all():
+        first_invalid = int(np.argmin(valid))
+        packets = packets[:first_invalid]
+        consumed = first_invalid * EXPRESS_PACKET_LEN + 1
+
+    start_angle = (packets[:, 2].astype(np.uint16) | ((packets[:, 3] & 0x7F).astype(np.uint16) << 8)) / 64.0
+
+    cabins = packets[:, 4:].reshape(-1, 16, 5).astype(np.int32)
+    distance = np.empty((len(packets), EXPRESS_MEASURES_PER_PACKET))
+    dtheta = np.empty((len(packets), EXPRESS_MEASURES_PER_PACKET))
+
+    # Each cabin holds two measurements: 14-bit distance plus 5-bit signed (sign-magnitude) q3 offset
+    distance[:, 0::2] = (cabins[..., 0] >> 2) | (cabins[..., 1] << 6)
+    distance[:, 1::2] = (cabins[..., 2] >> 2) | (cabins[..., 3] << 6)
+    dtheta[:, 0::2] = ((cabins[..., 4] & 0x0F) | ((cabins[..., 0] & 0b1) << 4)) / 8.0
+    dtheta[:, 1::2] = ((cabins[..., 4] >> 4) | ((cabins[..., 2] & 0b1) << 4)) / 8.0
+    dtheta[:, 0::2] *= 1 - 2 * ((cabins[..., 0] >> 1) & 0b1)
+    dtheta[:, 1::2] *= 1 - 2 * ((cabins[..., 2] >> 1) & 0b1)
+
+    return start_angle, distance, dtheta, consumed
+
+
+def express_measurements(start_angle: np.ndarray, distance: np.ndarray, dtheta: np.ndarray):
+    """
+    Turns K decoded express packets into the measurements of the first K-1 ones
+    (each packet needs the next start angle to interpolate its 32 angles).
+
+    Returns (new_scan, quality, angle_deg, distance_mm), flattened.
+    """
+    current = start_angle[:-1, None]
+    following = start_angle[1:, None]
+    step = ((following - current) % 360.0) / EXPRESS_MEASURES_PER_PACKET
+    trame = np.arange(1, EXPRESS_MEASURES_PER_PACKET + 1)
+
+    angle = ((current + step * trame - dtheta[:-1]) % 360.0).ravel()
+    measured = distance[:-1].ravel()
+
+    new_scan = np.zeros((len(current), EXPRESS_MEASURES_PER_PACKET), dtype=bool)
+    new_scan[:, 0] = following[:, 0] < current[:, 0]
+    quality = np.where(measured > 0, EXPRESS_QUALITY, 0).astype(np.uint8)
+
+    return new_scan.ravel(), quality, angle, measured
+
+
+class NativeRPLidar:
+    """
+    Minimal RPLidar driver decoding whole serial chunks with NumPy.
+
+    It mirrors the calls `_run_lidar_process` makes on `rplidar.RPLidar`
+    (connect, start_motor, start, stop, stop_motor, disconnect and the
+    `_serial` attribute) and adds `iter_batches`, which yields arrays instead
+    of one tuple per measurement.
+    """
+
+    def __init__(self, port: str, baudrate: int = 115200, timeout: float = 1.0, scan_type: str = "normal"):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.scan_type = scan_type
+        self.motor_pwm = DEFAULT_MOTOR_PWM
+        self._serial = None
+        self.connect()
+
+    def connect(self):
+        if self._serial is not None and self._serial.is_open:
+            return
+        try:
+            self._serial = serial.Serial(self.port, self.baudrate, parity=serial.PARITY_NONE,
+                                         stopbits=serial.STOPBITS_ONE, timeout=self.timeout)
+        except serial.SerialException as err:
+            raise NativeRPLidarException(f"Failed to connect to the sensor due to: {err}")
+
+    def disconnect(self):
+        if self._serial is not None:
+            self._serial.close()
+
+    def _send_command(self, cmd: int, payload: bytes = None):
+        if payload is None:
+            self._serial.write(bytes([SYNC_BYTE, cmd]))
+            return
+
+        checksum = SYNC_BYTE ^ cmd ^ len(payload)
+        for byte in payload:
+            checksum ^= byte
+        self._serial.write(bytes([SYNC_BYTE, cmd, len(payload)]) + payload + bytes([checksum]))
+
+    def _read_descriptor(self):
+        descriptor = self._serial.read(DESCRIPTOR_LEN)
+        if len(descriptor) != DESCRIPTOR_LEN or descriptor[0] != SYNC_BYTE or descriptor[1] != SYNC_BYTE2:
+            raise NativeRPLidarException(f"Incorrect descriptor starting bytes: {descriptor!r}")
+        return descriptor[2] | ((descriptor[3] & 0x3F) << 8), descriptor[6]
+
+    def start_motor(self):
+        self._serial.dtr = False
+        self.set_pwm(self.motor_pwm)
+
+    def stop_motor(self):
+        self.set_pwm(0)
+        time.sleep(0.001)
+        self._serial.dtr = True
+
+    def set_pwm(self, pwm: int):
+        self._send_command(CMD_SET_PWM, int(pwm).to_bytes(2, "little"))
+
+    def start(self, scan_type: str = None):
+        self.scan_type = scan_type or self.scan_type
+
+        if self.scan_type == "express":
+            self._send_command(CMD_EXPRESS_SCAN, bytes(5))
+            expected = EXPRESS_PACKET_LEN
+        else:
+            self._send_command(CMD_SCAN)
+            expected = STANDARD_NODE_LEN
+
+        length, _ = self._read_descriptor()
+        if length != expected:
+            raise NativeRPLidarException(f"Wrong response length {length} for {self.scan_type} scan")
+
+    def stop(self):
+        self._send_command(CMD_STOP)
+        time.sleep(0.001)
+        self._serial.reset_input_buffer()
+
+    def reset(self):
+        self._send_command(CMD_RESET)
+        time.sleep(0.002)
+        self._serial.reset_input_buffer()
+
+    def iter_batches(self):
+        """
+        Yields (new_scan, quality, angle_deg, distance_mm) arrays for every chunk
+        read from the serial port, in the same field order as `iter_measures`.
+        A chunk is whatever the port holds, or one record if it holds less, so a
+        read only blocks until the next record arrives.
+        """
+        buffer = bytearray()
+        express = self.scan_type == "express"
+        record_len = EXPRESS_PACKET_LEN if express else STANDARD_NODE_LEN
+        pending_packet = None  # last express packet, decoded once the next start angle is known
+
+        while True:
+            buffer += self._serial.read(max(self._serial.in_waiting, record_len))
+
+            # Decode until the buffer holds less than one record; a failed check
+            # consumes a single byte, so the next pass realigns on the stream.
+            consumed = 1
+            while consumed > 0:
+                if express:
+                    start_angle, distance, dtheta, consumed = decode_express_packets(bytes(buffer))
+                    del buffer[:consumed]
+                    if len(start_angle) == 0:
+                        continue
+
+                    if pending_packet is not None:
+                        start_angle = np.concatenate((pending_packet[0], start_angle))
+                        distance = np.concatenate((pending_packet[1], distance))
+                        dtheta = np.concatenate((pending_packet[2], dtheta))
+                    pending_packet = (start_angle[-1:], distance[-1:], dtheta[-1:])
+
+                    if len(start_angle) > 1:
+                        yield express_measurements(start_angle, distance, dtheta)
+                else:
+                    new_scan, quality, angle, distance, consumed = decode_standard(bytes(buffer))
+                    del buffer[:consumed]
+                    if len(angle) > 0:
+                        yield new_scan, quality, angle, distance
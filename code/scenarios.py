@@ -0,0 +1,353 @@
+"""
+Synthetic scenes, recorded scans and the pre-optimization reference
+implementations shared by benchmark.py and the tests.
+"""
+import os
+import glob
+import json
+import time
+import numpy as np
+from enum import Enum
+
+from algorithm.lidar_bins import bin_angles_deg, bin_angles_rad, deg_to_bins
+from algorithm.speed_controller import SpeedController
+from algorithm.reverse_manoeuvre import ReverseManoeuvre
+from algorithm.control_speed import front_distance
+import algorithm.constants as constants
+from camera_shared_result import SharedCameraResult
+
+
+def synthetic_scans(count: int, points_per_scan: int = 400, seed: int = 0):
+    """Yields (angles_deg, distances_m) batches resembling one RPLidar revolution."""
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        angles = np.sort(rng.uniform(0, 360, points_per_scan))
+        distances = rng.uniform(0.2, 6.0, points_per_scan)
+        distances[rng.random(points_per_scan) < 0.05] = 0.0
+        yield angles, distances
+
+
+def legacy_process_scan(angles, distances_m, pre_filtered_distances, last_update_times,
+                        heading_offset_deg, fov_filter, point_timeout_ms):
+    """Per-scan post-processing as it was done in _run_lidar_process before vectorization."""
+    indices = np.round(angles).astype(int)
+    indices = np.clip(indices, 0, 359)
+
+    pre_filtered_distances[indices] = distances_m
+    last_update_times[indices] = time.time() * 1000
+
+    shifted_distances = np.roll(pre_filtered_distances, heading_offset_deg)
+
+    for i in range(1, 360):
+        if shifted_distances[i] == 0.0:
+            shifted_distances[i] = shifted_distances[i - 1]
+
+    half_fov = fov_filter / 2.0
+    angle_array = np.arange(360)
+    diffs = (angle_array - 0) % 360
+    keep_mask = ((diffs <= half_fov) | (diffs >= 360 - half_fov))
+    shifted_distances[~keep_mask] = 0.0
+
+    current_time = time.time() * 1000
+    time_diffs = current_time - last_update_times
+    expired_mask = (time_diffs > point_timeout_ms) & (last_update_times > 0)
+    shifted_distances[expired_mask] = 0.0
+    last_update_times[expired_mask] = -1.0
+
+    return shifted_distances
+
+
+def encode_standard_nodes(quality, angles_deg, distances_mm, new_scan) -> bytes:
+    """Builds the byte stream a lidar sends in standard scan mode."""
+    angle_q6 = np.round(np.asarray(angles_deg) * 64).astype(np.int64)
+    distance_q2 = np.round(np.asarray(distances_mm) * 4).astype(np.int64)
+    start = np.asarray(new_scan, dtype=np.int64)
+
+    nodes = np.empty((len(angle_q6), 5), dtype=np.uint8)
+    nodes[:, 0] = (np.asarray(quality) << 2) | ((1 - start) << 1) | start
+    nodes[:, 1] = ((angle_q6 & 0x7F) << 1) | 1
+    nodes[:, 2] = angle_q6 >> 7
+    nodes[:, 3] = distance_q2 & 0xFF
+    nodes[:, 4] = distance_q2 >> 8
+    return nodes.tobytes()
+
+
+def encode_express_packets(start_angles_deg, distances_mm, dtheta_deg) -> bytes:
+    """Builds the byte stream a lidar sends in express scan mode (one row per packet)."""
+    packets = np.zeros((len(start_angles_deg), 84), dtype=np.int64)
+    start_q6 = np.round(np.asarray(start_angles_deg) * 64).astype(np.int64)
+    packets[:, 2] = start_q6 & 0xFF
+    packets[:, 3] = start_q6 >> 8
+
+    distances = np.asarray(distances_mm, dtype=np.int64)
+    dtheta_q3 = np.round(np.asarray(dtheta_deg) * 8).astype(np.int64)
+    sign = (dtheta_q3 < 0).astype(np.int64)
+    magnitude = np.abs(dtheta_q3)
+
+    cabins = packets[:, 4:].reshape(-1, 16, 5)
+    for half, offset in ((0, 0), (1, 2)):
+        d, sg, mag = distances[:, half::2], sign[:, half::2], magnitude[:, half::2]
+        cabins[..., offset] = ((d & 0x3F) << 2) | (sg << 1) | (mag >> 4)
+        cabins[..., offset + 1] = d >> 6
+        cabins[..., 4] |= (mag & 0x0F) << (4 * half)
+
+    checksum = np.bitwise_xor.reduce(packets[:, 2:], axis=1)
+    packets[:, 0] = 0xA0 | (checksum & 0x0F)
+    packets[:, 1] = 0x50 | (checksum >> 4)
+    return packets.astype(np.uint8).tobytes()
+
+
+def reference_decode_standard(buffer: bytes):
+    """Node-by-node decoding, as done in pure Python by rplidar-roboticia."""
+    measurements = []
+    for i in range(0, len(buffer) - 4, 5):
+        raw = buffer[i:i + 5]
+        new_scan = bool(raw[0] & 0b1)
+        inversed_new_scan = bool((raw[0] >> 1) & 0b1)
+        if new_scan == inversed_new_scan or (raw[1] & 0b1) != 1:
+            continue
+        quality = raw[0] >> 2
+        angle = ((raw[1] >> 1) + (raw[2] << 7)) / 64.
+        distance = (raw[3] + (raw[4] << 8)) / 4.
+        measurements.append((new_scan, quality, angle, distance))
+    return measurements
+
+
+def skewed_wall_scan(wall_distance: float, speed: float, rotation_s: float = 0.1, bins: int = 360):
+    """
+    Scan of a wall perpendicular to the heading, taken while driving straight
+    at it: each bin sees the wall from where the car was when it was measured.
+    Returns (distances, stamps, t_end, true_distances_at_t_end).
+    """
+    angles = bin_angles_rad(bins)
+    stamps = 1.0 + rotation_s * np.arange(1, bins + 1) / bins
+    t_end = stamps[-1]
+
+    front = np.cos(angles) > 0.2  # bins that actually hit the wall
+    distances = np.zeros(bins)
+    distances[front] = (wall_distance - speed * (stamps[front] - 1.0)) / np.cos(angles[front])
+
+    expected = np.zeros(bins)
+    expected[front] = (wall_distance - speed * rotation_s) / np.cos(angles[front])
+    return distances, np.where(front, stamps, 0.0), t_end, expected
+
+
+def legacy_convolution_filter(distances):
+    """convolution_filter as it was before the kernel was cached (zero-padded, rebuilt every call)."""
+    from scipy.signal import convolve
+
+    bins = len(distances)
+    scale = bins / 360.0
+
+    shift = deg_to_bins(constants.FIELD_OF_VIEW_DEG // 2, bins)
+    fov_bins = deg_to_bins(constants.FIELD_OF_VIEW_DEG, bins)
+
+    kernel_size = 2 * int(round((constants.CONVOLUTION_SIZE // 2) * scale)) + 1
+    center = kernel_size // 2
+    x = np.arange(kernel_size) - center
+    sigma = kernel_size
+    kernel = np.exp(-0.5 * (x / sigma) ** 2)
+
+    kernel = np.ones(kernel_size)
+    center_idx = kernel_size // 2 - int(round(20 * scale))
+    peak_width = int(round(35 * scale))
+    peak_start = center_idx - peak_width // 2
+    peak_end = peak_start + peak_width
+    kernel[peak_start:peak_end] = 2000
+    kernel /= kernel.sum()
+
+    angles = np.roll(bin_angles_deg(bins), shift)
+    distances = np.roll(distances, shift)
+    distances = convolve(distances, kernel, mode="same")
+
+    return distances[:fov_bins], angles[:fov_bins]
+
+
+SIMULATION_LOGS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../Simulateur/logs_simulation")
+
+
+def recorded_scans(log_dir: str = SIMULATION_LOGS) -> np.ndarray:
+    """Point clouds of every recorded simulation log (timestamp/.../pointcloud lines)."""
+    scans = []
+    for path in sorted(glob.glob(os.path.join(log_dir, "**", "*.csv"), recursive=True)):
+        with open(path) as f:
+            next(f)  # header
+            for line in f:
+                fields = line.strip().split("/", 6)
+                if len(fields) == 7:
+                    scans.append(json.loads(fields[6]))
+    return np.array(scans, dtype=float)
+
+
+def legacy_compute_angle(filtred_distances, filtred_angles, raw_lidar,
+                         max_angle, min_distance, scale_factor):
+    """compute_angle as it was before vectorization (Python loop over the corner windows)."""
+    bins = len(raw_lidar)
+    deg_per_bin = 360.0 / bins
+
+    target_angle = filtred_angles[np.argmax(filtred_distances)]
+    target_bin = deg_to_bins(target_angle, bins)
+    delta = 0
+
+    l_angle = 0
+    r_angle = 0
+
+    for index in range(deg_to_bins(max_angle, bins), 0, -1):
+        l_dist = raw_lidar[(target_bin + index) % bins]
+        r_dist = raw_lidar[(target_bin - index) % bins]
+
+        if l_angle == 0 and l_dist < min_distance:
+            l_angle = index
+
+        if r_angle == 0 and r_dist < min_distance:
+            r_angle = index
+
+    l_angle *= deg_per_bin
+    r_angle *= deg_per_bin
+
+    if l_angle == r_angle:
+        delta = 0
+    elif l_angle > r_angle:
+        delta = -scale_factor * (max_angle - r_angle)
+    elif l_angle < r_angle:
+        delta = +scale_factor * (max_angle - l_angle)
+
+    target_angle += delta
+    target_angle = (target_angle + 180) % 360 - 180
+
+    return target_angle, delta
+
+
+def legacy_lerp(value: float, factor: np.ndarray) -> np.ndarray:
+    """lerp() as it was before PiecewiseLinearMap."""
+    indices = np.nonzero(value < factor[:, 0])[0]
+
+    if len(indices) == 0:
+        return factor[-1, 1]
+
+    index = indices[0]
+
+    delta = factor[index] - factor[index - 1]
+    scale = (value - factor[index - 1, 0]) / delta[0]
+
+    return factor[index - 1, 1] + scale * delta[1]
+
+
+def legacy_calculate_hitbox_polar(w, h1, h2, bins=360):
+    """calculate_hitbox_polar as it was before vectorization (one loop iteration per bin)."""
+    rad_raw_angles = np.linspace(0, 2 * np.pi, num=bins, endpoint=False)
+
+    polar_coords = []
+    polar_angles = []
+
+    for theta in rad_raw_angles:
+        c = np.cos(theta)
+        s = np.sin(theta)
+
+        candidates = []
+
+        if abs(c) > 1e-14:
+            x_side = w if c > 0 else -w
+            t_x = x_side / c
+            if t_x >= 0:
+                y_at_x = s * t_x
+                if -h2 <= y_at_x <= h1:
+                    candidates.append(t_x)
+
+        if abs(s) > 1e-14:
+            y_side = h1 if s > 0 else -h2
+            t_y = y_side / s
+            if t_y >= 0:
+                x_at_y = c * t_y
+
+                if -w <= x_at_y <= w:
+                    candidates.append(t_y)
+
+        polar_coords.append(min(candidates) if candidates else 0.0)
+        polar_angles.append(theta - np.pi / 2)
+
+    angle_indices = np.round(np.array(polar_angles) / (2 * np.pi / bins)).astype(int) % bins
+
+    new_d_linha = np.zeros_like(polar_coords)
+    new_d_linha[angle_indices] = polar_coords
+
+    return new_d_linha
+
+
+def corridor_scan(half_width: float, bins: int = 360, max_range: float = 6.0) -> np.ndarray:
+    """Scan from the middle of a straight corridor of the given half width."""
+    sine = np.abs(np.sin(bin_angles_rad(bins)))
+    with np.errstate(divide="ignore"):
+        return np.minimum(np.where(sine > 1e-3, half_width / sine, max_range), max_range)
+
+
+def simulate_speed_tracking(setpoints, command_rate_hz: float, closed_loop: bool, plant_gain: float = 0.8,
+                            time_constant: float = 0.2, jitter_s: float = 0.0, stuck_sensor=None, seed: int = 0):
+    """
+    Wheel speed of a first-order motor model (1 ms steps) whose steady-state
+    speed is `plant_gain` times the nominal SPEED_COMMAND_MPS per unit of
+    command, e.g. with a sagging battery.
+    The command is updated at `command_rate_hz` (plus up to `jitter_s` of
+    random delay), either as the setpoint itself or by a SpeedController
+    reading a noisy encoder. `stuck_sensor` is a (start, end) range of
+    steps during which the encoder reads 0.
+    """
+    rng = np.random.default_rng(seed)
+    controller = SpeedController()
+    dt = 0.001
+    speed, command, next_update, last_update = 0.0, 0.0, 0.0, 0.0
+    speeds, commands = np.empty(len(setpoints)), np.empty(len(setpoints))
+
+    for step, setpoint in enumerate(setpoints):
+        now = step * dt
+        if now >= next_update:
+            measured = speed + rng.normal(0.0, 0.02)
+            if stuck_sensor is not None and stuck_sensor[0] <= step < stuck_sensor[1]:
+                measured = 0.0
+            command = controller.update(setpoint, measured, now - last_update) if closed_loop else setpoint
+            last_update = now
+            next_update = now + 1.0 / command_rate_hz + rng.uniform(0.0, jitter_s)
+        speed += (plant_gain * constants.SPEED_COMMAND_MPS * command - speed) * dt / time_constant
+        speeds[step], commands[step] = speed, command
+
+    return speeds, commands
+
+
+class FakeDetectionStatus(Enum):
+    """Stands in for control_camera.DetectionStatus, which needs OpenCV."""
+    ONLY_RED = "ONLY SEE RED"
+    ONLY_GREEN = "ONLY SEE GREEN"
+    NONE = "NO COLOR DETECTED"
+
+
+def publish_detections(result: SharedCameraResult, analysis_s: float, frames: int):
+    """Stands in for the camera worker: every field of result k is derived from k so torn reads show."""
+    for k in range(1, frames + 1):
+        t_capture = time.time()
+        time.sleep(analysis_s)
+        result.publish(t_capture, time.time(), FakeDetectionStatus.ONLY_RED, k, -k, k / 2, k / 4)
+
+
+def wall_scan(distance: float, bins: int = 360) -> np.ndarray:
+    """Scan of a wall perpendicular to the heading, `distance` ahead of the lidar."""
+    cosine = np.cos(bin_angles_rad(bins))
+    with np.errstate(divide="ignore"):
+        return np.where(cosine > 0.05, distance / cosine, 0.0)
+
+
+def reversing_manoeuvre(front_clearance_m=None, back_dist_cm=15) -> ReverseManoeuvre:
+    """Straight 1.5 s reverse at -1.2 followed by a short pull away."""
+    return ReverseManoeuvre("test", 0, -1.2, 1.5, 0, 0.7, 0.1, back_dist_cm, front_clearance_m)
+
+
+def replay_manoeuvre(manoeuvre: ReverseManoeuvre, readings, period_s: float = 0.05, ticks: int = 200):
+    """Ticks `manoeuvre` with readings(t) -> (ultrasonic_cm, lidar) until done, returns the commands sent."""
+    manoeuvre.start(0.0)
+    commands = []
+    for tick in range(ticks):
+        ultrasonic_cm, lidar = readings(tick * period_s)
+        command = manoeuvre.tick(tick * period_s, ultrasonic_cm, lidar, front_distance(lidar))
+        if command is None:
+            return commands
+        commands.append(command)
+    raise RuntimeError("manoeuvre never ended")
@@ -0,0 +1,91 @@
+import numpy as np
+import multiprocessing as mp
+
+_MAX_READ_RETRIES = 8
+
+
+class SeqlockSlots:
+    """
+    Double-buffered record living in shared memory, shared by one writer
+    process and any number of readers without a lock (seqlock).
+
+    The writer fills the slot the readers are not looking at and then
+    publishes its sequence number; readers copy the newest slot and retry
+    only if the writer lapped them meanwhile, so a half-written record is
+    never returned. Each keyword argument declares one field of the record
+    as (typecode, shape); `fields` exposes them, in that order, as NumPy
+    views of shape (2, *shape) indexed by slot.
+
+        slots = SeqlockSlots("Result", values=('d', 3))
+        seq, slot = slots.begin_write()
+        slots.fields[0][slot] = (1.0, 2.0, 3.0)
+        slots.end_write(seq, slot)
+    """
+
+    def __init__(self, name: str, **fields):
+        self.name = name
+        self._shapes = tuple(np.atleast_1d(shape) for _, shape in fields.values())
+        self._raw_fields = tuple(mp.RawArray(typecode, 2 * int(np.prod(shape))) for typecode, shape in fields.values())
+        self._raw_seqs = mp.RawArray('q', 2)    # seq of each slot, 0 while it is being written
+        self._raw_latest = mp.RawArray('q', 1)  # last published sequence number
+        self._views = None
+
+    def __getstate__(self):
+        # The NumPy views cannot be pickled; they are rebuilt lazily in the child process.
+        state = self.__dict__.copy()
+        state['_views'] = None
+        return state
+
+    def _get_views(self):
+        if self._views is None:
+            self._views = (
+                tuple(np.ctypeslib.as_array(raw).reshape(2, *shape) for raw, shape in zip(self._raw_fields, self._shapes)),
+                np.ctypeslib.as_array(self._raw_seqs),
+                np.ctypeslib.as_array(self._raw_latest),
+            )
+        return self._views
+
+    @property
+    def fields(self) -> tuple:
+        return self._get_views()[0]
+
+    @property
+    def latest_seq(self) -> int:
+        """Sequence number of the newest published record (0 if none yet)."""
+        return int(self._get_views()[2][0])
+
+    def begin_write(self):
+        """Marks the slot readers are not looking at as being written; returns (seq, slot) to fill."""
+        _, seqs, latest = self._get_views()
+        seq = int(latest[0]) + 1
+        slot = seq % 2
+        seqs[slot] = 0
+        return seq, slot
+
+    def end_write(self, seq: int, slot: int):
+        """Makes the slot filled since `begin_write` the newest record."""
+        _, seqs, latest = self._get_views()
+        seqs[slot] = seq
+        latest[0] = seq
+
+    def read(self, copy):
+        """
+        Calls `copy(slot)` on the newest slot until the writer did not touch it
+        meanwhile and returns (seq, what `copy` returned), or (0, None) if
+        nothing was published yet.
+        """
+        _, seqs, latest = self._get_views()
+
+        for _ in range(_MAX_READ_RETRIES):
+            seq = int(latest[0])
+            if seq == 0:
+                return 0, None
+
+            slot = seq % 2
+            copied = copy(slot)
+
+            # The writer only touches this slot again two records later.
+            if seqs[slot] == seq:
+                return seq, copied
+
+        raise RuntimeError(f"{self.name} kept changing while being read")
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import algorithm.constants as constants
+
+
+@pytest.fixture(autouse=True)
+def reload_constants():
+    """Tests override constants freely: restore the configured values (and invalidate caches) after each one."""
+    yield
+    constants.load_constants()
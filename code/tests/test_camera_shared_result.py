@@ -0,0 +1,29 @@
+import multiprocessing as mp
+
+from camera_shared_result import SharedCameraResult
+from scenarios import FakeDetectionStatus, publish_detections
+
+
+def test_default_detection_before_the_first_result():
+    result = SharedCameraResult(FakeDetectionStatus)
+    assert result.read().seq == 0 and result.read().status is FakeDetectionStatus.NONE
+
+
+def test_reads_are_never_torn():
+    frames = 30
+    result = SharedCameraResult(FakeDetectionStatus)
+    worker = mp.Process(target=publish_detections, args=(result, 0.005, frames), daemon=True)
+    worker.start()
+
+    last_seq = 0
+    while worker.is_alive():
+        detection = result.read()
+        if detection.seq == 0:
+            continue
+        # Every field of result k is derived from k
+        assert detection.avg_r == -detection.avg_g == 2 * detection.ratio_r == 4 * detection.ratio_g
+        assert detection.seq >= last_seq
+        last_seq = detection.seq
+    worker.join()
+
+    assert result.read().seq == frames
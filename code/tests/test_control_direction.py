@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+import algorithm.constants as constants
+import algorithm.control_direction as control_direction
+import algorithm.control_speed as control_speed
+from algorithm.control_direction import ConvolutionFilter
+from algorithm.lidar_bins import deg_to_bins
+from scenarios import (recorded_scans, legacy_convolution_filter, legacy_compute_angle,
+                       legacy_calculate_hitbox_polar)
+
+
+@pytest.mark.parametrize("bins", [360, 720, 1440])
+def test_convolution_filter_matches_legacy_on_fov_filtered_scans(bins):
+    rng = np.random.default_rng(3)
+    scans = rng.uniform(0.2, 6.0, (16, bins))
+    half = deg_to_bins(constants.LIDAR_FOV_FILTER / 2, bins)
+    scans[:, half + 1:bins - half] = 0.0  # what the lidar process publishes
+
+    # Identical wherever the zero padding of the old version met zeroed bins anyway
+    cached = ConvolutionFilter()
+    for scan in scans:
+        distances, angles = cached(scan)
+        legacy_distances, legacy_angles = legacy_convolution_filter(scan)
+        assert np.max(np.abs(distances - legacy_distances)) < 1e-9
+        assert np.array_equal(angles, legacy_angles)
+
+
+def test_convolution_filter_rebuilds_its_kernel_on_reload():
+    cached = ConvolutionFilter()
+    scan = np.ones(360)
+    cached(scan)
+    constants.CONFIG_GENERATION += 1
+    cached(scan)
+    assert cached._key[1] == constants.CONFIG_GENERATION
+
+
+@pytest.mark.parametrize("bins", [360, 1440])
+@pytest.mark.parametrize("max_angle", [None, 45, 90])
+def test_compute_angle_matches_the_legacy_loop(monkeypatch, bins, max_angle):
+    if max_angle is None:
+        max_angle = control_direction.AVOID_CORNER_MAX_ANGLE
+    monkeypatch.setattr(control_direction, "AVOID_CORNER_MAX_ANGLE", max_angle)
+
+    scans = np.repeat(recorded_scans(), bins // 360, axis=1)  # same scenes at a finer resolution
+    for scan in scans:
+        shrinked = control_direction.shrink_space(scan) if bins == 360 else scan
+        filtered = tuple(np.copy(a) for a in control_direction.convolution_filter(shrinked))
+        expected = legacy_compute_angle(*filtered, shrinked, max_angle,
+                                        control_direction.AVOID_CORNER_MIN_DISTANCE,
+                                        control_direction.AVOID_CORNER_SCALE_FACTOR)
+        assert control_direction.compute_angle(*filtered, shrinked) == expected
+
+
+def test_batch_pipeline_matches_per_scan():
+    scans = recorded_scans()
+    expected = []
+    for scan in scans:
+        shrinked = control_direction.shrink_space(scan)
+        steer, target = control_direction.compute_steer_from_lidar(shrinked)
+        expected.append((steer, target, control_speed.compute_speed(shrinked, target)))
+
+    shrinked = control_direction.shrink_space_batch(scans)
+    steer, target = control_direction.compute_steer_from_lidar_batch(shrinked)
+    batched = steer, target, control_speed.compute_speed_batch(shrinked, target)
+
+    for expected_values, values in zip(np.array(expected).T, batched):
+        assert np.allclose(expected_values, values, rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("bins", [360, 720, 1440, 1000])
+@pytest.mark.parametrize("geometry", [(constants.HITBOX_W, constants.HITBOX_H1, constants.HITBOX_H2),
+                                      (0.15, 0.2, 0.3), (0.1, 0.1, 0.1)])
+def test_hitbox_matches_the_legacy_loop(bins, geometry):
+    expected = legacy_calculate_hitbox_polar(*geometry, bins)
+    assert np.allclose(expected, control_direction.calculate_hitbox_polar(*geometry, bins), rtol=0, atol=1e-12)
+
+
+def test_get_hitbox_follows_the_constants(monkeypatch):
+    # As after load_constants() in multiplot.py
+    monkeypatch.setattr(constants, "HITBOX_W", 0.2)
+    assert np.array_equal(control_direction.get_hitbox(360),
+                          legacy_calculate_hitbox_polar(0.2, constants.HITBOX_H1, constants.HITBOX_H2))
@@ -0,0 +1,20 @@
+import time
+
+import numpy as np
+
+from control_scheduler import ControlScheduler
+
+
+def test_catchup_does_not_drift():
+    steps, period_s = 100, 0.01
+    durations = np.random.default_rng(0).uniform(0.002, 0.006, steps)
+    durations[::50] = 0.025
+    step_iter = iter(durations)
+
+    scheduler = ControlScheduler(period_s, "catchup")
+    start = time.monotonic()
+    scheduler.run(lambda: time.sleep(next(step_iter)), max_steps=steps)
+    elapsed = time.monotonic() - start
+
+    # The last step starts on its deadline
+    assert abs(elapsed - (steps - 1) * period_s) < 3 * period_s
@@ -0,0 +1,49 @@
+import pytest
+
+import algorithm.constants as constants
+import algorithm.control_direction as control_direction
+import algorithm.control_speed as control_speed
+from algorithm.control_speed import SpeedGovernor, front_distance
+from scenarios import corridor_scan, recorded_scans, wall_scan
+
+
+def test_governor_slows_down_to_a_stop_approaching_a_wall():
+    governor = SpeedGovernor()
+    previous = 0.0
+    for wall in (0.35, 0.45, 0.6, 0.8, 1.2, 2.0, 3.0):
+        speed = governor(wall_scan(wall), 0.0, 1.0, control_speed.MAX_SPEED)
+        assert speed >= previous
+        if wall - constants.HITBOX_H1 <= control_speed.STOP_DISTANCE:
+            assert speed == 0.0
+        previous = speed
+
+
+@pytest.mark.parametrize("steer", ["left", "right"])
+def test_governor_limits_the_speed_steering_into_a_corridor_wall(steer):
+    governor = SpeedGovernor()
+    scan = corridor_scan(0.4)
+    assert governor(scan, 0.0, 1.0, 1.0) == 1.0
+    steer = constants.STEERING_LIMIT if steer == "left" else -constants.STEERING_LIMIT
+    assert governor(scan, steer, 1.0, 1.0) < 1.0 and governor.free_path < 1.0
+
+
+def test_governor_works_in_command_units(monkeypatch):
+    # A motor twice as fast per unit of command needs half the command for the same safe speed
+    governor = SpeedGovernor()
+    scan = wall_scan(0.6)
+    nominal = governor(scan, 0.0, 1.0, control_speed.MAX_SPEED)
+    assert nominal < control_speed.MAX_SPEED
+
+    monkeypatch.setattr(constants, "SPEED_COMMAND_MPS", 2.0)
+    assert governor(scan, 0.0, 1.0, control_speed.MAX_SPEED) == pytest.approx(nominal / 2)
+    assert governor(wall_scan(3.0), 0.0, 1.0, 0.4) == 0.4  # 0.8 m/s is safe 3 m away
+
+
+def test_front_speed_from_the_shared_front_distance(monkeypatch):
+    # Matches what compute_speed used to measure itself
+    monkeypatch.setattr(constants, "SPEED_GOVERNOR", "front")
+    for scan in recorded_scans():
+        shrinked = control_direction.shrink_space(scan)
+        own = control_speed.compute_speed(shrinked, 5.0)
+        shared = control_speed.compute_speed(shrinked, 5.0, front_distance(scan))
+        assert abs(own - shared) < 0.01
@@ -0,0 +1,104 @@
+import logging
+
+import numpy as np
+import pytest
+
+from algorithm.lidar_processing import LidarScanProcessor, TemporalScanFilter
+from lidar_shared_buffer import SharedScanBuffer
+
+interface_lidar = pytest.importorskip("interface_lidar")  # needs rplidar and the plotting stack
+
+DISTANCES_MM = 1000.0 + np.arange(360)  # a different range in every bin so a forward-filled bin shows
+
+
+class FakeClock:
+    """Stands in for the time module in interface_lidar: every call moves on by `step_s`."""
+
+    def __init__(self, step_s: float = 1e-4):
+        self.now = 1000.0
+        self.step_s = step_s
+
+    def time(self) -> float:
+        self.now += self.step_s
+        return self.now
+
+
+class FakeLidar:
+    """
+    One measurement per degree: from `start_angle` (negative to start in the middle of
+    a revolution) through `revolutions` complete revolutions to the start of the next one.
+    """
+
+    def __init__(self, revolutions: int, chunk_size: int = 100, start_angle: int = 0):
+        self.angles = (np.arange(start_angle, 360 * revolutions + 1) % 360).astype(float)
+        self.chunk_size = chunk_size
+
+    def iter_measures(self):
+        for angle in self.angles:
+            yield angle == 0, 15, angle, DISTANCES_MM[int(angle)]
+
+    def iter_batches(self):
+        new_scan = self.angles == 0
+        quality = np.full(len(self.angles), 15)
+        distances = DISTANCES_MM[self.angles.astype(int)]
+        for i in range(0, len(self.angles), self.chunk_size):
+            part = slice(i, i + self.chunk_size)
+            yield new_scan[part], quality[part], self.angles[part], distances[part]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(interface_lidar, "time", clock)
+    return clock
+
+
+def make_reader(acquisition_mode: str, stream_sector_deg: int = 30):
+    """RPLidarReader without its lidar process, publishing into a fresh buffer."""
+    reader = interface_lidar.RPLidarReader.__new__(interface_lidar.RPLidarReader)
+    reader.acquisition_mode = acquisition_mode
+    reader.stream_sector_deg = stream_sector_deg
+    reader.sensor_logger = logging.getLogger("test_interface_lidar")
+    reader.last_lidar_read = SharedScanBuffer(360)
+    return reader
+
+
+def make_processor():
+    """No heading offset, FOV or timeout in the way, median of the last 3 revolutions."""
+    return LidarScanProcessor(0, 360, 10000, 360, "last", 0, TemporalScanFilter(360, 3, "median"))
+
+
+@pytest.mark.parametrize("publish, acquisition_mode", [
+    ("_publish_sectors", "stream"),
+    ("_publish_batches", "stream"),
+    ("_publish_batches", "scan"),
+])
+def test_temporal_filter_sees_every_measurement(clock, publish, acquisition_mode):
+    # Measurements stamped at or before the time of the previous fusion (the first of
+    # every sector, or the rest of a chunk after a revolution boundary) must still be fused
+    reader = make_reader(acquisition_mode)
+    for _ in getattr(reader, publish)(FakeLidar(revolutions=5), make_processor()):
+        pass
+
+    frame = reader.last_lidar_read.read()
+    assert np.array_equal(frame.distances, DISTANCES_MM / 1000.0)
+
+
+@pytest.mark.parametrize("start_angle", [0, -160])
+def test_scan_mode_publishes_complete_revolutions_only(clock, start_angle):
+    reader = make_reader("scan")
+    frames = []
+    for _ in reader._publish_batches(FakeLidar(revolutions=3, start_angle=start_angle), make_processor()):
+        frames.append(reader.last_lidar_read.read().distances.copy())
+
+    assert len(frames) == 3
+    for distances in frames:
+        assert np.array_equal(distances, DISTANCES_MM / 1000.0)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 100, 1000])
+def test_native_stream_mode_publishes_every_sector(clock, chunk_size):
+    # However the serial reads chunk the stream
+    reader = make_reader("stream", stream_sector_deg=30)
+    publications = sum(1 for _ in reader._publish_batches(FakeLidar(3, chunk_size), make_processor()))
+    assert publications == 3 * 360 // 30
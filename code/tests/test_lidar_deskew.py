@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from algorithm.lidar_bins import bin_angles_deg, bin_angles_rad
+from algorithm.lidar_deskew import deskew_scan
+from algorithm.lidar_processing import LidarScanProcessor
+from scenarios import skewed_wall_scan
+
+SPEED = 3.0
+
+
+@pytest.fixture
+def wall():
+    """Wall 2 m ahead scanned at SPEED m/s, and the bins facing it squarely enough to compare ranges."""
+    distances, stamps, t_end, expected = skewed_wall_scan(2.0, SPEED)
+    centre = (expected > 0) & (np.abs(np.cos(bin_angles_rad(360))) > 0.5)
+    raw_error = np.max(np.abs(distances[centre] - expected[centre]))
+    return distances, stamps, t_end, expected, centre, raw_error
+
+
+def test_deskew_removes_the_motion_skew(wall):
+    distances, stamps, t_end, expected, centre, raw_error = wall
+    corrected = deskew_scan(distances, stamps, t_end, SPEED, 0.0, 0.26)
+    assert np.max(np.abs(corrected[centre] - expected[centre])) < raw_error / 5
+
+
+def test_deskew_keeps_the_wall_in_front_when_turning(wall):
+    distances, stamps, t_end = wall[:3]
+    turning = deskew_scan(distances, stamps, t_end, SPEED, 15.0, 0.26)
+    assert np.count_nonzero(turning) >= np.count_nonzero(distances) - 2
+
+
+def test_deskew_through_the_processor_timestamps(wall):
+    distances, _, t_end, expected, centre, raw_error = wall
+
+    # Same revolution through LidarScanProcessor, timestamped as RPLidarReader._publish_scans does
+    def processed(times):
+        processor = LidarScanProcessor(0, 360, 1000, 360)
+        processor.integrate(bin_angles_deg(360), distances, times)
+        scan = processor.process(t_end)
+        return deskew_scan(scan, processor.output_times, t_end, SPEED, 0.0, 0.26)
+
+    spread = processed(np.linspace(1.0, t_end, 360 + 1)[1:])
+    assert np.max(np.abs(spread[centre] - expected[centre])) < raw_error / 5
+    one_stamp = processed(t_end)  # every measurement stamped with the end of the revolution
+    assert np.max(np.abs(one_stamp[centre] - distances[centre])) < 1e-9
+
+
+def test_deskew_is_a_no_op_without_stamps_or_speed(wall):
+    distances, stamps, t_end = wall[:3]
+    assert deskew_scan(distances, None, t_end, SPEED, 0.0, 0.26) is distances
+    assert deskew_scan(distances, stamps, t_end, 0.0, 10.0, 0.26) is distances
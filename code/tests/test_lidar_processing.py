@@ -0,0 +1,52 @@
+import time
+
+import numpy as np
+import pytest
+
+from algorithm.constants import LIDAR_HEADING_OFFSET_DEG, LIDAR_FOV_FILTER, LIDAR_POINT_TIMEOUT_MS
+from algorithm.lidar_bins import bin_angles_rad
+from algorithm.lidar_processing import LidarScanProcessor, TemporalScanFilter
+from scenarios import synthetic_scans, legacy_process_scan
+
+
+def test_processor_matches_the_legacy_loop():
+    legacy_state = np.zeros(360), np.zeros(360)
+    # The legacy loop let the last measurement of a bin win
+    processor = LidarScanProcessor(LIDAR_HEADING_OFFSET_DEG, LIDAR_FOV_FILTER, LIDAR_POINT_TIMEOUT_MS,
+                                   aggregation="last")
+    for angles, distances in synthetic_scans(64):
+        angles = np.clip(angles, 0, 359.4)  # legacy clips instead of wrapping 359.5+ to bin 0
+        angles, distances = angles[distances > 0], distances[distances > 0]  # iter_scans drops empty returns
+        expected = legacy_process_scan(angles, distances, *legacy_state,
+                                       LIDAR_HEADING_OFFSET_DEG, LIDAR_FOV_FILTER, LIDAR_POINT_TIMEOUT_MS)
+        processor.integrate(angles, distances, time.time())
+        assert np.array_equal(processor.process(time.time()), expected)
+
+
+@pytest.mark.parametrize("strategy", ["median", "ema"])
+def test_temporal_filter_fed_by_sector_matches_fed_by_revolution(strategy):
+    rng = np.random.default_rng(2)
+    truth = 1.0 + np.abs(np.sin(bin_angles_rad(360) * 3))
+    measured = truth + rng.normal(0, 0.02, (20, 360))
+    measured[rng.random((20, 360)) < 0.03] += 2.0
+    fresh = rng.random((20, 360)) >= 0.2
+
+    scan_filter = TemporalScanFilter(360, 5, strategy)
+    sector_filter = TemporalScanFilter(360, 5, strategy)
+    sectors = np.arange(360) // 30
+    for i in range(20):
+        expected = scan_filter.update(measured[i], fresh[i]).copy()
+        for sector in range(12):
+            fused = sector_filter.update(measured[i], fresh[i] & (sectors == sector), end_of_revolution=sector == 11)
+        assert np.allclose(fused, expected)
+
+
+def test_measurements_stamped_at_the_fusion_time_are_fused():
+    processor = LidarScanProcessor(0, 360, 10000, 360, "last", 0, TemporalScanFilter(360, 3, "median"))
+    processor.integrate(np.arange(180), np.ones(180), 1.0)
+    processor.process(1.0, end_of_revolution=False)
+
+    # The rest of the revolution carries the same timestamp as the fusion above
+    processor.integrate(np.arange(180, 360), np.full(180, 2.0), 1.0)
+    scan = processor.process(1.0)
+    assert np.array_equal(scan, np.repeat([1.0, 2.0], 180))
@@ -0,0 +1,80 @@
+import multiprocessing as mp
+
+import numpy as np
+import pytest
+
+from lidar_shared_buffer import SharedScanBuffer
+from shared_seqlock import SeqlockSlots
+
+
+def publish_scans(buffer: SharedScanBuffer, frames: int):
+    """Every bin, stamp and count of frame k is derived from k so torn reads show."""
+    for k in range(1, frames + 1):
+        distances = np.full(buffer.size, float(k))
+        distances[:k % buffer.size] = 0.0
+        buffer.publish(distances, k, 2.0 * k, bin_times=np.full(buffer.size, 3.0 * k))
+
+
+def test_empty_frame_before_the_first_publication():
+    frame = SharedScanBuffer(8).read()
+    assert frame.seq == 0 and frame.valid_bins == 0
+    assert not frame.distances.any() and not frame.stamps.any() and not frame.confidence.any()
+
+
+def test_read_returns_the_newest_frame_into_the_given_arrays():
+    buffer = SharedScanBuffer(8)
+    distances = np.arange(8, dtype=float)
+    buffer.publish(distances, 1.0, 2.0)
+    buffer.publish(2 * distances, 3.0, 4.0)
+
+    out = np.empty(8)
+    frame = buffer.read(out)
+    assert frame.distances is out
+    assert (frame.seq, frame.t_start, frame.t_end, frame.valid_bins) == (2, 3.0, 4.0, 7)
+    assert np.array_equal(out, 2 * distances)
+    assert np.array_equal(frame.stamps, np.full(8, 4.0))
+    assert np.array_equal(frame.confidence, distances != 0)
+
+
+def test_wait_for_frame_times_out_without_a_publication():
+    buffer = SharedScanBuffer(8)
+    assert not buffer.wait_for_frame(0, timeout=0.01)
+    buffer.publish(np.ones(8), 0.0, 1.0)
+    assert buffer.wait_for_frame(0, timeout=0.01)
+
+
+def test_reads_are_never_torn():
+    frames = 2000
+    buffer = SharedScanBuffer(360)
+    worker = mp.Process(target=publish_scans, args=(buffer, frames), daemon=True)
+    worker.start()
+
+    last_seq = 0
+    out = np.empty(360)
+    while worker.is_alive():
+        frame = buffer.read(out)
+        if frame.seq == 0:
+            continue
+        k = frame.seq
+        assert (frame.t_start, frame.t_end, frame.valid_bins) == (k, 2.0 * k, 360 - k % 360)
+        assert np.all(out[k % 360:] == k) and not out[:k % 360].any()
+        assert np.all(frame.stamps == 3.0 * k)
+        assert k >= last_seq
+        last_seq = k
+    worker.join()
+
+    assert buffer.latest_seq == frames
+
+
+def test_seqlock_gives_up_on_a_record_that_keeps_changing():
+    slots = SeqlockSlots("Record", values=('d', 2))
+    seq, slot = slots.begin_write()
+    slots.end_write(seq, slot)
+
+    def copy_while_the_writer_laps(slot):
+        # The writer publishes a record and starts on the slot being read before the copy finishes
+        slots.end_write(*slots.begin_write())
+        slots.begin_write()
+
+    with pytest.raises(RuntimeError, match="Record kept changing"):
+        slots.read(copy_while_the_writer_laps)
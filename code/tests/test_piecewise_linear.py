@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+import algorithm.constants as constants
+from algorithm.piecewise_linear import PiecewiseLinearMap
+from scenarios import legacy_lerp
+
+
+@pytest.mark.parametrize("name", ["STEER_FACTOR", "SPEED_FACTOR_DIST", "SPEED_FACTOR_ANG", "LERP_MAP_LENGTH"])
+def test_map_matches_lerp(name):
+    rng = np.random.default_rng(4)
+    table = getattr(constants, name)
+    mapping = PiecewiseLinearMap(name)
+
+    # Breakpoints, both sides of the table and random points in between
+    values = np.concatenate((table[:, 0], table[:, 0] + 1e-9, [table[0, 0] - 1.0, table[-1, 0] + 5.0],
+                             rng.uniform(table[0, 0] - 1.0, table[-1, 0] + 1.0, 1000)))
+    expected = np.array([legacy_lerp(v, table) for v in values])
+    assert np.allclose(expected, [mapping(v) for v in values], rtol=0, atol=1e-12)
+    assert np.allclose(expected, mapping(values), rtol=0, atol=1e-12)
+
+
+def test_map_follows_a_config_reload():
+    steer = PiecewiseLinearMap("STEER_FACTOR")
+    original = constants.STEER_FACTOR
+    steer(1.0)
+    constants.STEER_FACTOR = original * [1.0, 2.0]
+    constants.CONFIG_GENERATION += 1
+    assert np.isclose(steer(15.0), 2 * legacy_lerp(15.0, original))
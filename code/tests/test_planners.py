@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+import algorithm.constants as constants
+import algorithm.control_direction as control_direction
+import algorithm.control_speed as control_speed
+from algorithm.arc_planner import ArcPlanner
+from algorithm.gap_planner import FollowTheGapPlanner, GAP_AIMS, extend_disparities
+from algorithm.lidar_bins import sector_indices
+from algorithm.planners import ConvolutionPlanner
+from algorithm.stage_timer import StageTimer
+from scenarios import corridor_scan, recorded_scans
+
+OPENINGS = [(slice(20, 60), 1), (slice(300, 340), -1)]  # bins of an opening on the left / right, steer sign
+
+
+def test_arc_planner_goes_straight_down_a_corridor():
+    planner = ArcPlanner()
+    steer, _ = planner(corridor_scan(0.5))
+    assert steer == 0.0 and planner.speed == max(constants.ARC_SPEEDS)
+
+
+@pytest.mark.parametrize("opening, sign", OPENINGS)
+def test_arc_planner_turns_into_an_opening(opening, sign):
+    scan = np.full(360, 1.0)
+    scan[opening] = 3.0
+    steer, target = ArcPlanner()(scan)
+    assert np.sign(steer) == sign and np.sign(target) == sign
+
+
+def test_arc_planner_stops_in_front_of_an_obstacle():
+    scan = corridor_scan(0.5)
+    scan[sector_indices(0, 10, 360)] = constants.HITBOX_H1 + 0.05
+    planner = ArcPlanner()
+    planner(scan)
+    assert planner.speed == 0.0
+
+
+def test_arc_planner_checks_the_ttc_in_m_s(monkeypatch):
+    # Enclosed 1.2 m around: every speed command is admissible until a command means twice the speed
+    planner = ArcPlanner()
+    planner(np.full(360, 1.2))
+    assert planner.speed == max(constants.ARC_SPEEDS)
+
+    monkeypatch.setattr(constants, "SPEED_COMMAND_MPS", 2.0)
+    planner = ArcPlanner()
+    planner(np.full(360, 1.2))
+    assert planner.speed == min(constants.ARC_SPEEDS)
+
+
+def test_extend_disparities_widens_the_closer_side():
+    # Over the bins the car half width covers
+    extended = extend_disparities(np.array([3.0, 3.0, 3.0, 0.5, 0.5, 3.0, 3.0, 3.0]), 10.0, 0.1, 0.3)
+    assert np.array_equal(extended, [3.0, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 3.0])
+
+
+def test_gap_planner_goes_straight_down_a_corridor():
+    plan = FollowTheGapPlanner().plan(corridor_scan(0.5))
+    assert plan.steer == 0.0 and plan.target_angle == 0.0
+
+
+@pytest.mark.parametrize("opening, sign", OPENINGS)
+def test_gap_planner_turns_into_an_opening(opening, sign):
+    scan = np.full(360, 0.8)
+    scan[opening] = 3.0
+    plan = FollowTheGapPlanner().plan(scan)
+    assert np.sign(plan.steer) == sign and np.sign(plan.target_angle) == sign
+
+
+@pytest.mark.parametrize("aim", GAP_AIMS)
+def test_gap_planner_passes_a_pole_with_the_car_half_width_to_spare(monkeypatch, aim):
+    monkeypatch.setattr(constants, "GAP_AIM", aim)
+    scan = corridor_scan(1.5)
+    scan[sector_indices(0, 1, 360)] = 0.9
+    plan = FollowTheGapPlanner().plan(scan)
+    assert 0.9 * np.sin(np.radians(abs(plan.target_angle) - 1)) >= constants.HITBOX_W
+
+
+def test_timed_convolution_planner_matches_the_untimed_pipeline():
+    scans = recorded_scans()
+    planner = ConvolutionPlanner()
+    planner.prepare(scans.shape[1])
+    planner.timer = StageTimer(window=len(scans))
+    for scan in scans:
+        plan = planner.plan(scan)
+        shrinked = control_direction.shrink_space(scan)
+        steer, target = control_direction.compute_steer_from_lidar(shrinked)
+        assert (plan.steer, plan.target_angle) == (steer, target)
+        assert plan.speed == control_speed.compute_speed(shrinked, target)
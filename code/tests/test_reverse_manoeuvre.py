@@ -0,0 +1,21 @@
+import pytest
+
+from algorithm.reverse_manoeuvre import ReverseManoeuvre
+from scenarios import wall_scan, reversing_manoeuvre, replay_manoeuvre
+
+
+# Backing away from a wall at 0.5 m/s: each exit condition ends the reverse on its own
+@pytest.mark.parametrize("manoeuvre, readings, exit_reason", [
+    (reversing_manoeuvre(), lambda t: (max(60 - 50 * t, 10), wall_scan(0.35 + 0.5 * t)), "ultrasonic"),
+    (reversing_manoeuvre(front_clearance_m=0.6), lambda t: (100, wall_scan(0.35 + 0.5 * t)), "front clear"),
+    (reversing_manoeuvre(), lambda t: (-1.0, wall_scan(0.35 + 0.5 * t)), "timeout"),
+])
+def test_reverse_exit_conditions(manoeuvre, readings, exit_reason):
+    replay_manoeuvre(manoeuvre, readings)
+    assert manoeuvre.exit_reason == exit_reason
+
+
+def test_pulling_away_stops_if_the_front_closes_in():
+    commands = replay_manoeuvre(ReverseManoeuvre("test", 30, -2.0, 0.2, -30, 0.7, 1.0, 15),
+                                lambda t: (100, wall_scan(0.35)))
+    assert all(speed < 0 for _, speed in commands)
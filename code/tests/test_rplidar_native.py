@@ -0,0 +1,108 @@
+import os
+import time
+import threading
+
+import numpy as np
+import pytest
+
+import rplidar_native
+from scenarios import encode_standard_nodes, encode_express_packets, reference_decode_standard
+
+
+def pty_roundtrip(stream: bytes, scan_type: str, measurements: int, timeout: float = 0.5):
+    """Feeds `stream` to NativeRPLidar through a pseudo-terminal standing in for the sensor."""
+    master, slave = os.openpty()
+    length = rplidar_native.EXPRESS_PACKET_LEN if scan_type == "express" else rplidar_native.STANDARD_NODE_LEN
+    descriptor = bytes([0xA5, 0x5A, length, 0, 0, 0x40, 0x82 if scan_type == "express" else 0x81])
+
+    def sensor():
+        os.read(master, 16)  # scan command
+        os.write(master, descriptor)
+        for i in range(0, len(stream), 4096):
+            os.write(master, stream[i:i + 4096])
+
+    feeder = threading.Thread(target=sensor, daemon=True)
+    feeder.start()
+
+    lidar = rplidar_native.NativeRPLidar(os.ttyname(slave), timeout=timeout, scan_type=scan_type)
+    lidar.start()
+    angles = []
+    received = 0
+    for _, _, angle, _ in lidar.iter_batches():
+        angles.append(angle)
+        received += len(angle)
+        if received >= measurements:
+            break
+    lidar.disconnect()
+    os.close(master)
+    os.close(slave)
+    return np.concatenate(angles)[:measurements]
+
+
+@pytest.fixture
+def standard_stream():
+    """Two revolutions of ~360 nodes: (stream, quality, angles, distances, new_scan)."""
+    rng = np.random.default_rng(0)
+    points = 360 * 2
+    angles = np.tile(np.linspace(0, 359, 360), 2) + rng.uniform(0, 0.9, points)
+    angles = np.round(angles * 64) / 64
+    distances = np.round(rng.uniform(100, 6000, points) * 4) / 4
+    quality = rng.integers(0, 64, points)
+    new_scan = np.tile(np.arange(360) == 0, 2)
+    return encode_standard_nodes(quality, angles, distances, new_scan), quality, angles, distances, new_scan
+
+
+@pytest.fixture
+def express_stream():
+    """60 packets of 32 measurements, start angles advancing ~11.25 deg: (stream, start, distances, dtheta)."""
+    rng = np.random.default_rng(1)
+    start_angles = np.round(((np.arange(60) * 11.25) % 360) * 64) / 64
+    distances = rng.integers(0, 2 ** 14, (60, 32))
+    dtheta = rng.integers(-31, 32, (60, 32)) / 8.0
+    return encode_express_packets(start_angles, distances, dtheta), start_angles, distances, dtheta
+
+
+def test_decode_standard_matches_per_node_decoding(standard_stream):
+    stream, quality, angles, distances, new_scan = standard_stream
+    flags, q, a, d, consumed = rplidar_native.decode_standard(stream)
+    reference = reference_decode_standard(stream)
+
+    assert consumed == len(stream) and len(reference) == len(a)
+    assert np.array_equal(np.array([m[2] for m in reference]), a)
+    assert np.array_equal(np.array([m[3] for m in reference]), d)
+    assert np.array_equal(q, quality) and np.array_equal(flags, new_scan)
+
+
+def test_decode_express_packets(express_stream):
+    stream, start_angles, distances, dtheta = express_stream
+    decoded_start, decoded_distance, decoded_dtheta, consumed = rplidar_native.decode_express_packets(stream)
+
+    assert consumed == len(stream)
+    assert np.array_equal(decoded_start, start_angles)
+    assert np.array_equal(decoded_distance, distances)
+    assert np.array_equal(decoded_dtheta, dtheta)
+
+
+def test_decode_standard_stops_at_a_corrupted_node(standard_stream):
+    corrupted = bytearray(standard_stream[0][:50])
+    corrupted[21] ^= 0b1  # check bit of node 4
+    _, _, angles, _, consumed = rplidar_native.decode_standard(bytes(corrupted))
+    assert len(angles) == 4 and consumed == 21
+
+
+def test_standard_scan_through_a_pseudo_terminal(standard_stream):
+    stream, _, angles, _, _ = standard_stream
+    received = pty_roundtrip(stream[:5 * 600], "normal", 600)
+    assert np.array_equal(received, angles[:600])
+
+
+def test_express_scan_through_a_pseudo_terminal(express_stream):
+    received = pty_roundtrip(express_stream[0], "express", 32 * 59)
+    assert len(received) == 32 * 59
+
+
+def test_iter_batches_does_not_wait_for_a_full_chunk(standard_stream):
+    # Ten nodes must come out as soon as they arrive, not when the read times out
+    start = time.monotonic()
+    received = pty_roundtrip(standard_stream[0][:5 * 10], "normal", 10, timeout=2.0)
+    assert len(received) == 10 and time.monotonic() - start < 1.0
@@ -0,0 +1,31 @@
+import numpy as np
+
+import algorithm.constants as constants
+from scenarios import simulate_speed_tracking
+
+SEGMENTS = [0.5, 1.1, 0.8, 0.0, 0.6]
+SETPOINTS = np.repeat(SEGMENTS, 2000)
+SETTLED = (np.arange(len(SETPOINTS)) % 2000) >= 1000  # last second of every segment
+
+
+def test_closed_loop_settles_on_the_setpoint():
+    # Motor reaching 80% of the open-loop speed
+    speeds, _ = simulate_speed_tracking(SETPOINTS, constants.SPEED_CONTROL_RATE_HZ, True)
+    assert np.abs(speeds - SETPOINTS)[SETTLED].mean() < 0.03
+
+
+def test_stuck_encoder_does_not_wind_up():
+    # The command stays within SPEED_MAX_CORRECTION of the setpoint, and once the encoder
+    # reads again the speed comes back to the setpoint without a wound-up integral
+    setpoints = np.full(6000, 0.8)
+    speeds, commands = simulate_speed_tracking(setpoints, constants.SPEED_CONTROL_RATE_HZ, True,
+                                               plant_gain=1.0, stuck_sensor=(0, 3000))
+    assert commands.max() <= 0.8 + constants.SPEED_MAX_CORRECTION + 1e-9
+    assert np.argmax(np.abs(speeds[3000:] - 0.8) < 0.05) < 1000
+
+
+def test_setpoint_is_scaled_by_speed_command_mps(monkeypatch):
+    # With a motor reaching 2 m/s per unit of command the wheel speed must settle on 2 x setpoint
+    monkeypatch.setattr(constants, "SPEED_COMMAND_MPS", 2.0)
+    speeds, _ = simulate_speed_tracking(SETPOINTS, constants.SPEED_CONTROL_RATE_HZ, True)
+    assert np.abs(speeds - 2.0 * SETPOINTS)[SETTLED].mean() < 0.06
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from algorithm.interfaces import CameraDetection
+
+voiture_algorithm = pytest.importorskip("algorithm.voiture_algorithm")  # needs OpenCV
+DetectionStatus = voiture_algorithm.DetectionStatus
+
+
+class FakeCamera:
+    def __init__(self, detection: CameraDetection):
+        self.detection = detection
+
+    def get_detection(self) -> CameraDetection:
+        return self.detection
+
+
+class FakeConsole:
+    def print_to_console(self, message: str):
+        pass
+
+
+def make_algorithm(detection: CameraDetection):
+    """VoitureAlgorithm with only what the camera manoeuvres use."""
+    algorithm = voiture_algorithm.VoitureAlgorithm.__new__(voiture_algorithm.VoitureAlgorithm)
+    algorithm.camera = FakeCamera(detection)
+    algorithm.console = FakeConsole()
+    algorithm.manoeuvre = None
+    return algorithm
+
+
+def green_turn(seq: int = 1, age_s: float = 0.0) -> CameraDetection:
+    t_capture = time.time() - age_s
+    return CameraDetection(seq, t_capture, t_capture, DetectionStatus.ONLY_GREEN, 0, 200, 0.0, 0.5)
+
+
+def test_a_fresh_detection_picks_the_turning_reverse():
+    algorithm = make_algorithm(green_turn())
+    algorithm.simple_marche_arrire()
+    assert algorithm.manoeuvre.name == "GIRANDO"
+
+
+@pytest.mark.parametrize("detection", [green_turn(seq=0), green_turn(age_s=10.0)])
+def test_no_or_stale_detection_backs_straight_up(detection):
+    algorithm = make_algorithm(detection)
+    assert algorithm.fresh_detection() is None
+
+    algorithm.simple_marche_arrire()
+    assert algorithm.manoeuvre.name == "VOLTANDO"
+
+
+def test_demi_tour_ignores_a_stale_detection():
+    t_capture = time.time() - 10.0
+    detection = CameraDetection(1, t_capture, t_capture, DetectionStatus.GREEN_LEFT_RED_RIGHT, 0, 0, 0.3, 0.3)
+    assert make_algorithm(detection).demi_tour() is False